@@ -0,0 +1,6 @@
+"""
+Benchmark suite for the beacon / seeking / health / noise hot paths.
+
+Scenarios live in benchmarks.scenarios; benchmarks.run executes them,
+writes JSON results and compares them against a saved baseline.
+"""
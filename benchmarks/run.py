@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite and compare against a baseline.
+
+Results JSON:
+  {"meta": {...}, "results": {"<scenario>.<metric>": {"value", "unit", "better"}}}
+
+A metric regresses when it is worse than the baseline by more than
+--threshold (relative; direction from "better"). Exit code 1 on any
+regression, so this can gate CI.
+
+Run (from repo root):
+  python -m benchmarks.run                                  # all scenarios
+  python -m benchmarks.run --only seeking --only noise --quick
+  python -m benchmarks.run --sizes 1,16,128,1024            # read_recent up to 1 GB
+  python -m benchmarks.run --save-baseline benchmarks/baseline.json
+  python -m benchmarks.run --baseline benchmarks/baseline.json
+"""
+
+from __future__ import annotations
+import argparse
+import datetime
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from benchmarks.scenarios import SCENARIOS, BenchContext
+from core import codec
+
+DEFAULT_OUT = "benchmarks/results/latest.json"
+DEFAULT_THRESHOLD = 0.15
+
+
+def run(names: Optional[Iterable[str]] = None, *, quick: bool = False,
+        sizes_mb: Optional[List[int]] = None, workdir: Optional[str] = None,
+        log=print) -> Dict[str, Any]:
+    selected = list(names) if names else list(SCENARIOS)
+    unknown = [n for n in selected if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"unknown scenario(s): {', '.join(unknown)}")
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-", dir=workdir) as tmp:
+        ctx = BenchContext(Path(tmp), quick=quick, sizes_mb=sizes_mb)
+        for name in selected:
+            t0 = time.perf_counter()
+            for r in SCENARIOS[name](ctx):
+                results[r.name] = {"value": round(r.value, 4), "unit": r.unit, "better": r.better}
+                log(f"[bench] {r.name:<45} {r.value:>14,.2f} {r.unit}")
+            log(f"[bench] {name} done in {time.perf_counter() - t0:.1f}s")
+    return {
+        "meta": {
+            "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "codec": codec.BACKEND,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """One row per metric present in both runs; change > 0 means better."""
+    rows = []
+    base = baseline.get("results", {})
+    for name, cur in current.get("results", {}).items():
+        old = base.get(name)
+        if not old or not old.get("value"):
+            continue
+        ratio = cur["value"] / old["value"]
+        change = ratio - 1.0 if cur.get("better", "higher") == "higher" else 1.0 - ratio
+        rows.append({"name": name, "baseline": old["value"], "current": cur["value"],
+                     "unit": cur["unit"], "change": round(change, 4),
+                     "regression": change < -threshold})
+    return rows
+
+
+def _write(path: str, data: Dict[str, Any]) -> None:
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(codec.dumps_pretty(data) + "\n", encoding="utf-8")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run benchmarks")
+    ap.add_argument("--only", action="append", choices=sorted(SCENARIOS),
+                    help="scenario to run (repeatable; default all)")
+    ap.add_argument("--quick", action="store_true", help="small sizes (smoke run)")
+    ap.add_argument("--sizes", help="read_recent file sizes in MB, e.g. 1,16,128,1024")
+    ap.add_argument("--workdir", help="directory for generated files (default: system temp)")
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--baseline", help="compare against this results file")
+    ap.add_argument("--save-baseline", help="also write results here")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else None
+    current = run(args.only, quick=args.quick, sizes_mb=sizes, workdir=args.workdir)
+    _write(args.out, current)
+    if args.save_baseline:
+        _write(args.save_baseline, current)
+    if not args.baseline:
+        return
+    rows = compare(current, codec.loads(Path(args.baseline).read_bytes()), args.threshold)
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else ""
+        print(f"{r['name']:<45} {r['baseline']:>14,.2f} -> {r['current']:>14,.2f} "
+              f"{r['unit']:<6} {r['change']:+7.1%} {flag}")
+    if any(r["regression"] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Benchmark scenarios.
+
+Each scenario is a generator registered with @scenario(name); it receives
+the BenchContext and yields Result tuples. Keys are "<scenario>.<metric>"
+so results from different runs line up for baseline comparison.
+"""
+
+from __future__ import annotations
+import contextlib
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+
+class Result(NamedTuple):
+    name: str
+    value: float
+    unit: str
+    better: str = "higher"  # or "lower"
+
+
+class BenchContext:
+    def __init__(self, workdir: Path, quick: bool = False,
+                 sizes_mb: Optional[List[int]] = None):
+        self.workdir = workdir
+        self.quick = quick
+        self.sizes_mb = sizes_mb or ([1] if quick else [1, 16, 128])
+        self._beacons: Dict[int, List[Dict[str, Any]]] = {}
+
+    def n(self, full: int, quick: int) -> int:
+        return quick if self.quick else full
+
+    def beacons(self, n: int) -> List[Dict[str, Any]]:
+        if n not in self._beacons:
+            from scripts.bench_codec import sample_beacons
+
+            self._beacons[n] = sample_beacons(n)
+        return self._beacons[n]
+
+
+Scenario = Callable[[BenchContext], Iterator[Result]]
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str):
+    def dec(fn: Scenario) -> Scenario:
+        SCENARIOS[name] = fn
+        return fn
+    return dec
+
+
+def _median_s(fn: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+@contextlib.contextmanager
+def _env(**values: str):
+    old = {k: os.environ.get(k) for k in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def write_beacon_file(path: Path, size_bytes: int, beacons: List[Dict[str, Any]]) -> int:
+    """Fill path with repeated encoded beacons up to ~size_bytes; returns the size."""
+    from core import codec
+
+    block = b"".join(codec.dumpb(b) + b"\n" for b in beacons)
+    with open(path, "wb") as f:
+        written = 0
+        while written < size_bytes:
+            f.write(block)
+            written += len(block)
+    return written
+
+
+# --- Scenarios --------------------------------------------------------------------
+
+@scenario("append_beacon")
+def bench_append_beacon(ctx: BenchContext) -> Iterator[Result]:
+    from core import beacon_writer
+
+    beacons = ctx.beacons(ctx.n(50_000, 2_000))
+    path = str(ctx.workdir / "append.jsonl")
+    t0 = time.perf_counter()
+    for b in beacons:
+        beacon_writer.append_beacon(b, path)
+    dt = time.perf_counter() - t0
+    beacon_writer.close_shared_writers()
+    size = os.path.getsize(path)
+    yield Result("append_beacon.beacons_per_s", len(beacons) / dt, "ops/s")
+    yield Result("append_beacon.mb_per_s", size / dt / 1e6, "MB/s")
+
+
+@scenario("read_recent")
+def bench_read_recent(ctx: BenchContext) -> Iterator[Result]:
+    from core import beacon_writer
+
+    beacons = ctx.beacons(1_000)
+    for mb in ctx.sizes_mb:
+        path = ctx.workdir / f"recent_{mb}mb.jsonl"
+        write_beacon_file(path, mb << 20, beacons)
+        dt = _median_s(lambda: beacon_writer.read_recent(str(path), max_lines=200),
+                       ctx.n(25, 5))
+        yield Result(f"read_recent.{mb}mb_ms", dt * 1000, "ms", "lower")
+        path.unlink()
+
+
+@scenario("seeking")
+def bench_seeking(ctx: BenchContext) -> Iterator[Result]:
+    from core.seeking import SeekingConfig, SeekingController
+
+    n = ctx.n(200_000, 5_000)
+    subs = ctx.workdir / "subscriptions.json"
+    subs.write_text('{"other_stream": ["L1"]}', encoding="utf-8")
+    for label, path in (("no_subscriptions", ctx.workdir / "missing.json"),
+                        ("with_subscriptions", subs)):
+        ctl = SeekingController(SeekingConfig(stream_id="bench", subscriptions_path=str(path),
+                                              beacon_path=str(ctx.workdir / "unused.jsonl")))
+        base = 1_724_871_000.0
+        t0 = time.perf_counter()
+        for i in range(n):
+            ctl.record_tick()
+            ctl.update_and_maybe_beacon(now=base + i * 0.01)
+        yield Result(f"seeking.update_{label}_ops_per_s", n / (time.perf_counter() - t0), "ops/s")
+
+    from core import codec
+    from core.seeking import BeaconEncoder, SeekingState, beacon_dict
+
+    cfg = SeekingConfig(stream_id="bench")
+    enc = BeaconEncoder(cfg)
+    args = ("bench", SeekingState.SEEKING_LOW, 1000, 250, 0.75, 7, "mid", ["flux"], "78e51061")
+    for label, build in (("dict", lambda t: codec.dumpb(beacon_dict(t, cfg, *args))),
+                         ("encoder", lambda t: enc.encode(t, *args))):
+        t0 = time.perf_counter()
+        for i in range(n):
+            build(1_724_871_000.0 + i * 0.01)
+        yield Result(f"seeking.beacon_line_{label}_per_s", n / (time.perf_counter() - t0), "ops/s")
+
+
+@scenario("health")
+def bench_health(ctx: BenchContext) -> Iterator[Result]:
+    from core import health_plugins
+
+    beacon_path = ctx.workdir / "health_beacons.jsonl"
+    subs_path = ctx.workdir / "health_subscriptions.json"
+    write_beacon_file(beacon_path, 1 << 20, ctx.beacons(1_000))
+    subs_path.write_text('{"noise_metadata": ["L1"]}', encoding="utf-8")
+    repeat = ctx.n(10, 2)
+    with _env(NOISE_SEEK_BEACON_PATH=str(beacon_path),
+              NOISE_SEEK_SUBSCRIPTIONS_PATH=str(subs_path)):
+        for label, parallel in (("parallel", True), ("serial", False)):
+            dt = _median_s(lambda: health_plugins.run_all(parallel=parallel), repeat)
+            yield Result(f"health.run_all_{label}_ms", dt * 1000, "ms", "lower")
+
+
+@scenario("noise")
+def bench_noise(ctx: BenchContext) -> Iterator[Result]:
+    from scripts.workers import noise_metadata as nm
+
+    n = ctx.n(50_000, 1_000)
+    saved = nm.MODE
+    try:
+        for mode in ("words", "bytes", "markov"):
+            nm.MODE = mode
+            random.seed(1)
+            t0 = time.perf_counter()
+            done = 0
+            while done < n:
+                done += len(nm.gen_block(min(1024, n - done), done))
+            yield Result(f"noise.{mode}_events_per_s", n / (time.perf_counter() - t0), "ops/s")
+    finally:
+        nm.MODE = saved
+
+
+@scenario("archive")
+def bench_archive(ctx: BenchContext) -> Iterator[Result]:
+    from core import beacon_archive, codec
+
+    beacons = ctx.beacons(ctx.n(100_000, 5_000))
+    src = ctx.workdir / "archive_src.jsonl"
+    src.write_bytes(b"".join(codec.dumpb(b) + b"\n" for b in beacons))
+    t0 = time.perf_counter()
+    dst = beacon_archive.convert(src, ctx.workdir / "archive.nsba")
+    yield Result("archive.convert_beacons_per_s", len(beacons) / (time.perf_counter() - t0),
+                 "ops/s")
+    state = beacons[0]["state"]
+
+    def scan_json():
+        with open(src, "rb") as f:
+            return sum(1 for line in f if codec.loads(line).get("state") == state)
+
+    def scan_archive():
+        with beacon_archive.open_archive(dst) as a:
+            return len(a.select(state=state))
+
+    yield Result("archive.scan_state_json_ms", _median_s(scan_json, ctx.n(5, 2)) * 1000,
+                 "ms", "lower")
+    yield Result("archive.scan_state_columnar_ms", _median_s(scan_archive, ctx.n(5, 2)) * 1000,
+                 "ms", "lower")
+    yield Result("archive.size_ratio", dst.stat().st_size / src.stat().st_size, "x", "lower")
+
+
+@scenario("aggregate")
+def bench_aggregate(ctx: BenchContext) -> Iterator[Result]:
+    from core import codec
+    from core.beacon_aggregate import BeaconAggregator
+    from core.beacon_archive import ms_to_ts
+
+    beacons = ctx.beacons(ctx.n(100_000, 5_000))
+    t0_ms = 1_724_871_000_000
+    for label, streams in (("1_stream", 1), ("10k_streams", 10_000)):
+        # Every stream beacons every 5 s, round-robin (no idle eviction).
+        step_ms = 5000 / streams
+        lines = [codec.dumpb(dict(b, ts=ms_to_ts(t0_ms + int(i * step_ms)),
+                                  stream_id=f"s{i % streams}"))
+                 for i, b in enumerate(beacons)]
+        agg = BeaconAggregator()
+        t0 = time.perf_counter()
+        agg.feed_lines(lines)
+        yield Result(f"aggregate.{label}_beacons_per_s", len(lines) / (time.perf_counter() - t0),
+                     "ops/s")
+    yield Result("aggregate.top10_ms", _median_s(lambda: agg.top_loneliest(10), ctx.n(5, 2)) * 1000,
+                 "ms", "lower")
+
+
+@scenario("scheduler")
+def bench_scheduler(ctx: BenchContext) -> Iterator[Result]:
+    from core.seeking import SeekingConfig
+    from core.seeking_fleet import SeekingFleet
+    from core.seeking_scheduler import BeaconScheduler
+
+    n = ctx.n(100_000, 2_000)
+    cfg = SeekingConfig(subscriptions_path=str(ctx.workdir / "sched_subscriptions.json"))
+    ids = [f"s{i}" for i in range(n)]
+    t0 = 1_724_871_000.0
+    polled = SeekingFleet(cfg, ids)
+    polled.update(t0)
+    dt = _median_s(lambda: polled.update(t0 + 1.0), ctx.n(3, 2))
+    yield Result("scheduler.poll_pass_ms", dt * 1000, "ms", "lower")
+
+    sched = BeaconScheduler(SeekingFleet(cfg))
+    # Stagger start times over one low interval so beacons spread out like a live fleet.
+    step = cfg.beacon_interval_low_s / n
+    for i, sid in enumerate(ids):
+        sched.add_stream(sid)
+        sched.advance(t0 + i * step)
+    ticks, now, beacons = 0, t0 + cfg.beacon_interval_low_s, 0
+    t_start = time.perf_counter()
+    while now < t0 + 60:
+        now += 0.1
+        beacons += len(sched.advance(now, lines=True))
+        ticks += 1
+    elapsed = time.perf_counter() - t_start
+    yield Result("scheduler.tick_ms", elapsed / ticks * 1000, "ms", "lower")
+    yield Result("scheduler.beacons_per_s", beacons / elapsed, "ops/s")
+
+
+def _push_latency_ms(send: Callable[[Dict[str, Any]], None], read: Callable[[], List[bytes]],
+                     count: int, gap_s: float = 0.02) -> float:
+    """Median publish -> receive delay of count beacons sent gap_s apart to a reader loop."""
+    import threading
+    from core import codec
+
+    lat: List[float] = []
+    stop = threading.Event()
+
+    def consume():
+        while len(lat) < count and not stop.is_set():
+            for raw in read():
+                lat.append(time.perf_counter() - codec.loads(raw)["t"])
+
+    th = threading.Thread(target=consume, daemon=True)
+    th.start()
+    for i in range(count):
+        send({"stream_id": "latency", "state": "seeking_low", "beacon_n": i,
+              "t": time.perf_counter()})
+        time.sleep(gap_s)
+    th.join(timeout=5.0)
+    stop.set()
+    return statistics.median(lat) * 1000 if lat else float("nan")
+
+
+@scenario("broker")
+def bench_broker(ctx: BenchContext) -> Iterator[Result]:
+    import threading
+    from core import beacon_broker, beacon_writer
+
+    beacons = ctx.beacons(ctx.n(50_000, 2_000))
+    n = len(beacons)
+    pings = ctx.n(100, 10)
+
+    def drain(read: Callable[[], List[bytes]], expect: List[int]) -> threading.Thread:
+        def run():
+            got = 0
+            while got < expect[0]:  # lowered by the publisher's drops once known
+                got += len(read())
+        th = threading.Thread(target=run, daemon=True)
+        th.start()
+        return th
+
+    # File path: append_beacon (flushed per line) + a BeaconFollower on the same host.
+    path = ctx.workdir / "broker_file.jsonl"
+    path.write_bytes(b"")
+    with beacon_writer.follow(path) as follower:
+        def read_file():
+            lines = follower.read_lines()
+            if not lines:
+                follower.wait(0.05)
+            return lines
+
+        t0 = time.perf_counter()
+        th = drain(read_file, [n])
+        for b in beacons:
+            beacon_writer.append_beacon(b, str(path))
+        th.join()
+        yield Result("broker.file_beacons_per_s", n / (time.perf_counter() - t0), "ops/s")
+        latency = _push_latency_ms(lambda b: beacon_writer.append_beacon(b, str(path)),
+                                   read_file, pings)
+        yield Result("broker.file_inotify_latency_ms", latency, "ms", "lower")
+    with beacon_writer.follow(path, poll_interval_s=0.05, use_inotify=False) as follower:
+        def read_polled():
+            lines = follower.read_lines()
+            if not lines:
+                follower.wait()
+            return lines
+
+        latency = _push_latency_ms(lambda b: beacon_writer.append_beacon(b, str(path)),
+                                   read_polled, pings)
+        yield Result("broker.file_poll_latency_ms", latency, "ms", "lower")
+    beacon_writer.close_shared_writers()
+
+    # Broker path: batched frames over a Unix socket, pushed to a subscriber.
+    sock = ctx.workdir / "broker.sock"
+    listen = f"unix:{sock}" if len(str(sock)) < 100 else "127.0.0.1:0"
+    broker = beacon_broker.BeaconBroker(ctx.workdir / "broker.jsonl")
+    server = beacon_broker.make_server(broker, listen)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = beacon_broker.server_address(server)
+    sub = beacon_broker.subscribe(address)
+    pub = beacon_broker.connect(address)
+    try:
+        t0 = time.perf_counter()
+        expect = [n]
+        th = drain(lambda: sub.read_lines(timeout=0.05), expect)
+        for b in beacons:
+            pub.publish(b)
+        pub.flush()
+        expect[0] = n - pub.dropped  # a full send queue drops rather than blocks
+        th.join()
+        yield Result("broker.socket_beacons_per_s", pub.sent / (time.perf_counter() - t0), "ops/s")
+        yield Result("broker.socket_dropped_beacons", pub.dropped, "beacons", "lower")
+        latency = _push_latency_ms(pub.publish, lambda: sub.read_lines(timeout=0.05), pings)
+        yield Result("broker.socket_latency_ms", latency, "ms", "lower")  # incl. batching delay
+        with beacon_broker.connect(address, max_delay_s=0) as unbatched:
+            latency = _push_latency_ms(unbatched.publish, lambda: sub.read_lines(timeout=0.05),
+                                       pings)
+        yield Result("broker.socket_unbatched_latency_ms", latency, "ms", "lower")
+    finally:
+        pub.close()
+        sub.close()
+        server.shutdown()
+        server.server_close()
+        broker.close()
@@ -0,0 +1,491 @@
+"""
+Incremental beacon aggregation.
+
+BeaconAggregator consumes every beacon once (dicts via observe(), raw JSONL
+lines via feed_lines()) and keeps, per stream_id:
+
+  rate_per_min       beacons per minute over the last window_s, from a fixed
+                     ring of the stream's most recent beacon times
+  time_in_state_s    seconds per SeekingState; the time between two events is
+                     charged to the earlier state, except that a seeking gap
+                     longer than gap_s is dropped (the stream went quiet and
+                     we did not see why)
+  loneliness_ratio   from the latest beacon, plus lonely_for_s, the age of
+                     the current lonely episode
+  time_to_attach_s   first beacon of a lonely episode -> the "sub" event that
+                     ended it (subscriptions journal, observe_subscription) or
+                     an "attached" beacon
+
+and fleet-wide tumbling windows (window_s wide, the last `windows` kept) with
+beacon counts per state, mean loneliness and distinct streams.
+
+Memory is bounded: the per-stream ring has ring_size slots, streams with no
+event for idle_s are evicted, and beyond max_streams the least recently seen
+stream goes first. All times are event times (beacon "ts", journal "ts"), so
+aggregating an old file gives the same numbers as having watched it live;
+snapshot(now=time.time()) ages a live view against the wall clock instead.
+
+Events should arrive in time order per stream (feed_lines merges journal
+events into the beacon stream); older ones only count towards the windows.
+
+CLI:
+  python -m core.beacon_aggregate runtime/beacons.jsonl --top 10
+  python -m core.beacon_aggregate --journal runtime/subscriptions.journal.jsonl --follow
+"""
+
+from __future__ import annotations
+import heapq
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from core import codec
+from core.beacon_archive import ts_to_ms
+
+WINDOW_S = float(os.getenv("NOISE_SEEK_AGG_WINDOW_S", 60))
+WINDOWS = int(os.getenv("NOISE_SEEK_AGG_WINDOWS", 15))
+GAP_S = float(os.getenv("NOISE_SEEK_AGG_GAP_S", 60))
+IDLE_S = float(os.getenv("NOISE_SEEK_AGG_IDLE_S", 900))
+MAX_STREAMS = int(os.getenv("NOISE_SEEK_AGG_MAX_STREAMS", 100_000))
+RING_SIZE = 32
+
+LONELY_STATES = frozenset(("seeking_low", "seeking_escalate"))
+# States in which a stream does not beacon, so long gaps are expected.
+QUIET_STATES = frozenset(("attached", "idle"))
+
+_SECONDS: Dict[str, int] = {}  # "YYYY-MM-DDTHH:MM:SS" -> epoch seconds
+
+
+def ts_seconds(ts: Any) -> Optional[float]:
+    """Epoch seconds for a beacon "ts" (ISO string or number), None otherwise."""
+    if type(ts) is str:
+        if len(ts) == 24 and ts[19] == "." and ts[23] == "Z":
+            base = _SECONDS.get(ts[:19])
+            if base is None:
+                ms = ts_to_ms(ts)
+                if ms is None:
+                    return None
+                if len(_SECONDS) >= 4096:
+                    _SECONDS.clear()
+                base = _SECONDS[ts[:19]] = ms // 1000
+            try:
+                return base + int(ts[20:23]) / 1000
+            except ValueError:
+                return None
+        ms = ts_to_ms(ts)
+        return None if ms is None else ms / 1000
+    if type(ts) is float or type(ts) is int:
+        return float(ts)
+    return None
+
+
+class _Stream:
+    __slots__ = ("stream_id", "state", "ratio", "beacons", "first_t", "last_t", "mark_t",
+                 "ring", "ring_n", "state_s", "episode_t", "attaches", "attach_sum_s",
+                 "attach_last_s", "listeners")
+
+    def __init__(self, stream_id: str, t: float, ring_size: int):
+        self.stream_id = stream_id
+        self.state: Optional[str] = None
+        self.ratio: Optional[float] = None
+        self.beacons = 0
+        self.first_t = self.last_t = self.mark_t = t
+        self.ring = array("d", bytes(8 * ring_size))
+        self.ring_n = 0
+        self.state_s: Dict[str, float] = {}
+        self.episode_t: Optional[float] = None
+        self.attaches = 0
+        self.attach_sum_s = 0.0
+        self.attach_last_s: Optional[float] = None
+        self.listeners: Optional[set] = None
+
+
+class _Window:
+    __slots__ = ("start", "end", "beacons", "by_state", "ratio_sum", "ratio_n", "streams")
+
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+        self.beacons = 0
+        self.by_state: Dict[str, int] = {}
+        self.ratio_sum = 0.0
+        self.ratio_n = 0
+        self.streams: set = set()
+
+
+class BeaconAggregator:
+    """Rolling per-stream and per-window statistics over a beacon stream."""
+
+    def __init__(self, *, window_s: float = WINDOW_S, windows: int = WINDOWS,
+                 gap_s: float = GAP_S, idle_s: float = IDLE_S,
+                 max_streams: int = MAX_STREAMS, ring_size: int = RING_SIZE):
+        if window_s <= 0 or windows < 1 or ring_size < 2:
+            raise ValueError("window_s > 0, windows >= 1 and ring_size >= 2 required")
+        self.window_s = window_s
+        self.gap_s = gap_s
+        self.idle_s = idle_s
+        self.max_streams = max_streams
+        self.ring_size = ring_size
+        self.streams: "OrderedDict[str, _Stream]" = OrderedDict()  # least recently seen first
+        self.windows: "deque[_Window]" = deque(maxlen=windows)
+        self._win: Optional[_Window] = None  # newest window
+        self.now = 0.0  # latest event time seen
+        self.lines = 0
+        self.beacons = 0
+        self.bad = 0
+        self.late = 0
+        self.evicted = 0
+        self.subscription_events = 0
+
+    # --- Feeding ------------------------------------------------------------
+
+    def feed_lines(self, lines: Iterable[bytes],
+                   subscription_events: Optional[Iterable[Dict[str, Any]]] = None) -> int:
+        """
+        Decode and observe raw beacon lines; returns how many were beacons.
+        subscription_events (journal entries) are interleaved by "ts", each
+        one observed before the first beacon that is not older than it.
+        """
+        loads = codec.loads
+        observe = self.observe
+        pending: List[Dict[str, Any]] = []
+        if subscription_events is not None:
+            pending = sorted((e for e in subscription_events if ts_seconds(e.get("ts")) is not None),
+                             key=lambda e: ts_seconds(e["ts"]), reverse=True)
+        n = 0
+        for raw in lines:
+            self.lines += 1
+            try:
+                b = loads(raw)
+            except ValueError:
+                self.bad += 1
+                continue
+            if type(b) is not dict:
+                self.bad += 1
+                continue
+            if pending:
+                t = ts_seconds(b.get("ts"))
+                while pending and t is not None and ts_seconds(pending[-1]["ts"]) <= t:
+                    self.observe_subscription(pending.pop())
+            if observe(b):
+                n += 1
+        while pending:
+            self.observe_subscription(pending.pop())
+        return n
+
+    def observe(self, beacon: Dict[str, Any]) -> bool:
+        """Account one decoded beacon; False (and counted as bad) if unusable."""
+        sid = beacon.get("stream_id")
+        state = beacon.get("state")
+        ts = beacon.get("ts")
+        # Inlined ts_seconds() hit path: this method is the per-beacon hot loop.
+        if (type(ts) is str and len(ts) == 24 and ts[19] == "." and ts[23] == "Z"
+                and ts[20:23].isdigit() and (base := _SECONDS.get(ts[:19])) is not None):
+            t = base + int(ts[20:23]) / 1000
+        else:
+            t = ts_seconds(ts)
+        if t is None or type(sid) is not str or type(state) is not str:
+            self.bad += 1
+            return False
+        ratio = beacon.get("loneliness_ratio")
+        if type(ratio) is not float and type(ratio) is not int:
+            ratio = None
+        self.beacons += 1
+        if t > self.now:
+            self.now = t
+        w = self._win
+        if w is None or not w.start <= t < w.end:
+            w = self._window_for(t)
+        if w is not None:
+            w.beacons += 1
+            w.by_state[state] = w.by_state.get(state, 0) + 1
+            if ratio is not None:
+                w.ratio_sum += ratio
+                w.ratio_n += 1
+            w.streams.add(sid)
+
+        streams = self.streams
+        s = streams.get(sid)
+        if s is None:
+            s = streams[sid] = _Stream(sid, t, self.ring_size)
+            if len(streams) > self.max_streams:
+                self._evict()
+        else:
+            streams.move_to_end(sid)
+            if t < s.mark_t:
+                self.late += 1
+                return True
+        ring = s.ring
+        ring[s.ring_n % len(ring)] = t
+        s.ring_n += 1
+        s.beacons += 1
+        if ratio is not None:
+            s.ratio = ratio
+        if not self._charge(s, t):
+            s.episode_t = None  # quiet too long: the previous episode ended unseen
+        if state in LONELY_STATES:
+            if s.episode_t is None:
+                s.episode_t = t
+        elif state == "attached":
+            self._attached(s, t)
+        else:
+            s.episode_t = None
+        s.state = state
+        s.mark_t = s.last_t = t
+        if not self.beacons & 1023:
+            self._evict()
+        return True
+
+    def observe_subscription(self, event: Dict[str, Any]) -> bool:
+        """Account a subscriptions journal entry ({"op", "stream_id", "listener_id", "ts"})."""
+        op = event.get("op")
+        t = ts_seconds(event.get("ts"))
+        s = self.streams.get(event.get("stream_id"))
+        if op not in ("sub", "unsub") or t is None or s is None:
+            return False
+        self.subscription_events += 1
+        if t < s.mark_t:
+            self.late += 1
+            return False
+        if t > self.now:
+            self.now = t
+        self.streams.move_to_end(s.stream_id)
+        if s.listeners is None:
+            s.listeners = set()
+        if not self._charge(s, t):
+            s.episode_t = None  # as in observe(): a dropped gap ends the episode
+        if op == "sub":
+            s.listeners.add(event.get("listener_id"))
+            self._attached(s, t)
+            s.state = "attached"
+        else:
+            s.listeners.discard(event.get("listener_id"))
+            if not s.listeners and s.state == "attached":
+                s.state = "idle"
+        s.mark_t = s.last_t = t
+        return True
+
+    def _charge(self, s: _Stream, t: float) -> bool:
+        """Charge mark_t..t to the current state; False if the gap was dropped."""
+        gap = t - s.mark_t
+        state = s.state
+        if state is None:
+            return True
+        if gap <= self.gap_s or state in QUIET_STATES:
+            s.state_s[state] = s.state_s.get(state, 0.0) + gap
+            return True
+        return False
+
+    def _attached(self, s: _Stream, t: float) -> None:
+        if s.episode_t is not None:
+            tta = t - s.episode_t
+            s.attaches += 1
+            s.attach_sum_s += tta
+            s.attach_last_s = tta
+            s.episode_t = None
+
+    def _window_for(self, t: float) -> Optional[_Window]:
+        """Tumbling window holding t, opening a new one if t is past the newest."""
+        start = t - t % self.window_s
+        windows = self.windows
+        if not windows or start > windows[-1].start:
+            w = self._win = _Window(start, start + self.window_s)
+            windows.append(w)
+            return w
+        for w in reversed(windows):
+            if w.start == start:
+                return w
+        return None  # older than every kept window
+
+    def _evict(self) -> None:
+        streams = self.streams
+        horizon = self.now - self.idle_s
+        while streams:
+            s = next(iter(streams.values()))
+            if s.last_t >= horizon and len(streams) <= self.max_streams:
+                break
+            del streams[s.stream_id]
+            self.evicted += 1
+
+    # --- Views --------------------------------------------------------------
+
+    def _rate_per_min(self, s: _Stream, now: float) -> float:
+        ring = s.ring
+        kept = ring if s.ring_n >= len(ring) else ring[:s.ring_n]
+        lo = now - self.window_s
+        inside = [x for x in kept if lo < x <= now]
+        if len(inside) == len(ring) and max(inside) > min(inside):
+            # More beacons per window than the ring holds: estimate from its span.
+            return (len(inside) - 1) / (max(inside) - min(inside)) * 60
+        return len(inside) / self.window_s * 60
+
+    def _stale(self, s: _Stream, now: float) -> bool:
+        return s.state not in QUIET_STATES and now - s.last_t > self.gap_s
+
+    def _view(self, s: _Stream, now: float) -> Dict[str, Any]:
+        time_in_state = dict(s.state_s)
+        open_s = now - s.mark_t
+        if s.state is not None and open_s > 0 and (open_s <= self.gap_s or s.state in QUIET_STATES):
+            time_in_state[s.state] = time_in_state.get(s.state, 0.0) + open_s
+        stale = self._stale(s, now)
+        return {
+            "stream_id": s.stream_id,
+            "state": s.state,
+            "loneliness_ratio": s.ratio,
+            "lonely_for_s": (round(now - s.episode_t, 3)
+                             if s.episode_t is not None and not stale else None),
+            "beacons": s.beacons,
+            "rate_per_min": round(self._rate_per_min(s, now), 3),
+            "time_in_state_s": {k: round(v, 3) for k, v in sorted(time_in_state.items())},
+            "time_to_attach_s": None if s.attach_last_s is None else round(s.attach_last_s, 3),
+            "mean_time_to_attach_s": (round(s.attach_sum_s / s.attaches, 3)
+                                      if s.attaches else None),
+            "attaches": s.attaches,
+            "last_ts": s.last_t,
+            "stale": stale,
+        }
+
+    def stream(self, stream_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        s = self.streams.get(stream_id)
+        return None if s is None else self._view(s, self.now if now is None else now)
+
+    def top_loneliest(self, n: int = 10, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Streams in a live lonely episode, by loneliness_ratio then episode age."""
+        now = self.now if now is None else now
+        lonely = [s for s in self.streams.values()
+                  if s.episode_t is not None and not self._stale(s, now)]
+        top = heapq.nlargest(n, lonely, key=lambda s: (s.ratio or 0.0, now - s.episode_t))
+        return [self._view(s, now) for s in top]
+
+    def totals(self) -> Dict[str, Any]:
+        return {
+            "lines": self.lines,
+            "beacons": self.beacons,
+            "bad": self.bad,
+            "late": self.late,
+            "subscription_events": self.subscription_events,
+            "streams": len(self.streams),
+            "evicted": self.evicted,
+        }
+
+    def window_stats(self) -> List[Dict[str, Any]]:
+        """Tumbling windows, oldest first."""
+        return [{
+            "start": w.start,
+            "beacons": w.beacons,
+            "streams": len(w.streams),
+            "by_state": dict(sorted(w.by_state.items())),
+            "mean_loneliness_ratio": round(w.ratio_sum / w.ratio_n, 5) if w.ratio_n else None,
+        } for w in self.windows]
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Everything, as plain JSON-ready dicts (streams keyed by stream_id)."""
+        now = self.now if now is None else now
+        return {
+            "now": now,
+            "window_s": self.window_s,
+            "totals": self.totals(),
+            "windows": self.window_stats(),
+            "streams": {sid: self._view(s, now) for sid, s in self.streams.items()},
+        }
+
+
+def _fmt(v: Any, spec: str = "") -> str:
+    return "-" if v is None else format(v, spec)
+
+
+def render_top(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'stream_id':<28} {'state':<17} {'ratio':>7} {'lonely_s':>9} "
+             f"{'rate/min':>8} {'tta_s':>8} {'beacons':>8}"]
+    for r in rows:
+        lines.append(f"{r['stream_id'][:28]:<28} {r['state']:<17} "
+                     f"{_fmt(r['loneliness_ratio'], '.3f'):>7} {_fmt(r['lonely_for_s'], '.1f'):>9} "
+                     f"{r['rate_per_min']:>8.2f} {_fmt(r['mean_time_to_attach_s'], '.1f'):>8} "
+                     f"{r['beacons']:>8}")
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+    from core.beacon_writer import BeaconFollower
+
+    ap = argparse.ArgumentParser(description="Per-stream beacon statistics, top-N loneliest")
+    ap.add_argument("beacons", nargs="?",
+                    default=os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl"))
+    ap.add_argument("--journal", help="subscriptions journal (enables time-to-attach)")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--window", type=float, default=WINDOW_S, help="window width in seconds")
+    ap.add_argument("--follow", action="store_true", help="keep reading appended beacons")
+    ap.add_argument("--every", type=float, default=5.0, help="--follow print interval (s)")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    agg = BeaconAggregator(window_s=args.window)
+    beacons = BeaconFollower(args.beacons, from_start=True)
+    journal = BeaconFollower(args.journal, from_start=True) if args.journal else None
+
+    def read() -> None:
+        events = None
+        if journal is not None:
+            events = []
+            for raw in journal.read_lines():
+                try:
+                    ev = codec.loads(raw)
+                except ValueError:
+                    continue
+                if isinstance(ev, dict):
+                    events.append(ev)
+        agg.feed_lines(beacons.read_lines(), events)
+
+    def show() -> None:
+        now = time.time() if args.follow else None
+        top = agg.top_loneliest(args.top, now)
+        if args.json:
+            print(codec.dumps_pretty({"now": agg.now if now is None else now,
+                                      "totals": agg.totals(), "windows": agg.window_stats(),
+                                      "top": top}))
+        else:
+            t = agg.totals()
+            print(f"[beacon_aggregate] streams={t['streams']} beacons={t['beacons']} "
+                  f"bad={t['bad']} evicted={t['evicted']}")
+            print(render_top(top))
+        sys.stdout.flush()
+
+    try:
+        read()
+        show()
+        next_show = time.monotonic() + args.every
+        while args.follow:
+            beacons.wait(max(0.0, next_show - time.monotonic()))
+            read()
+            if time.monotonic() >= next_show:
+                show()
+                next_show = time.monotonic() + args.every
+    except KeyboardInterrupt:
+        pass
+    finally:
+        beacons.close()
+        if journal is not None:
+            journal.close()
+
+
+__all__ = [
+    "BeaconAggregator",
+    "GAP_S",
+    "IDLE_S",
+    "LONELY_STATES",
+    "MAX_STREAMS",
+    "QUIET_STATES",
+    "RING_SIZE",
+    "WINDOWS",
+    "WINDOW_S",
+    "render_top",
+    "ts_seconds",
+]
+
+
+if __name__ == "__main__":
+    main()
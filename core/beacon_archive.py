@@ -0,0 +1,641 @@
+"""
+Columnar beacon archive.
+
+Converts beacon JSONL (typically rotated segments, plain or .gz) into one
+binary file per segment that analytics jobs can scan without decoding JSON:
+
+  ts                int64 epoch milliseconds
+  stream_id, state, mode, entropy_profile, tempo_range_s
+                    dictionary-encoded (uint8/16/32 codes + value list in meta)
+  tokens_hint, spore
+                    per-row values (often unique): int64 offsets + one byte
+                    blob (UTF-8 / compact JSON), decoded only for rows read
+  produced_ticks, delivered_ticks, beacon_n
+                    int64
+  loneliness_ratio  float64
+
+A beacon is stored in the columns only if rebuilding it from them yields
+the same JSON as the original (key order, types, "ts" spelling, seq ==
+produced_ticks), i.e. exactly what seeking.beacon_dict() produces. Anything
+else (other producers, extra keys) is kept verbatim in an overflow section
+with its original position, so records() returns every parsed line in order
+and dump reproduces them. Unparseable lines are dropped and counted.
+
+Layout (little-endian, 8-byte aligned sections, like core.markov):
+  header  magic, version, columnar rows, overflow rows, meta bytes
+  meta    JSON: column typecodes, dictionaries, ts range, source, skipped
+  data    one array per column (blob columns: offsets, then bytes), then
+          overflow positions / offsets / blob
+
+Version 1 files (every string/list column dictionary-encoded) still open.
+
+open_archive() memory-maps the file; column() returns typed memoryviews
+(array() numpy views when numpy is installed) and select() filters on the
+code / ts columns only, with since <= ts <= until like beacon_index.query().
+
+CLI:
+  python -m core.beacon_archive export runtime/beacons.jsonl   # every rotated segment
+  python -m core.beacon_archive convert beacons.jsonl.000003.gz out.nsba
+  python -m core.beacon_archive dump out.nsba [--out beacons.jsonl]
+  python -m core.beacon_archive stats runtime/*.nsba
+"""
+
+from __future__ import annotations
+import datetime
+import functools
+import gzip
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from core import beacon_segments, codec
+from core.beacon_index import to_epoch_ms
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    np = None  # type: ignore
+
+MAGIC = b"NSBA"
+VERSION = 2
+_READABLE = (1, VERSION)
+SUFFIX = ".nsba"
+# magic, version, columnar rows, overflow rows, meta bytes
+_HEADER = struct.Struct("<4sIQQQ")
+
+# Key order of seeking.beacon_dict(); "seq" is rebuilt from produced_ticks.
+TEMPLATE_KEYS = ("ts", "stream_id", "state", "seq", "produced_ticks", "delivered_ticks",
+                 "loneliness_ratio", "mode", "entropy_profile", "tempo_range_s",
+                 "tokens_hint", "spore", "beacon_n")
+BLOB = "blob"
+# (column, typecode, None for dictionary-encoded or BLOB), in file order
+COLUMNS = (
+    ("ts", "q"),
+    ("stream_id", None),
+    ("state", None),
+    ("produced_ticks", "q"),
+    ("delivered_ticks", "q"),
+    ("loneliness_ratio", "d"),
+    ("mode", None),
+    ("entropy_profile", None),
+    ("tempo_range_s", None),
+    ("tokens_hint", BLOB),
+    ("spore", BLOB),
+    ("beacon_n", "q"),
+)
+_STR_COLUMNS = ("stream_id", "state", "mode", "entropy_profile", "spore")
+_LIST_COLUMNS = ("tempo_range_s", "tokens_hint")
+_INT_COLUMNS = ("produced_ticks", "delivered_ticks", "beacon_n")
+_INT64 = (-(1 << 63), (1 << 63) - 1)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MS = datetime.timedelta(milliseconds=1)
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def ts_to_ms(ts: Any) -> Optional[int]:
+    """Epoch ms for a beacon "ts" string ("...T..:..:..mmmZ"), None otherwise."""
+    if type(ts) is not str or not ts.endswith("Z"):
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(ts[:-1])
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        return None
+    return (dt - _EPOCH) // _MS
+
+
+_D2 = [f"{i:02d}" for i in range(60)]
+_D3 = [f"{i:03d}" for i in range(1000)]
+
+
+@functools.lru_cache(maxsize=1024)
+def _day(days: int) -> str:
+    return (_EPOCH + datetime.timedelta(days=days)).date().isoformat()
+
+
+def ms_to_ts(ms: int) -> str:
+    """Inverse of ts_to_ms; same spelling as seeking._iso_ts."""
+    days, ms = divmod(ms, 86_400_000)
+    s, ms = divmod(ms, 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{_day(days)}T{_D2[h]}:{_D2[m]}:{_D2[s]}.{_D3[ms]}Z"
+
+
+def _build(ts_ms: int, stream_id: str, state: str, produced: int, delivered: int,
+           ratio: float, mode: str, entropy_profile: str, tempo: list, tokens: list,
+           spore: str, beacon_n: int) -> Dict[str, Any]:
+    # Same key order as seeking.beacon_dict().
+    return {
+        "ts": ms_to_ts(ts_ms),
+        "stream_id": stream_id,
+        "state": state,
+        "seq": produced,
+        "produced_ticks": produced,
+        "delivered_ticks": delivered,
+        "loneliness_ratio": ratio,
+        "mode": mode,
+        "entropy_profile": entropy_profile,
+        "tempo_range_s": list(tempo),
+        "tokens_hint": list(tokens),
+        "spore": spore,
+        "beacon_n": beacon_n,
+    }
+
+
+def _columnar_row(obj: Any, raw: bytes) -> Optional[tuple]:
+    """Column values for obj if they rebuild it exactly, else None."""
+    if type(obj) is not dict or tuple(obj) != TEMPLATE_KEYS:
+        return None
+    ts_ms = ts_to_ms(obj["ts"])
+    if ts_ms is None or obj["seq"] != obj["produced_ticks"]:
+        return None
+    for k in _INT_COLUMNS:
+        v = obj[k]
+        if type(v) is not int or not _INT64[0] <= v <= _INT64[1]:
+            return None
+    if type(obj["loneliness_ratio"]) is not float:
+        return None
+    for k in _STR_COLUMNS:
+        if type(obj[k]) is not str:
+            return None
+    for k in _LIST_COLUMNS:
+        if type(obj[k]) is not list:
+            return None
+    row = (ts_ms, obj["stream_id"], obj["state"], obj["produced_ticks"],
+           obj["delivered_ticks"], obj["loneliness_ratio"], obj["mode"],
+           obj["entropy_profile"], obj["tempo_range_s"], obj["tokens_hint"], obj["spore"],
+           obj["beacon_n"])
+    rebuilt = codec.dumpb(_build(*row))
+    if rebuilt != raw.strip() and rebuilt != codec.dumpb(obj):
+        return None
+    return row
+
+
+def _code_typecode(n_values: int) -> str:
+    return "B" if n_values <= 0xFF else ("H" if n_values <= 0xFFFF else "I")
+
+
+def _column_meta(name: str, code: Optional[str], values: Dict[str, List[Any]]) -> Dict[str, Any]:
+    if code == BLOB:  # str columns hold UTF-8, list columns compact JSON
+        return {"name": name, "type": "q", "blob": "str" if name in _STR_COLUMNS else "json"}
+    if code:
+        return {"name": name, "type": code}
+    return {"name": name, "type": _code_typecode(len(values[name])), "values": values[name]}
+
+
+# --- Writing ----------------------------------------------------------------------
+
+def encode(lines: Iterable[bytes], source: str = "") -> bytes:
+    """Archive bytes for an iterable of raw JSONL lines."""
+    if sys.byteorder != "little":  # pragma: no cover
+        raise ValueError("beacon archives are little-endian only")
+    plain: Dict[str, array] = {name: array(code) for name, code in COLUMNS
+                               if code and code != BLOB}
+    codes: Dict[str, List[int]] = {name: [] for name, code in COLUMNS if not code}
+    blobs: Dict[str, Tuple[array, bytearray]] = {name: (array("q", [0]), bytearray())
+                                                 for name, code in COLUMNS if code == BLOB}
+    dicts: Dict[str, Dict[Any, int]] = {name: {} for name in codes}
+    values: Dict[str, List[Any]] = {name: [] for name in codes}
+    over_pos = array("q")
+    over_off = array("q", [0])
+    blob = bytearray()
+    skipped = 0
+    pos = 0
+    for raw in lines:
+        if not raw.strip():
+            continue
+        try:
+            obj = codec.loads(raw)
+        except Exception:
+            skipped += 1
+            continue
+        row = _columnar_row(obj, raw)
+        if row is None:
+            over_pos.append(pos)
+            blob += raw.strip()
+            over_off.append(len(blob))
+        else:
+            for (name, code), v in zip(COLUMNS, row):
+                if code == BLOB:
+                    offsets, data = blobs[name]
+                    data += v.encode("utf-8") if type(v) is str else codec.dumpb(v)
+                    offsets.append(len(data))
+                    continue
+                if code:
+                    plain[name].append(v)
+                    continue
+                key = v if type(v) is str else codec.dumps(v)
+                c = dicts[name].get(key)
+                if c is None:
+                    c = dicts[name][key] = len(values[name])
+                    values[name].append(v)
+                codes[name].append(c)
+        pos += 1
+    n = len(plain["ts"])
+    ts = plain["ts"]
+    meta = {
+        "source": source,
+        "skipped": skipped,
+        "ts_min": min(ts) if n else None,
+        "ts_max": max(ts) if n else None,
+        "columns": [_column_meta(name, code, values) for name, code in COLUMNS],
+    }
+    meta_b = codec.dumpb(meta)
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, n, len(over_pos), len(meta_b)))
+    out += meta_b
+    for col in meta["columns"]:
+        name = col["name"]
+        parts = (blobs[name] if name in blobs
+                 else (plain[name] if name in plain else array(col["type"], codes[name]),))
+        for part in parts:
+            out += b"\0" * (_align(len(out)) - len(out))
+            out += part if isinstance(part, bytearray) else part.tobytes()
+    for part in (over_pos, over_off, bytes(blob)):
+        out += b"\0" * (_align(len(out)) - len(out))
+        out += part if isinstance(part, bytes) else part.tobytes()
+    return bytes(out)
+
+
+def _iter_lines(path: str | os.PathLike) -> Iterator[bytes]:
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            yield line.rstrip(b"\n")
+
+
+def archive_path(segment: str | os.PathLike) -> Path:
+    p = Path(segment)
+    name = p.name[:-3] if p.name.endswith(".gz") else p.name
+    return p.with_name(name + SUFFIX)
+
+
+def convert(src: str | os.PathLike, out: Optional[str | os.PathLike] = None) -> Path:
+    """Write the archive for one JSONL(.gz) file (atomically); returns its path."""
+    dst = Path(out) if out else archive_path(src)
+    data = encode(_iter_lines(src), source=Path(src).name)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, dst)
+    return dst
+
+
+def export_segments(active: str | os.PathLike, out_dir: Optional[str | os.PathLike] = None,
+                    force: bool = False) -> List[Path]:
+    """
+    Archive every rotated segment of active that has no up-to-date archive
+    yet (archive mtime >= segment mtime); returns the archives written.
+    """
+    written = []
+    for seg in beacon_segments.list_segments(active):
+        dst = archive_path(seg.path)
+        if out_dir:
+            dst = Path(out_dir) / dst.name
+        try:
+            if not force and dst.stat().st_mtime >= seg.path.stat().st_mtime:
+                continue
+        except FileNotFoundError:
+            pass
+        try:
+            written.append(convert(seg.path, dst))
+        except FileNotFoundError:
+            continue  # compressed meanwhile; the .gz copy is picked up next run
+    return written
+
+
+# --- Reading ----------------------------------------------------------------------
+
+class BeaconArchive:
+    """Read-only view over archive bytes (bytes or mmap)."""
+
+    def __init__(self, buf, _mm: Optional[mmap.mmap] = None, _file=None):
+        if sys.byteorder != "little":  # pragma: no cover
+            raise ValueError("beacon archives are little-endian only")
+        magic, version, n, n_over, meta_len = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version not in _READABLE:
+            raise ValueError("not a beacon archive (bad magic/version)")
+        self._buf = buf
+        self._mm = _mm
+        self._file = _file
+        mv = memoryview(buf)
+        pos = _HEADER.size
+        self.meta: Dict[str, Any] = codec.loads(bytes(mv[pos:pos + meta_len]))
+        pos += meta_len
+        self.n_columnar = n
+        self.n_overflow = n_over
+        self._views: Dict[str, memoryview] = {}
+        self._dicts: Dict[str, List[Any]] = {}
+        self._blobs: Dict[str, Tuple[memoryview, memoryview, bool]] = {}
+        for col in self.meta["columns"]:
+            name = col["name"]
+            pos = _align(pos)
+            rows = n + 1 if "blob" in col else n
+            size = rows * struct.calcsize(col["type"])
+            self._views[name] = mv[pos:pos + size].cast(col["type"])
+            pos += size
+            if "values" in col:
+                self._dicts[name] = col["values"]
+            elif "blob" in col:
+                offsets = self._views[name]
+                pos = _align(pos)
+                self._blobs[name] = (offsets, mv[pos:pos + offsets[n]], col["blob"] == "json")
+                pos += offsets[n]
+        pos = _align(pos)
+        self._over_pos = mv[pos:pos + 8 * n_over].cast("q")
+        pos = _align(pos + 8 * n_over)
+        self._over_off = mv[pos:pos + 8 * (n_over + 1)].cast("q")
+        pos = _align(pos + 8 * (n_over + 1))
+        self._over_blob = mv[pos:pos + (self._over_off[n_over] if n_over else 0)]
+
+    def __len__(self) -> int:
+        return self.n_columnar + self.n_overflow
+
+    # --- columns ------------------------------------------------------------------
+
+    @property
+    def columns(self) -> List[str]:
+        return [c["name"] for c in self.meta["columns"]]
+
+    def column(self, name: str) -> memoryview:
+        """Typed view of a column (codes for dictionary columns, n + 1 byte
+        offsets for blob columns); "seq" = produced_ticks."""
+        return self._views["produced_ticks" if name == "seq" else name]
+
+    def array(self, name: str):
+        """column() as a zero-copy numpy array (requires numpy); stays valid
+        after close()."""
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        return np.frombuffer(self.column(name), dtype=self.column(name).format)
+
+    def dictionary(self, name: str) -> List[Any]:
+        return self._dicts[name]
+
+    def code_of(self, name: str, value: Any) -> Optional[int]:
+        for i, v in enumerate(self._dicts[name]):
+            if v == value:
+                return i
+        return None
+
+    def value(self, name: str, i: int) -> Any:
+        """Value of column name in columnar row i (one blob value decoded)."""
+        name = "produced_ticks" if name == "seq" else name
+        blob = self._blobs.get(name)
+        if blob is not None:
+            offsets, data, is_json = blob
+            raw = bytes(data[offsets[i]:offsets[i + 1]])
+            return codec.loads(raw) if is_json else raw.decode("utf-8")
+        values = self._dicts.get(name)
+        code = self._views[name][i]
+        return code if values is None else values[code]
+
+    def decoded(self, name: str) -> List[Any]:
+        """Column values (dictionary columns expanded; shared list values not copied)."""
+        name = "produced_ticks" if name == "seq" else name
+        blob = self._blobs.get(name)
+        if blob is not None:
+            offsets, data, is_json = blob
+            off, raw = offsets.tolist(), bytes(data)
+            parts = [raw[off[i]:off[i + 1]] for i in range(self.n_columnar)]
+            return [codec.loads(b) if is_json else b.decode("utf-8") for b in parts]
+        view = self.column(name)
+        values = self._dicts.get(name)
+        return view.tolist() if values is None else [values[c] for c in view]
+
+    def select(self, *, stream_id: Any = None, state: Any = None, mode: Any = None,
+               since: Optional[float] = None, until: Optional[float] = None) -> List[int]:
+        """
+        Columnar row indexes matching all given filters. Dictionary filters
+        take a value or a collection of values; since/until are inclusive
+        bounds in any form beacon_index.to_epoch_ms() takes (ISO string,
+        epoch s / ms, datetime), as in beacon_index.query(). Only the
+        filtered columns are read.
+        """
+        conds: List[Tuple[str, Any]] = []
+        for name, want in (("stream_id", stream_id), ("state", state), ("mode", mode)):
+            if want is None:
+                continue
+            wanted = [want] if isinstance(want, str) else list(want)
+            conds.append((name, {i for i, v in enumerate(self._dicts[name]) if v in wanted}))
+        lo, hi = to_epoch_ms(since), to_epoch_ms(until)
+        if np is not None:
+            mask = np.ones(self.n_columnar, dtype=bool)
+            for name, codes in conds:
+                mask &= np.isin(self.array(name), list(codes))
+            if lo is not None or hi is not None:
+                ts = self.array("ts")
+                if lo is not None:
+                    mask &= ts >= lo
+                if hi is not None:
+                    mask &= ts <= hi
+            return np.flatnonzero(mask).tolist()
+        rows: Iterable[int] = range(self.n_columnar)
+        for name, codes in conds:
+            view = self._views[name]
+            rows = [i for i in rows if view[i] in codes]
+        if lo is not None or hi is not None:
+            ts = self._views["ts"]
+            lo_ = _INT64[0] if lo is None else lo
+            hi_ = _INT64[1] if hi is None else hi
+            rows = [i for i in rows if lo_ <= ts[i] <= hi_]
+        return list(rows)
+
+    # --- records ------------------------------------------------------------------
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """Columnar row i as the dict seeking.beacon_dict() produced."""
+        return _build(*(self.value(name, i) for name, _ in COLUMNS))
+
+    def overflow(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(original position, record) for beacons kept verbatim."""
+        off = self._over_off
+        for j in range(self.n_overflow):
+            yield self._over_pos[j], codec.loads(bytes(self._over_blob[off[j]:off[j + 1]]))
+
+    def _columnar(self, rows: Optional[Sequence[int]]) -> Iterator[Dict[str, Any]]:
+        # Whole columns as lists (one C-level copy each), then plain indexing.
+        cols = [self.decoded(name) for name, _ in COLUMNS]
+        if rows is None:
+            for row in zip(*cols):
+                yield _build(*row)
+        else:
+            for i in rows:
+                yield _build(*(col[i] for col in cols))
+
+    def records(self, rows: Optional[Sequence[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Given columnar rows, or every record in original file order."""
+        if rows is not None:
+            if len(rows) * 16 < self.n_columnar:
+                yield from map(self.record, rows)  # cheaper than materialising columns
+            else:
+                yield from self._columnar(rows)
+            return
+        columnar = self._columnar(None)
+        out = 0
+        for pos, rec in self.overflow():
+            while out < pos:
+                yield next(columnar)
+                out += 1
+            yield rec
+            out += 1
+        yield from columnar
+
+    # --- lifecycle ----------------------------------------------------------------
+
+    def close(self) -> None:
+        """
+        Release the column views, unmap and close the file. Arrays returned
+        by array() that are still alive keep their views (and the mapping)
+        valid; the mapping is then freed with the last of them. The file is
+        closed either way.
+        """
+        views = [*self._views.values(), *(data for _, data, _ in self._blobs.values()),
+                 self._over_pos, self._over_off, self._over_blob]
+        self._views = {}
+        self._blobs = {}
+        mm, self._mm = self._mm, None
+        f, self._file = self._file, None
+        try:
+            for view in views:
+                try:
+                    view.release()
+                except BufferError:
+                    pass  # exported to a live numpy array
+            if mm is not None:
+                try:
+                    mm.close()
+                except BufferError:
+                    pass
+        finally:
+            if f is not None:
+                f.close()
+
+    def __enter__(self) -> "BeaconArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_archive(path: str | os.PathLike) -> BeaconArchive:
+    """Memory-map an archive file."""
+    f = open(path, "rb")
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except BaseException:
+        f.close()
+        raise
+    try:
+        return BeaconArchive(mm, _mm=mm, _file=f)
+    except BaseException:
+        mm.close()
+        f.close()
+        raise
+
+
+# --- Analytics --------------------------------------------------------------------
+
+def summarize(archives: Iterable[BeaconArchive]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per state: beacon count, mean loneliness_ratio and median cadence (seconds
+    since the same stream's previous beacon, attributed to the later beacon's
+    state). Archives should be given oldest first; only columns are read.
+    """
+    acc: Dict[str, List[Any]] = {}  # state -> [count, ratio sum, gaps]
+    last: Dict[str, int] = {}  # stream_id -> ts of previous beacon
+    for a in archives:
+        states = a.dictionary("state")
+        streams = a.dictionary("stream_id")
+        st, sid = a.column("state"), a.column("stream_id")
+        ts, ratio = a.column("ts"), a.column("loneliness_ratio")
+        order = range(len(ts))
+        if any(ts[i] > ts[i + 1] for i in range(len(ts) - 1)):
+            order = sorted(order, key=ts.__getitem__)
+        for i in order:
+            row = acc.setdefault(states[st[i]], [0, 0.0, []])
+            row[0] += 1
+            row[1] += ratio[i]
+            stream = streams[sid[i]]
+            prev = last.get(stream)
+            if prev is not None:
+                row[2].append((ts[i] - prev) / 1000)
+            last[stream] = ts[i]
+    out = {}
+    for state, (count, ratio_sum, gaps) in sorted(acc.items()):
+        gaps.sort()
+        out[state] = {
+            "beacons": count,
+            "mean_loneliness_ratio": round(ratio_sum / count, 5),
+            "median_cadence_s": gaps[len(gaps) // 2] if gaps else None,
+        }
+    return out
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Columnar beacon archives")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("export", help="archive every rotated segment of a beacon file")
+    e.add_argument("active")
+    e.add_argument("--out-dir")
+    e.add_argument("--force", action="store_true", help="rewrite up-to-date archives too")
+    c = sub.add_parser("convert", help="archive one JSONL(.gz) file")
+    c.add_argument("src")
+    c.add_argument("out", nargs="?")
+    d = sub.add_parser("dump", help="write an archive back as JSONL")
+    d.add_argument("archive")
+    d.add_argument("--out", help="default: stdout")
+    s = sub.add_parser("stats", help="per-state counts, loneliness and cadence")
+    s.add_argument("archives", nargs="+")
+    args = ap.parse_args()
+
+    if args.cmd == "export":
+        for p in export_segments(args.active, args.out_dir, args.force):
+            print(f"[beacon_archive] wrote {p} ({p.stat().st_size} bytes)")
+    elif args.cmd == "convert":
+        p = convert(args.src, args.out)
+        with open_archive(p) as a:
+            print(f"[beacon_archive] wrote {p} rows={a.n_columnar} overflow={a.n_overflow} "
+                  f"skipped={a.meta['skipped']} bytes={p.stat().st_size}")
+    elif args.cmd == "dump":
+        out = (open(args.out, "wb") if args.out
+               else open(sys.stdout.fileno(), "wb", buffering=1 << 20, closefd=False))
+        with open_archive(args.archive) as a, out:
+            for rec in a.records():
+                out.write(codec.dumpb(rec) + b"\n")
+    else:
+        archives = [open_archive(p) for p in args.archives]
+        try:
+            print(codec.dumps_pretty(summarize(archives)))
+        finally:
+            for a in archives:
+                a.close()
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = [
+    "BeaconArchive",
+    "COLUMNS",
+    "SUFFIX",
+    "archive_path",
+    "convert",
+    "encode",
+    "export_segments",
+    "ms_to_ts",
+    "open_archive",
+    "summarize",
+    "ts_to_ms",
+]
@@ -0,0 +1,890 @@
+"""
+Beacon broker: fan-in of beacons from many hosts over a socket.
+
+Producers and listeners that do not share a filesystem cannot meet in
+beacons.jsonl. A broker process owns the file instead: producers publish
+batches of beacon lines to it over a Unix or TCP socket, it appends them
+with a BeaconWriter (same JSONL layout, rotation and index settings as
+append_beacon) and pushes each batch to its subscribers, optionally only
+the lines of some stream_ids.
+
+Wire format (both directions), one frame =
+  <payload length: u32 big-endian> <kind: 1 byte> <payload>
+
+  P  publish    producer -> broker    beacon lines, each ending in b"\\n"
+  F  flush      producer -> broker    empty; answered with K once everything
+                                      the connection published before is written
+  S  subscribe  listener -> broker    JSON {"stream_ids": [...]} (null = all);
+                                      answered with K once registered
+  K  ack        broker -> client      empty
+  D  data       broker -> listener    beacon lines
+
+Lines are stored and forwarded as produced (e.g. SeekingFleet.update(
+lines=True)); the broker does not decode them unless the writer keeps an
+index or a subscriber filters on a stream id it cannot spot cheaply.
+
+Addresses: "unix:/path/broker.sock", "tcp:host:port" or "host:port".
+With NOISE_SEEK_BROKER set, append_beacon publishes there (batched by a
+shared BrokerPublisher) instead of writing its path.
+
+In-process stand-in: a BeaconBroker needs no server. connect(broker) and
+subscribe(broker) return the same publisher / subscription types as for a
+socket address, so tests and single-host setups run without one.
+
+Run (from repo root):
+  python -m core.beacon_broker --listen unix:runtime/broker.sock
+  python -m core.beacon_broker --listen 0.0.0.0:8788 --path runtime/beacons.jsonl --every 10
+"""
+
+from __future__ import annotations
+import argparse
+import atexit
+import collections
+import os
+import select
+import signal
+import socket
+import socketserver
+import struct
+import threading
+import time
+import weakref
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from core import codec
+from core.beacon_writer import BeaconWriter
+
+BEACON_PATH = os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl")
+DEFAULT_PORT = int(os.getenv("NOISE_SEEK_BROKER_PORT", 8788))
+BATCH_BYTES = int(os.getenv("NOISE_SEEK_BROKER_BATCH_BYTES", 64 * 1024))
+MAX_DELAY_S = float(os.getenv("NOISE_SEEK_BROKER_DELAY_MS", 5)) / 1000
+QUEUE_BYTES = int(os.getenv("NOISE_SEEK_BROKER_QUEUE_BYTES", 64 << 20))
+SEND_QUEUE_BYTES = int(os.getenv("NOISE_SEEK_BROKER_SEND_QUEUE_BYTES", 16 << 20))
+
+MAX_FRAME = 16 << 20
+PUBLISH, FLUSH, SUBSCRIBE, ACK, DATA = b"PFSKD"
+CONNECT_TIMEOUT_S = 5.0
+RECONNECT_S = 1.0  # after a failed connect, batches are dropped for this long
+
+_HEADER = struct.Struct("!IB")
+
+
+class ProtocolError(ValueError):
+    """Malformed or unexpected frame."""
+
+
+# --- Frames / addresses -------------------------------------------------------------
+
+def encode_frame(kind: int, payload: bytes = b"") -> bytes:
+    if len(payload) > MAX_FRAME:
+        raise ProtocolError(f"frame of {len(payload)} bytes exceeds {MAX_FRAME}")
+    return _HEADER.pack(len(payload), kind) + payload
+
+
+def read_frame(rfile) -> Optional[Tuple[int, bytes]]:
+    """Next (kind, payload) from a buffered binary file; None on a clean EOF."""
+    head = rfile.read(_HEADER.size)
+    if not head:
+        return None
+    if len(head) < _HEADER.size:
+        raise ProtocolError("truncated frame header")
+    n, kind = _HEADER.unpack(head)
+    if n > MAX_FRAME:
+        raise ProtocolError(f"frame of {n} bytes exceeds {MAX_FRAME}")
+    payload = rfile.read(n) if n else b""
+    if len(payload) < n:
+        raise ProtocolError("truncated frame")
+    return kind, payload
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """(socket family, sockaddr) for "unix:PATH", "tcp:HOST:PORT" or "HOST:PORT"."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[5:]
+    if address.startswith("tcp:"):
+        address = address[4:]
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"broker address must be unix:PATH or [tcp:]HOST:PORT, got {address!r}")
+    return socket.AF_INET, (host.strip("[]") or "127.0.0.1", int(port))
+
+
+def open_socket(address: str, timeout_s: Optional[float] = CONNECT_TIMEOUT_S) -> socket.socket:
+    family, addr = parse_address(address)
+    if family == socket.AF_UNIX:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout_s)
+        try:
+            sock.connect(addr)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    sock = socket.create_connection(addr, timeout=timeout_s)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+_SID_KEY = b'"stream_id":"'
+
+
+def line_stream_id(line: bytes) -> Optional[str]:
+    """stream_id of an encoded beacon line, without decoding the usual compact
+    top-level form (`..."stream_id":"abc"...` before any nested object)."""
+    i = line.find(_SID_KEY)
+    if i > 0:
+        start = i + len(_SID_KEY)
+        end = line.find(b'"', start)
+        head = line[1:i]
+        if end > 0 and b"{" not in head and b"[" not in head and b"\\" not in line[start:end]:
+            return line[start:end].decode("utf-8", "replace")
+    try:
+        beacon = codec.loads(line)
+    except ValueError:
+        return None
+    sid = beacon.get("stream_id") if isinstance(beacon, dict) else None
+    return sid if isinstance(sid, str) else None
+
+
+def _split_lines(payload: bytes) -> List[bytes]:
+    """Non-blank lines of payload, each ending in b"\\n"."""
+    parts = payload.split(b"\n")
+    last = parts.pop()
+    lines = [p + b"\n" for p in parts if p and not p.isspace()]
+    if last and not last.isspace():
+        lines.append(last + b"\n")
+    return lines
+
+
+# --- Broker -------------------------------------------------------------------------
+
+class _Outbox:
+    """Bounded queue of line blocks for one subscription."""
+
+    def __init__(self, stream_ids: Optional[Iterable[str]] = None, max_bytes: int = QUEUE_BYTES):
+        self.stream_ids = frozenset(stream_ids) if stream_ids is not None else None
+        self.max_bytes = max_bytes
+        self.overflowed = False
+        self.closed = False
+        self._items: List[bytes] = []
+        self._bytes = 0
+        self._cond = threading.Condition()
+
+    def put(self, block: bytes) -> bool:
+        """Queue block; on overflow the outbox closes (what is queued is kept)."""
+        with self._cond:
+            if self.closed:
+                return False
+            if self._bytes + len(block) > self.max_bytes:
+                self.overflowed = self.closed = True
+                self._cond.notify_all()
+                return False
+            self._items.append(block)
+            self._bytes += len(block)
+            self._cond.notify()
+            return True
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._items or self.closed, timeout)
+
+    def take(self, timeout: Optional[float] = 0.0) -> Optional[List[bytes]]:
+        """Queued blocks ([] after timeout), None once closed and drained."""
+        with self._cond:
+            if not self._items and not self.closed and timeout != 0:
+                self._cond.wait_for(lambda: self._items or self.closed, timeout)
+            items, self._items, self._bytes = self._items, [], 0
+            if not items and self.closed:
+                return None
+            return items
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class BeaconBroker:
+    """
+    Persists published beacon lines and pushes them to subscriptions.
+
+    publish() appends one batch to the beacon file (flushed, so file
+    followers see it too) and hands it to every subscription under one
+    lock: subscribers receive batches in file order. A subscriber whose
+    queue passes queue_bytes is dropped (it can catch up from the file)
+    rather than blocking producers.
+    """
+
+    def __init__(self, path: str | os.PathLike = BEACON_PATH, *,
+                 writer: Optional[BeaconWriter] = None, queue_bytes: int = QUEUE_BYTES):
+        if writer is None:
+            from core import beacon_writer
+
+            writer = BeaconWriter(path, max_buffer_bytes=1 << 20, durability="flush",
+                                  rotate_bytes=beacon_writer.ROTATE_BYTES,
+                                  rotate_age_s=beacon_writer.ROTATE_AGE_S,
+                                  compress=beacon_writer.ROTATE_COMPRESS,
+                                  index_every=beacon_writer.INDEX_EVERY)
+        self.writer = writer
+        self.path = writer.path
+        self.queue_bytes = queue_bytes
+        self._lock = threading.Lock()
+        self._boxes: List[_Outbox] = []
+        self.batches = 0
+        self.beacons = 0
+        self.bytes = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, payload: bytes) -> int:
+        """Persist and fan out the beacon lines in payload; returns how many."""
+        lines = _split_lines(payload)
+        if not lines:
+            return 0
+        block = b"".join(lines)
+        dropped = 0
+        with self._lock:
+            self.writer.write_lines(lines)
+            self.writer.flush()
+            self.batches += 1
+            self.beacons += len(lines)
+            self.bytes += len(block)
+            if self._boxes:
+                dropped = self._fan_out_locked(lines, block)
+        for _ in range(dropped):  # printed outside the lock: stdout may block
+            print(f"[beacon_broker] subscriber fell {self.queue_bytes} bytes behind; dropped")
+        return len(lines)
+
+    def subscribe(self, stream_ids: Optional[Iterable[str]] = None) -> "Subscription":
+        """In-process subscription to beacons published from now on."""
+        return Subscription(self._attach(stream_ids), self._detach)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": str(self.path), "batches": self.batches, "beacons": self.beacons,
+                    "bytes": self.bytes, "subscribers": len(self._boxes),
+                    "dropped_subscribers": self.dropped_subscribers}
+
+    def close(self) -> None:
+        with self._lock:
+            boxes, self._boxes = self._boxes, []
+        for box in boxes:
+            box.close()
+        self.writer.close()
+
+    def _attach(self, stream_ids: Optional[Iterable[str]] = None) -> _Outbox:
+        box = _Outbox(stream_ids, self.queue_bytes)
+        with self._lock:
+            self._boxes.append(box)
+        return box
+
+    def _detach(self, box: _Outbox) -> None:
+        box.close()
+        with self._lock:
+            if box in self._boxes:
+                self._boxes.remove(box)
+
+    def _fan_out_locked(self, lines: List[bytes], block: bytes) -> int:
+        """Queue the batch for each subscriber; returns how many overflowed and were dropped."""
+        sids: Optional[List[Optional[str]]] = None
+        dropped: List[_Outbox] = []
+        for box in self._boxes:
+            if box.stream_ids is None:
+                data = block
+            else:
+                if sids is None:
+                    sids = [line_stream_id(line) for line in lines]
+                wanted = box.stream_ids
+                data = b"".join(line for line, sid in zip(lines, sids) if sid in wanted)
+                if not data:
+                    continue
+            if not box.put(data) and box.overflowed:
+                dropped.append(box)
+        for box in dropped:
+            self._boxes.remove(box)
+        self.dropped_subscribers += len(dropped)
+        return len(dropped)
+
+
+# --- Subscriptions ------------------------------------------------------------------
+
+class Subscription:
+    """
+    Beacons pushed by a broker, read like a BeaconFollower: read_lines()
+    returns new raw lines (without newline), poll() decoded beacons, and
+    iterating yields beacons until the subscription closes.
+    """
+
+    def __init__(self, box: _Outbox, on_close=None):
+        self._box = box
+        self._on_close = on_close
+
+    @property
+    def closed(self) -> bool:
+        """True once the broker side is gone or close() was called; lines queued
+        before that can still be read."""
+        return self._box.closed
+
+    @property
+    def overflowed(self) -> bool:
+        return self._box.overflowed
+
+    def read_lines(self, timeout: Optional[float] = 0.0) -> List[bytes]:
+        """New complete non-blank lines; waits up to timeout (None = forever) for some."""
+        blocks = self._box.take(timeout)
+        if not blocks:
+            return []
+        return [raw for raw in b"".join(blocks).split(b"\n") if raw.strip()]
+
+    def poll(self, timeout: Optional[float] = 0.0) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for raw in self.read_lines(timeout):
+            try:
+                out.append(codec.loads(raw))
+            except ValueError:
+                continue
+        return out
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        self._box.wait(timeout)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            blocks = self._box.take(None)
+            if blocks is None:
+                return
+            for raw in b"".join(blocks).split(b"\n"):
+                if raw.strip():
+                    try:
+                        yield codec.loads(raw)
+                    except ValueError:
+                        continue
+
+    def close(self) -> None:
+        if self._on_close is not None:
+            self._on_close(self._box)
+        self._box.close()
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BrokerSubscriber(Subscription):
+    """Subscription over a socket: a reader thread queues incoming D frames."""
+
+    def __init__(self, address: str, stream_ids: Optional[Iterable[str]] = None, *,
+                 queue_bytes: int = QUEUE_BYTES, timeout_s: float = CONNECT_TIMEOUT_S):
+        super().__init__(_Outbox(None, queue_bytes))
+        self.address = address
+        self._sock = open_socket(address, timeout_s)
+        self._rfile = self._sock.makefile("rb")
+        try:
+            body = {"stream_ids": sorted(stream_ids) if stream_ids is not None else None}
+            self._sock.sendall(encode_frame(SUBSCRIBE, codec.dumpb(body)))
+            frame = read_frame(self._rfile)
+            if frame is None or frame[0] != ACK:
+                raise ProtocolError(f"broker {address} did not acknowledge the subscription")
+            self._sock.settimeout(None)
+        except Exception:
+            self._shutdown()
+            raise
+        self._thread = threading.Thread(target=self._read_loop, name="beacon-broker-subscriber",
+                                        daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._box.close()
+        self._shutdown()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+
+    def _read_loop(self) -> None:
+        box = self._box
+        try:
+            while not box.closed:
+                frame = read_frame(self._rfile)
+                if frame is None:
+                    break
+                kind, payload = frame
+                if kind != DATA:
+                    raise ProtocolError(f"unexpected frame {chr(kind)!r} from broker")
+                if not box.put(payload):
+                    break
+        except (OSError, ValueError) as e:
+            if not box.closed:
+                print(f"[beacon_broker] subscription to {self.address} lost: {e}")
+        finally:
+            box.close()
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._rfile.close()
+        self._sock.close()
+
+
+def subscribe(target: Union[str, BeaconBroker],
+              stream_ids: Optional[Iterable[str]] = None) -> Subscription:
+    """Subscribe to a broker address or an in-process BeaconBroker."""
+    if isinstance(target, BeaconBroker):
+        return target.subscribe(stream_ids)
+    return BrokerSubscriber(target, stream_ids)
+
+
+# --- Publishing ---------------------------------------------------------------------
+
+class _LocalTransport:
+    def __init__(self, broker: BeaconBroker):
+        self.broker = broker
+
+    def send(self, payload: bytes) -> None:
+        self.broker.publish(payload)
+
+    def sync(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _SocketTransport:
+    def __init__(self, address: str, timeout_s: float = CONNECT_TIMEOUT_S):
+        parse_address(address)  # fail fast on a malformed address
+        self.address = address
+        self.timeout_s = timeout_s
+        self._sock: Optional[socket.socket] = None
+        self._rfile = None
+        self._retry_at = 0.0
+
+    def send(self, payload: bytes) -> None:
+        self._send(encode_frame(PUBLISH, payload))
+
+    def sync(self) -> None:
+        self._send(encode_frame(FLUSH))
+        try:
+            frame = read_frame(self._rfile)
+        except (OSError, ValueError):
+            self.close()
+            raise
+        if frame is None or frame[0] != ACK:
+            self.close()
+            raise ProtocolError(f"broker {self.address} did not acknowledge the flush")
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = self._rfile = None
+
+    def _send(self, frame: bytes) -> None:
+        if self._sock is None:
+            if time.monotonic() < self._retry_at:
+                raise ConnectionError(f"broker {self.address} unavailable")
+            try:
+                self._sock = open_socket(self.address, self.timeout_s)
+            except OSError:
+                self._retry_at = time.monotonic() + RECONNECT_S
+                raise
+            self._rfile = self._sock.makefile("rb")
+        try:
+            self._sock.sendall(frame)
+        except OSError:
+            self.close()
+            raise
+
+
+_OPEN_PUBLISHERS: "weakref.WeakSet[BrokerPublisher]" = weakref.WeakSet()
+
+
+class _FlushMark:
+    """Queued behind the batches a flush() waits for; done once they were sent."""
+
+    __slots__ = ("sync", "ok", "done")
+
+    def __init__(self, sync: bool):
+        self.sync = sync
+        self.ok = True
+        self.done = False
+
+
+class BrokerPublisher:
+    """
+    Batching producer for a broker address or an in-process BeaconBroker.
+
+    Lines are collected into a batch that is closed once batch_bytes are
+    pending or max_delay_s after its first line (0: as soon as the sender
+    is free). Closed batches wait in a send queue of at most queue_bytes
+    and go out as one P frame each from a background thread, which does
+    all socket I/O; publishing never waits for the network. Like
+    BeaconWriter, delivery is best-effort: a batch that finds the queue
+    full (reported once until it drains) or cannot be sent (reported once
+    until the broker is reachable again) is dropped and counted in
+    `dropped`; reconnects are attempted at most every RECONNECT_S.
+    flush(sync=True) waits until the broker has written everything
+    published so far.
+    """
+
+    def __init__(self, target: Union[str, BeaconBroker], *, batch_bytes: int = BATCH_BYTES,
+                 max_delay_s: float = MAX_DELAY_S, queue_bytes: int = SEND_QUEUE_BYTES):
+        if batch_bytes > MAX_FRAME:
+            raise ValueError(f"batch_bytes must be at most {MAX_FRAME}, got {batch_bytes}")
+        self.target = target
+        self.batch_bytes = batch_bytes
+        self.max_delay_s = max_delay_s
+        self.queue_bytes = queue_bytes
+        self._transport = (_LocalTransport(target) if isinstance(target, BeaconBroker)
+                           else _SocketTransport(target))
+        self._cond = threading.Condition()
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._deadline = 0.0
+        self._queue: Deque[Any] = collections.deque()  # (batch, n lines) or _FlushMark
+        self._queued_bytes = 0
+        self._thread: Optional[threading.Thread] = None
+        self._failing = False
+        self._overflowing = False  # reported "queue full" since the queue was last empty
+        self.closed = False
+        self.sent = 0  # lines
+        self.batches = 0
+        self.dropped = 0
+        _OPEN_PUBLISHERS.add(self)
+
+    def publish(self, beacon: Dict[str, Any]) -> int:
+        """Queue one beacon; returns the encoded line length in bytes."""
+        return self.publish_line(codec.dumpb(beacon) + b"\n")
+
+    def publish_line(self, line: bytes) -> int:
+        """Queue one encoded line ending in b"\\n"; returns its length."""
+        with self._cond:
+            self._append_locked(line)
+        return len(line)
+
+    def publish_lines(self, lines: Iterable[bytes]) -> None:
+        """Queue encoded lines, e.g. a BeaconScheduler(lines=True) pass."""
+        with self._cond:
+            for line in lines:
+                self._append_locked(line)
+
+    def flush(self, sync: bool = False) -> bool:
+        """Send pending lines now and wait until they are out; with sync, also
+        wait for the broker to write them. False if something was dropped on
+        the way."""
+        with self._cond:
+            if self.closed:
+                return True
+            dropped = self.dropped
+            self._seal_locked(force=True)
+            mark = _FlushMark(sync)
+            self._queue.append(mark)
+            self._wake_locked()
+            while not mark.done:
+                self._cond.wait()
+            return mark.ok and self.dropped == dropped
+
+    def close(self) -> None:
+        """Send what is queued (waiting up to CONNECT_TIMEOUT_S) and disconnect."""
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            if self._pending or self._queue:
+                self._wake_locked()
+            thread = self._thread
+            self._cond.notify_all()
+        _OPEN_PUBLISHERS.discard(self)
+        if thread is None:
+            self._transport.close()
+        else:
+            thread.join(timeout=CONNECT_TIMEOUT_S)
+
+    def __enter__(self) -> "BrokerPublisher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Internal -----------------------------------------------------------
+
+    def _append_locked(self, line: bytes) -> None:
+        if self.closed:
+            raise ValueError("BrokerPublisher is closed")
+        if len(line) > MAX_FRAME:
+            raise ValueError(f"beacon line of {len(line)} bytes exceeds {MAX_FRAME}")
+        if self._pending_bytes + len(line) > MAX_FRAME:
+            self._seal_locked()
+        self._pending.append(line)
+        self._pending_bytes += len(line)
+        if self._pending_bytes >= self.batch_bytes:
+            self._seal_locked()
+        elif len(self._pending) == 1:
+            self._deadline = time.monotonic() + self.max_delay_s
+            self._wake_locked()
+
+    def _seal_locked(self, force: bool = False) -> None:
+        """Move the pending lines to the send queue as one batch; drop them
+        if the queue is full (unless force: flush/close wait for it anyway)."""
+        if not self._pending:
+            return
+        n = len(self._pending)
+        batch = b"".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        if not force and self._queued_bytes + len(batch) > self.queue_bytes:
+            self.dropped += n
+            if not self._overflowing:
+                self._overflowing = True
+                print(f"[beacon_broker] send queue for {self.target} full "
+                      f"({self.queue_bytes} bytes); dropping beacons")
+            return
+        self._queue.append((batch, n))
+        self._queued_bytes += len(batch)
+        self._wake_locked()
+
+    def _wake_locked(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._send_loop,
+                                            name="beacon-broker-publisher", daemon=True)
+            self._thread.start()
+        self._cond.notify_all()  # flush() waiters share the condition
+
+    def _report_locked(self, error: Any, n: int) -> None:
+        self.dropped += n
+        if not self._failing:
+            self._failing = True
+            print(f"[beacon_broker] publish error ({self.target}): {error}; dropping beacons")
+
+    def _next_locked(self) -> Any:
+        """Next queued item, closing the pending batch when it is due;
+        None once closed and drained."""
+        while True:
+            if self._queue:
+                item = self._queue.popleft()
+                if not isinstance(item, _FlushMark):
+                    self._queued_bytes -= len(item[0])
+                if not self._queue:
+                    self._overflowing = False
+                return item
+            if self._pending:
+                delay = self._deadline - time.monotonic()
+                if delay <= 0 or self.closed:
+                    self._seal_locked(force=True)
+                else:
+                    self._cond.wait(delay)
+                continue
+            if self.closed:
+                return None
+            self._cond.wait()
+
+    def _send_loop(self) -> None:
+        while True:
+            with self._cond:
+                item = self._next_locked()
+            if item is None:
+                self._transport.close()
+                return
+            error = None
+            if isinstance(item, _FlushMark):
+                if item.sync:
+                    try:
+                        self._transport.sync()
+                    except (OSError, ValueError) as e:
+                        error = e
+                with self._cond:
+                    if error is not None:
+                        self._report_locked(error, 0)
+                        item.ok = False
+                    item.done = True
+                    self._cond.notify_all()
+                continue
+            batch, n = item
+            try:
+                self._transport.send(batch)
+            except (OSError, ValueError) as e:
+                error = e
+            with self._cond:
+                if error is not None:
+                    self._report_locked(error, n)
+                    continue
+                if self._failing:
+                    self._failing = False
+                    print(f"[beacon_broker] publishing to {self.target} again")
+                self.sent += n
+                self.batches += 1
+
+
+def connect(target: Union[str, BeaconBroker], **kwargs) -> BrokerPublisher:
+    """Publisher for a broker address or an in-process BeaconBroker."""
+    return BrokerPublisher(target, **kwargs)
+
+
+def _close_all_publishers():
+    for p in list(_OPEN_PUBLISHERS):
+        try:
+            p.close()
+        except Exception as e:
+            print(f"[beacon_broker] close error: {e}")
+
+
+atexit.register(_close_all_publishers)
+
+
+# --- Server -------------------------------------------------------------------------
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        broker: BeaconBroker = self.server.broker
+        sock = self.request
+        if sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        rfile = sock.makefile("rb", buffering=256 * 1024)
+        try:
+            while True:
+                frame = read_frame(rfile)
+                if frame is None:
+                    return
+                kind, payload = frame
+                if kind == PUBLISH:
+                    broker.publish(payload)
+                elif kind == FLUSH:
+                    sock.sendall(encode_frame(ACK))
+                elif kind == SUBSCRIBE:
+                    self._push(broker, sock, payload)
+                    return
+                else:
+                    raise ProtocolError(f"unknown frame kind {chr(kind)!r}")
+        except (OSError, ValueError) as e:
+            print(f"[beacon_broker] connection {self.client_address or 'unix'}: {e}")
+
+    def _push(self, broker: BeaconBroker, sock: socket.socket, payload: bytes) -> None:
+        body = codec.loads(payload) if payload else {}
+        stream_ids = body.get("stream_ids") if isinstance(body, dict) else None
+        if stream_ids is not None and not (isinstance(stream_ids, list)
+                                           and all(isinstance(s, str) for s in stream_ids)):
+            raise ProtocolError("subscribe: stream_ids must be a list of strings or null")
+        box = broker._attach(stream_ids)
+        try:
+            sock.sendall(encode_frame(ACK))
+            while True:
+                blocks = box.take(1.0)
+                if blocks is None:
+                    return
+                if not blocks:
+                    if _peer_closed(sock):  # idle listener went away
+                        return
+                    continue
+                data = b"".join(blocks)
+                for i in range(0, len(data), MAX_FRAME):
+                    sock.sendall(encode_frame(DATA, data[i:i + MAX_FRAME]))
+        finally:
+            broker._detach(box)
+
+
+def _peer_closed(sock: socket.socket) -> bool:
+    readable, _, _ = select.select([sock], [], [], 0)
+    if not readable:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except OSError:
+        return True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(broker: BeaconBroker, address: str):
+    """Socket server for broker on address (not started; call serve_forever())."""
+    family, addr = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(addr):
+            os.unlink(addr)  # stale socket from a previous run
+        server = _UnixServer(addr, _Handler)
+    else:
+        server = _TCPServer(addr, _Handler)
+    server.broker = broker
+    return server
+
+
+def server_address(server) -> str:
+    """The bound address of a make_server() server, in connect() form."""
+    if isinstance(server, _UnixServer):
+        return f"unix:{server.server_address}"
+    host, port = server.server_address[:2]
+    return f"{host}:{port}"
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(address: str, path: str = BEACON_PATH, *, every_s: float = 0.0) -> None:
+    broker = BeaconBroker(path)
+    server = make_server(broker, address)
+    try:
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+    except ValueError:
+        pass  # not the main thread
+    stop = threading.Event()
+    if every_s > 0:
+        def report():
+            while not stop.wait(every_s):
+                print(f"[beacon_broker] {codec.dumps(broker.stats())}")
+        threading.Thread(target=report, daemon=True).start()
+    print(f"[beacon_broker] listening on {server_address(server)}, writing {broker.path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        broker.close()
+        family, addr = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+        print(f"[beacon_broker] stopped {codec.dumps(broker.stats())}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Beacon broker: socket fan-in to beacons.jsonl")
+    ap.add_argument("--listen",
+                    default=os.getenv("NOISE_SEEK_BROKER") or f"127.0.0.1:{DEFAULT_PORT}",
+                    help="unix:PATH or [tcp:]HOST:PORT (default NOISE_SEEK_BROKER)")
+    ap.add_argument("--path", default=BEACON_PATH, help="Beacon file to append to")
+    ap.add_argument("--every", type=float, default=0.0, help="Print stats every S seconds")
+    args = ap.parse_args(argv)
+    serve(args.listen, args.path, every_s=args.every)
+    return 0
+
+
+__all__ = [
+    "BeaconBroker",
+    "BrokerPublisher",
+    "BrokerSubscriber",
+    "DEFAULT_PORT",
+    "ProtocolError",
+    "Subscription",
+    "connect",
+    "encode_frame",
+    "line_stream_id",
+    "make_server",
+    "parse_address",
+    "read_frame",
+    "serve",
+    "server_address",
+    "subscribe",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
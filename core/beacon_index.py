@@ -0,0 +1,313 @@
+"""
+Sparse offset index for beacon history.
+
+Sidecar `<file>.idx` (JSONL) next to beacons.jsonl and each rotated
+segment; one record per block of up to K beacon lines:
+
+  {"o": start, "e": end, "n": lines, "t0": min_ts_ms, "t1": max_ts_ms,
+   "s": {stream_id: [offset relative to start, ...]}}
+
+t0/t1 are epoch milliseconds normalised from either ISO `ts` strings
+(seeking._iso_ts) or epoch-ms ints (smoke_beacons.py); blocks without any
+parseable ts have null bounds and are never skipped. Lines after the last
+indexed block are scanned linearly, so the index may lag behind the data.
+
+BeaconWriter(index_every=K) maintains the sidecar incrementally (single
+writer per file); build_index() (re)builds it for an existing file.
+query() uses it to read only blocks whose time range / stream lists match.
+"""
+
+from __future__ import annotations
+import datetime
+import gzip
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core import beacon_segments, codec
+
+DEFAULT_EVERY = 256
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+# Numbers below this are taken as epoch seconds, above as epoch ms.
+_MS_THRESHOLD = 100_000_000_000
+
+_iso_cache: Tuple[Optional[str], int] = (None, 0)
+
+
+def index_path(data_path: str | os.PathLike) -> Path:
+    p = Path(data_path)
+    return p.with_name(p.name + ".idx")
+
+
+def to_epoch_ms(ts: Any) -> Optional[int]:
+    """Epoch ms from an ISO-8601 string, epoch s / ms number or datetime."""
+    global _iso_cache
+    if isinstance(ts, bool) or ts is None:
+        return None
+    if isinstance(ts, (int, float)):
+        return int(ts) if abs(ts) >= _MS_THRESHOLD else int(round(ts * 1000))
+    if isinstance(ts, datetime.datetime):
+        dt = ts if ts.tzinfo else ts.replace(tzinfo=datetime.timezone.utc)
+        return (dt - _EPOCH) // datetime.timedelta(milliseconds=1)
+    if not isinstance(ts, str):
+        return None
+    # Fast path for _iso_ts output: "YYYY-MM-DDTHH:MM:SS.mmmZ"
+    if len(ts) == 24 and ts[19] == "." and ts[23] == "Z" and ts[20:23].isdigit():
+        prefix = ts[:19]
+        cached_prefix, cached_ms = _iso_cache
+        if prefix != cached_prefix:
+            ms = to_epoch_ms(datetime.datetime.fromisoformat(prefix))
+            _iso_cache = (prefix, ms)
+            cached_ms = ms
+        return cached_ms + int(ts[20:23])
+    try:
+        return to_epoch_ms(datetime.datetime.fromisoformat(
+            ts[:-1] + "+00:00" if ts.endswith("Z") else ts))
+    except ValueError:
+        return None
+
+
+class BeaconIndexer:
+    """
+    Incremental index builder for one data file.
+
+    add() is called once per line in file order (byte length + parsed
+    fields); completed blocks are kept in memory until flush(), which the
+    writer calls after the corresponding data reached the file. On
+    construction it resumes after the last indexed block, indexing any
+    lines the previous writer left unindexed (or rebuilding from scratch
+    if the sidecar does not match the data file).
+    """
+
+    def __init__(self, data_path: str | os.PathLike, every: int = DEFAULT_EVERY):
+        self.data_path = Path(data_path)
+        self.idx_path = index_path(self.data_path)
+        self.every = max(1, every)
+        self._records: List[bytes] = []
+        self._resume()
+
+    def add(self, nbytes: int, ts: Any, stream_id: Any) -> None:
+        if self._n == 0:
+            self._start = self._next
+        rel = self._next - self._start
+        self._next += nbytes
+        self._n += 1
+        ms = to_epoch_ms(ts)
+        if ms is not None:
+            if self._t0 is None or ms < self._t0:
+                self._t0 = ms
+            if self._t1 is None or ms > self._t1:
+                self._t1 = ms
+        if isinstance(stream_id, str):
+            self._streams.setdefault(stream_id, []).append(rel)
+        if self._n >= self.every:
+            self._close_block()
+
+    def flush(self, partial: bool = False) -> None:
+        """Append completed block records (and the open block if partial)."""
+        if partial and self._n:
+            self._close_block()
+        if not self._records:
+            return
+        with open(self.idx_path, "ab") as f:
+            f.write(b"".join(self._records))
+        self._records.clear()
+
+    def rotated(self, segment_path: str | os.PathLike) -> None:
+        """Data file was moved to segment_path; move the sidecar with it."""
+        self.flush(partial=True)
+        try:
+            os.replace(self.idx_path, index_path(segment_path))
+        except FileNotFoundError:
+            pass
+        self._reset(0)
+
+    # --- Internal -----------------------------------------------------------
+
+    def _reset(self, start: int) -> None:
+        self._start = self._next = start
+        self._n = 0
+        self._t0: Optional[int] = None
+        self._t1: Optional[int] = None
+        self._streams: Dict[str, List[int]] = {}
+
+    def _close_block(self) -> None:
+        rec = {"o": self._start, "e": self._next, "n": self._n,
+               "t0": self._t0, "t1": self._t1, "s": self._streams}
+        self._records.append(codec.dumpb(rec) + b"\n")
+        self._reset(self._next)
+
+    def _resume(self) -> None:
+        try:
+            size = self.data_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        start = 0
+        blocks = load_blocks(self.data_path)
+        if blocks and blocks[-1]["e"] <= size:
+            start = blocks[-1]["e"]
+        elif blocks or self.idx_path.exists():
+            self.idx_path.unlink(missing_ok=True)  # stale: data truncated/replaced
+        self._reset(start)
+        if size > start:
+            with open(self.data_path, "rb") as f:
+                f.seek(start)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partial trailing line; the writer appends after it
+                    fields = _fields(line)
+                    self.add(len(line), fields.get("ts"), fields.get("stream_id"))
+            # Skip a torn trailing line: new lines are appended after it.
+            self._next = max(self._next, size)
+            self.flush()
+
+
+def _fields(line: bytes) -> Dict[str, Any]:
+    try:
+        obj = codec.loads(line)
+    except Exception:
+        return {}
+    return obj if isinstance(obj, dict) else {}
+
+
+def load_blocks(data_path: str | os.PathLike) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    try:
+        with open(index_path(data_path), "rb") as f:
+            for line in f:
+                try:
+                    out.append(codec.loads(line))
+                except Exception:
+                    break  # torn last record
+    except FileNotFoundError:
+        pass
+    return out
+
+
+def build_index(data_path: str | os.PathLike, every: int = DEFAULT_EVERY) -> int:
+    """(Re)build the sidecar for a plain JSONL file; returns block count."""
+    index_path(data_path).unlink(missing_ok=True)
+    BeaconIndexer(data_path, every).flush(partial=True)
+    return len(load_blocks(data_path))
+
+
+# --- Query ------------------------------------------------------------------
+
+def _match(obj: Any, stream_id: Optional[str], lo: Optional[int], hi: Optional[int]) -> bool:
+    if not isinstance(obj, dict):
+        return False
+    if stream_id is not None and obj.get("stream_id") != stream_id:
+        return False
+    if lo is None and hi is None:
+        return True
+    ms = to_epoch_ms(obj.get("ts"))
+    if ms is None:
+        return False
+    return (lo is None or ms >= lo) and (hi is None or ms <= hi)
+
+
+def _overlaps(blk: Dict[str, Any], lo: Optional[int], hi: Optional[int]) -> bool:
+    t0, t1 = blk.get("t0"), blk.get("t1")
+    if t0 is None or t1 is None:
+        return True
+    return (lo is None or t1 >= lo) and (hi is None or t0 <= hi)
+
+
+def _decode_lines(data: bytes) -> Iterator[Any]:
+    for raw in data.split(b"\n"):
+        if raw.strip():
+            try:
+                yield codec.loads(raw)
+            except Exception:
+                continue
+
+
+def _query_plain(path: Path, stream_id, lo, hi) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    blocks = load_blocks(path)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if blocks and blocks[-1]["e"] > size:
+            blocks = []  # index does not describe this file; scan it all
+        for blk in blocks:
+            if not _overlaps(blk, lo, hi):
+                continue
+            if stream_id is not None:
+                rels = blk["s"].get(stream_id)
+                if not rels:
+                    continue
+                f.seek(blk["o"])
+                data = f.read(blk["e"] - blk["o"])
+                for rel in rels:
+                    end = data.find(b"\n", rel)
+                    try:
+                        obj = codec.loads(data[rel:end if end >= 0 else None])
+                    except Exception:
+                        continue
+                    if _match(obj, stream_id, lo, hi):
+                        out.append(obj)
+            else:
+                f.seek(blk["o"])
+                out.extend(o for o in _decode_lines(f.read(blk["e"] - blk["o"]))
+                           if _match(o, None, lo, hi))
+        f.seek(blocks[-1]["e"] if blocks else 0)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                try:
+                    obj = codec.loads(line)
+                except Exception:
+                    continue
+                if _match(obj, stream_id, lo, hi):
+                    out.append(obj)
+    return out
+
+
+def _query_gzip(path: Path, idx_of: Path, stream_id, lo, hi) -> List[Dict[str, Any]]:
+    blocks = load_blocks(idx_of)
+    if blocks and not any(_overlaps(b, lo, hi) for b in blocks):
+        return []
+    if blocks and stream_id is not None and not any(stream_id in b["s"] for b in blocks):
+        return []
+    with gzip.open(path, "rb") as f:
+        return [o for o in _decode_lines(f.read()) if _match(o, stream_id, lo, hi)]
+
+
+def query(path: str | os.PathLike, stream_id: Optional[str] = None,
+          since: Any = None, until: Any = None) -> List[Dict[str, Any]]:
+    """
+    Beacons (oldest first) across rotated segments and the active file with
+    since <= ts <= until (inclusive; ISO string, epoch s/ms or datetime)
+    and, if given, matching stream_id. With a time bound, beacons without a
+    parseable ts are excluded.
+    """
+    p = Path(path)
+    lo, hi = to_epoch_ms(since), to_epoch_ms(until)
+    out: List[Dict[str, Any]] = []
+    for seg in beacon_segments.list_segments(p):
+        plain = beacon_segments.segment_path(p, seg.seq)
+        gz = beacon_segments.segment_path(p, seg.seq, compressed=True)
+        try:
+            if not seg.compressed:
+                out.extend(_query_plain(plain, stream_id, lo, hi))
+                continue
+        except FileNotFoundError:
+            pass  # compressed while we were looking
+        try:
+            out.extend(_query_gzip(gz, plain, stream_id, lo, hi))
+        except FileNotFoundError:
+            continue
+    if p.exists():
+        out.extend(_query_plain(p, stream_id, lo, hi))
+    return out
+
+
+__all__ = [
+    "BeaconIndexer",
+    "build_index",
+    "index_path",
+    "load_blocks",
+    "query",
+    "to_epoch_ms",
+]
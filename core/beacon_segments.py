@@ -0,0 +1,215 @@
+"""
+Rotated beacon segments.
+
+Layout next to the active file (e.g. runtime/beacons.jsonl):
+  beacons.jsonl.000001[.gz]         rotated segments, seq increasing with age
+  beacons.jsonl.manifest.json       {"segments": [{seq, file, first_ts, last_ts,
+                                                   bytes, compressed, rotated_at}]}
+
+first_ts / last_ts are the raw "ts" values of the first and last beacon in
+the segment (ISO string or epoch ms, whatever the producer wrote).
+
+One rotating BeaconWriter per active file is assumed; readers never need
+the manifest (list_segments scans the directory), it is informational.
+"""
+
+from __future__ import annotations
+import gzip
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from core import codec
+
+SEQ_WIDTH = 6
+
+_LOCKS: Dict[str, threading.Lock] = {}
+_LOCKS_GUARD = threading.Lock()
+_COMPRESSORS: List[threading.Thread] = []
+
+
+class Segment(NamedTuple):
+    seq: int
+    path: Path
+    compressed: bool
+
+
+def _lock_for(active: Path) -> threading.Lock:
+    key = str(active)
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(key, threading.Lock())
+
+
+def manifest_path(active: str | os.PathLike) -> Path:
+    p = Path(active)
+    return p.with_name(p.name + ".manifest.json")
+
+
+def segment_path(active: str | os.PathLike, seq: int, compressed: bool = False) -> Path:
+    p = Path(active)
+    return p.with_name(f"{p.name}.{seq:0{SEQ_WIDTH}d}" + (".gz" if compressed else ""))
+
+
+def list_segments(active: str | os.PathLike) -> List[Segment]:
+    """Rotated segments of active, oldest first (compressed copy wins on a tie)."""
+    p = Path(active)
+    pattern = re.compile(re.escape(p.name) + r"\.(\d+)(\.gz)?$")
+    found: Dict[int, Segment] = {}
+    try:
+        entries = list(os.scandir(p.parent))
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        m = pattern.match(entry.name)
+        if not m:
+            continue
+        seq = int(m.group(1))
+        seg = Segment(seq, p.parent / entry.name, m.group(2) is not None)
+        if seq not in found or seg.compressed:
+            found[seq] = seg
+    return [found[k] for k in sorted(found)]
+
+
+def segment_tail_lines(seg: Segment, max_lines: int) -> List[bytes]:
+    """Last max_lines non-blank raw lines of a segment (newest last)."""
+    if max_lines <= 0:
+        return []
+    if not seg.compressed:
+        from core.beacon_writer import tail_lines
+
+        return tail_lines(seg.path, max_lines)
+    dq: deque[bytes] = deque(maxlen=max_lines)
+    with gzip.open(seg.path, "rb") as f:
+        for line in f:
+            if line.strip():
+                dq.append(line.rstrip(b"\n"))
+    return list(dq)
+
+
+def read_manifest(active: str | os.PathLike) -> Dict[str, Any]:
+    try:
+        data = codec.loads(manifest_path(active).read_bytes())
+    except FileNotFoundError:
+        return {"segments": []}
+    if not isinstance(data, dict) or not isinstance(data.get("segments"), list):
+        return {"segments": []}
+    return data
+
+
+def _write_manifest(active: Path, data: Dict[str, Any]) -> None:
+    mp = manifest_path(active)
+    tmp = mp.with_name(f"{mp.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(codec.dumps_pretty(data) + "\n", encoding="utf-8")
+    os.replace(tmp, mp)
+
+
+def _ts_of(raw: Optional[bytes]) -> Any:
+    if not raw:
+        return None
+    try:
+        obj = codec.loads(raw)
+    except Exception:
+        return None
+    return obj.get("ts") if isinstance(obj, dict) else None
+
+
+def _first_line(path: Path) -> Optional[bytes]:
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                return line.rstrip(b"\n")
+    return None
+
+
+def rotate_active(active: str | os.PathLike, compress: bool = False) -> Optional[Segment]:
+    """
+    Move the active file to the next segment and record it in the manifest.
+    Returns None if there was nothing to rotate. With compress=True the
+    segment is gzipped on a background thread afterwards.
+    """
+    p = Path(active)
+    with _lock_for(p):
+        segs = list_segments(p)
+        seq = (segs[-1].seq + 1) if segs else 1
+        dest = segment_path(p, seq)
+        try:
+            os.replace(p, dest)
+        except FileNotFoundError:
+            return None
+        from core.beacon_writer import tail_lines
+
+        last = tail_lines(dest, 1)
+        entry = {
+            "seq": seq,
+            "file": dest.name,
+            "first_ts": _ts_of(_first_line(dest)),
+            "last_ts": _ts_of(last[0] if last else None),
+            "bytes": dest.stat().st_size,
+            "compressed": False,
+            "rotated_at": round(time.time(), 3),
+        }
+        manifest = read_manifest(p)
+        manifest["segments"].append(entry)
+        _write_manifest(p, manifest)
+    seg = Segment(seq, dest, False)
+    if compress:
+        t = threading.Thread(target=compress_segment, args=(p, seg),
+                             name=f"beacon-gzip-{seq}")
+        with _LOCKS_GUARD:
+            _COMPRESSORS[:] = [c for c in _COMPRESSORS if c.is_alive()]  # drop finished ones
+            _COMPRESSORS.append(t)
+        t.start()
+    return seg
+
+
+def compress_segment(active: str | os.PathLike, seg: Segment) -> Optional[Segment]:
+    """Gzip a plain segment in place (atomic rename) and update the manifest."""
+    if seg.compressed:
+        return seg
+    p = Path(active)
+    dest = segment_path(p, seg.seq, compressed=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    try:
+        with open(seg.path, "rb") as src, gzip.open(tmp, "wb") as out:
+            shutil.copyfileobj(src, out, 1 << 20)
+        os.replace(tmp, dest)
+        os.unlink(seg.path)
+    except Exception as e:
+        print(f"[beacon_segments] compress error for {seg.path}: {e}")
+        tmp.unlink(missing_ok=True)
+        return None
+    with _lock_for(p):
+        manifest = read_manifest(p)
+        for entry in manifest["segments"]:
+            if entry.get("seq") == seg.seq:
+                entry.update(file=dest.name, compressed=True, bytes=dest.stat().st_size)
+        _write_manifest(p, manifest)
+    return Segment(seg.seq, dest, True)
+
+
+def wait_for_compression(timeout: Optional[float] = None) -> None:
+    """Join background compression threads started so far."""
+    while True:
+        with _LOCKS_GUARD:
+            if not _COMPRESSORS:
+                return
+            t = _COMPRESSORS.pop(0)
+        t.join(timeout)
+
+
+__all__ = [
+    "Segment",
+    "compress_segment",
+    "list_segments",
+    "manifest_path",
+    "read_manifest",
+    "rotate_active",
+    "segment_path",
+    "segment_tail_lines",
+    "wait_for_compression",
+]
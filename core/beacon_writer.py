@@ -3,15 +3,37 @@ Beacon writing utility.
 
 Responsibilities:
 - Append JSON line beacons safely (best‑effort)
+- Keep a persistent, buffered handle per beacon file (BeaconWriter)
+- Rotate the active file by size / age into numbered (optionally gzipped)
+  segments, see core.beacon_segments
 - (Optional) read recent tail for inspection (used by listener_sim)
+- Follow the file incrementally (follow / BeaconFollower), waking on
+  inotify where available and stat-polling elsewhere
+- With NOISE_SEEK_BROKER (or use_broker) append_beacon publishes to a
+  core.beacon_broker process instead of a local file
+
+read_recent seeks backwards from EOF in fixed-size blocks, so its cost
+depends on max_lines (and line length), not on total file size. When the
+active file holds fewer than max_lines it continues into the newest
+rotated segments, so "last N" stays correct across a rotation.
 """
 
 from __future__ import annotations
-import json
+import atexit
+import ctypes
+import ctypes.util
+import heapq
+import itertools
 import os
+import select
+import sys
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Iterable, List, Dict, Any
-from collections import deque
+from typing import AsyncIterator, Iterable, Iterator, List, Dict, Any, Optional, Tuple
+
+from core import beacon_index, beacon_segments, codec, metrics
 
 
 def ensure_parent(path: str | os.PathLike):
@@ -20,43 +42,734 @@ def ensure_parent(path: str | os.PathLike):
     return p
 
 
+DURABILITY_POLICIES = ("none", "flush", "fsync")
+
+_OPEN_WRITERS: "weakref.WeakSet[BeaconWriter]" = weakref.WeakSet()
+
+
+class BeaconWriter:
+    """
+    Persistent append handle for a beacons.jsonl file.
+
+    Lines are buffered in memory and written as one batch once
+    max_buffer_bytes is exceeded, once the oldest pending line is
+    max_delay_s old (checked on write and by a shared background timer, so
+    a quiet writer does not hold lines back), on flush() and on close().
+    max_buffer_bytes=0 writes every beacon immediately.
+
+    durability (applied per batch):
+      none  - hand the batch to the file object; the OS sees it whenever
+              Python's io buffer fills up or on close
+      flush - flush to the OS after each batch (visible to readers)
+      fsync - flush + os.fsync after each batch
+
+    Pending lines are flushed by the context manager and, for writers
+    still open at interpreter exit, by an atexit hook.
+
+    Rotation (checked after each batch): once the active file reaches
+    rotate_bytes, or rotate_age_s has passed since this writer started
+    the current file, it is moved to the next numbered segment and a
+    fresh file is opened; compress=True gzips segments in the background.
+    Only one rotating writer per file is supported.
+
+    index_every=K maintains the sparse offset index sidecar (see
+    core.beacon_index) for this file, one record per K lines.
+
+    reopen_check_s=S: at most every S seconds a write compares the path's
+    inode with the open handle's and reopens the path when the file was
+    moved or removed from outside (mv, logrotate), instead of writing into
+    the orphaned inode.
+    """
+
+    def __init__(self, path: str | os.PathLike, *,
+                 max_buffer_bytes: int = 64 * 1024,
+                 max_delay_s: float = 1.0,
+                 durability: str = "flush",
+                 rotate_bytes: Optional[int] = None,
+                 rotate_age_s: Optional[float] = None,
+                 compress: bool = False,
+                 index_every: Optional[int] = None,
+                 reopen_check_s: Optional[float] = None):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"durability must be one of {DURABILITY_POLICIES}, got {durability!r}")
+        self.path = ensure_parent(path)
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_delay_s = max_delay_s
+        self.durability = durability
+        self.rotate_bytes = rotate_bytes or None
+        self.rotate_age_s = rotate_age_s or None
+        self.compress = compress
+        self.reopen_check_s = reopen_check_s
+        self._next_reopen_check = 0.0
+        self._lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._first_pending_ts: Optional[float] = None
+        self._indexer = (beacon_index.BeaconIndexer(self.path, index_every)
+                         if index_every else None)
+        self._f = open(self.path, "ab")
+        self._active_since = time.monotonic()
+        _OPEN_WRITERS.add(self)
+
+    @property
+    def closed(self) -> bool:
+        return self._f.closed
+
+    def write(self, beacon: Dict[str, Any]) -> int:
+        """Queue one beacon; returns the encoded line length in bytes."""
+        line = codec.dumpb(beacon) + b"\n"
+        with self._lock:
+            self._append_locked(line, beacon)
+        return len(line)
+
+    def write_line(self, line: bytes) -> int:
+        """Queue one already-encoded beacon line (ending in b"\\n"), e.g. from
+        SeekingFleet.update(lines=True); returns its length in bytes."""
+        with self._lock:
+            self._append_locked(line, None)
+        return len(line)
+
+    def write_lines(self, lines: Iterable[bytes]) -> int:
+        """Queue several already-encoded lines under one lock (e.g. a batch
+        received by core.beacon_broker); returns their total length."""
+        n = 0
+        with self._lock:
+            for line in lines:
+                self._append_locked(line, None)
+                n += len(line)
+        return n
+
+    def write_many(self, beacons: Iterable[Dict[str, Any]]) -> None:
+        beacons = list(beacons)
+        lines = [codec.dumpb(b) + b"\n" for b in beacons]
+        with self._lock:
+            for line, beacon in zip(lines, beacons):
+                self._append_locked(line, beacon)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def rotate(self) -> Optional[beacon_segments.Segment]:
+        """Flush and rotate now, regardless of thresholds."""
+        with self._lock:
+            self._flush_locked(check_rotation=False)
+            return self._rotate_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f.closed:
+                return
+            try:
+                self._flush_locked()
+                if self._indexer is not None:
+                    self._indexer.flush(partial=True)
+            finally:
+                self._f.close()
+                _OPEN_WRITERS.discard(self)
+
+    def __enter__(self) -> "BeaconWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Internal -----------------------------------------------------------
+
+    def _append_locked(self, line: bytes, beacon: Optional[Dict[str, Any]]) -> None:
+        if self._f.closed:
+            raise ValueError(f"BeaconWriter for {self.path} is closed")
+        if self.reopen_check_s is not None and time.monotonic() >= self._next_reopen_check:
+            self._reopen_if_moved_locked()
+        if self._indexer is not None:
+            if beacon is None:  # pre-encoded line: only the index needs its fields
+                try:
+                    beacon = codec.loads(line)
+                except ValueError:
+                    pass
+            if not isinstance(beacon, dict):
+                beacon = {}
+            self._indexer.add(len(line), beacon.get("ts"), beacon.get("stream_id"))
+        if not self._pending:
+            self._first_pending_ts = time.monotonic()
+            if self.max_buffer_bytes > 0:
+                _DELAYED_FLUSH.schedule(self, self._first_pending_ts + self.max_delay_s)
+        self._pending.append(line)
+        self._pending_bytes += len(line)
+        if (self._pending_bytes >= self.max_buffer_bytes
+                or time.monotonic() - self._first_pending_ts >= self.max_delay_s):
+            self._flush_locked()
+
+    def _flush_locked(self, check_rotation: bool = True) -> None:
+        if not self._pending or self._f.closed:
+            return
+        batch = b"".join(self._pending)
+        # Drop the batch even if the write fails: beacons are best-effort and
+        # retrying a failing disk on every write would only grow the buffer.
+        self._pending.clear()
+        self._pending_bytes = 0
+        self._first_pending_ts = None
+        self._f.write(batch)
+        if self.durability != "none":
+            self._f.flush()
+            if self.durability == "fsync":
+                os.fsync(self._f.fileno())
+        if self._indexer is not None:
+            self._indexer.flush()
+        if check_rotation and (self.rotate_bytes or self.rotate_age_s):
+            if ((self.rotate_bytes and self._f.tell() >= self.rotate_bytes)
+                    or (self.rotate_age_s
+                        and time.monotonic() - self._active_since >= self.rotate_age_s)):
+                self._rotate_locked()
+
+    def _flush_if_due(self) -> None:
+        with self._lock:
+            if (self._first_pending_ts is not None
+                    and time.monotonic() - self._first_pending_ts >= self.max_delay_s):
+                self._flush_locked()
+
+    def _reopen_if_moved_locked(self) -> None:
+        self._next_reopen_check = time.monotonic() + self.reopen_check_s
+        try:
+            moved = os.stat(self.path).st_ino != os.fstat(self._f.fileno()).st_ino
+        except FileNotFoundError:
+            moved = True
+        if not moved:
+            return
+        self._flush_locked(check_rotation=False)  # pending lines belong to the old file
+        self._f.close()
+        self._f = open(self.path, "ab")
+        self._active_since = time.monotonic()
+        if self._indexer is not None:
+            # The sidecar described the moved file; start over for the new one.
+            self._indexer = beacon_index.BeaconIndexer(self.path, self._indexer.every)
+
+    def _rotate_locked(self) -> Optional[beacon_segments.Segment]:
+        if self._f.closed:
+            return None
+        self._f.flush()
+        if self.durability == "fsync":
+            os.fsync(self._f.fileno())
+        self._f.close()
+        try:
+            seg = beacon_segments.rotate_active(self.path, compress=self.compress)
+            if seg is not None and self._indexer is not None:
+                self._indexer.rotated(seg.path)
+        finally:
+            self._f = open(self.path, "ab")
+            self._active_since = time.monotonic()
+        return seg
+
+
+class _DelayedFlush:
+    """One daemon thread that flushes buffered writers whose oldest pending
+    line has waited max_delay_s (entries hold weak references)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, "weakref.ref[BeaconWriter]"]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, writer: BeaconWriter, due: float) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), weakref.ref(writer)))
+            if self._thread is None or not self._thread.is_alive():  # also after fork
+                self._thread = threading.Thread(target=self._run, name="beacon-writer-flush",
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                ref = heapq.heappop(self._heap)[2]
+            w = ref()
+            if w is None:
+                continue
+            try:
+                w._flush_if_due()
+            except Exception as e:
+                print(f"[beacon_writer] delayed flush error: {e}")
+
+
+_DELAYED_FLUSH = _DelayedFlush()
+
+
+def _close_all_writers():
+    for w in list(_OPEN_WRITERS):
+        try:
+            w.close()
+        except Exception as e:
+            print(f"[beacon_writer] close error: {e}")
+    beacon_segments.wait_for_compression()
+
+
+atexit.register(_close_all_writers)
+
+# Shared unbuffered writers used by append_beacon, keyed by the path string
+# exactly as passed (avoids resolve()/mkdir on every call). Rotation for
+# them is configured through the environment (0 / unset = off) and only
+# applies in the process that declares itself the file's single writer:
+# every writer rotates on its own byte count, so several rotating producer
+# processes would rename the file under each other (and gzip away lines
+# still being appended to a fresh segment). The .idx sidecar has the same
+# problem: its offsets come from the writer's own byte count, so they are
+# only right when nobody else appends. Several producers: leave rotation
+# and the index to one owner, e.g. core.beacon_broker; the others follow its
+# renames through the reopen check.
+SINGLE_WRITER = os.getenv("NOISE_SEEK_SINGLE_WRITER", "") not in ("", "0")
+ROTATE_BYTES = int(os.getenv("NOISE_SEEK_ROTATE_BYTES", 0))
+ROTATE_AGE_S = float(os.getenv("NOISE_SEEK_ROTATE_AGE_S", 0))
+ROTATE_COMPRESS = os.getenv("NOISE_SEEK_ROTATE_COMPRESS", "") not in ("", "0")
+# How often the shared writers check for an external mv / logrotate of their path.
+REOPEN_CHECK_S = float(os.getenv("NOISE_SEEK_REOPEN_CHECK_S", 1.0))
+INDEX_EVERY = int(os.getenv("NOISE_SEEK_INDEX_EVERY", 0))
+_SHARED: Dict[str, BeaconWriter] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def _shared_writer(path: str) -> BeaconWriter:
+    w = _SHARED.get(path)
+    if w is None or w.closed:
+        with _SHARED_LOCK:
+            w = _SHARED.get(path)
+            if w is None or w.closed:
+                owner = SINGLE_WRITER
+                ignored = [name for name, on in (("NOISE_SEEK_ROTATE_*", ROTATE_BYTES or ROTATE_AGE_S),
+                                                 ("NOISE_SEEK_INDEX_EVERY", INDEX_EVERY)) if on]
+                if ignored and not owner:
+                    print(f"[beacon_writer] {' / '.join(ignored)} ignored for {path}: set "
+                          "NOISE_SEEK_SINGLE_WRITER=1 in the one process that writes it "
+                          "(or let core.beacon_broker own the file)")
+                w = BeaconWriter(path, max_buffer_bytes=0, durability="flush",
+                                 rotate_bytes=ROTATE_BYTES if owner else None,
+                                 rotate_age_s=ROTATE_AGE_S if owner else None,
+                                 compress=ROTATE_COMPRESS,
+                                 index_every=INDEX_EVERY if owner else None,
+                                 reopen_check_s=REOPEN_CHECK_S)
+                _SHARED[path] = w
+    return w
+
+
+_M_APPEND_SECONDS = metrics.histogram("beacon_append_seconds", "append_beacon latency")
+_M_APPEND_BYTES = metrics.counter("beacon_append_bytes_total", "Bytes written by append_beacon")
+_M_APPEND_ERRORS = metrics.counter("beacon_append_errors_total", "append_beacon failures")
+
+
+# NOISE_SEEK_BROKER=unix:PATH | [tcp:]HOST:PORT: append_beacon publishes to a
+# core.beacon_broker process (which owns the file) instead of writing path.
+_BROKER: Any = os.getenv("NOISE_SEEK_BROKER") or None
+_PUBLISHER = None
+
+
+def use_broker(target: Any) -> None:
+    """
+    Route append_beacon to a broker address or an in-process
+    beacon_broker.BeaconBroker; None goes back to writing files. Replaces
+    NOISE_SEEK_BROKER; the previous publisher is flushed and closed.
+    """
+    global _BROKER, _PUBLISHER
+    with _SHARED_LOCK:
+        old, _PUBLISHER = _PUBLISHER, None
+        _BROKER = target or None
+    if old is not None:
+        old.close()
+
+
+def _broker_publisher():
+    global _PUBLISHER
+    p = _PUBLISHER
+    if p is None or p.closed:
+        with _SHARED_LOCK:
+            p = _PUBLISHER
+            if p is None or p.closed:
+                from core import beacon_broker  # only producers with a broker pay for it
+
+                p = _PUBLISHER = beacon_broker.connect(_BROKER)
+    return p
+
+
 def append_beacon(beacon: Dict[str, Any], path: str):
     """
     Append a single beacon as JSON line.
+    Compatibility wrapper over a shared per-path BeaconWriter that writes
+    and flushes every line immediately. With a broker configured (see
+    use_broker) the beacon is published there instead, batched with the
+    ones that follow within NOISE_SEEK_BROKER_DELAY_MS; path is unused.
     Minimal error handling; failures just print and return.
     """
+    timed = metrics.ENABLED
+    if timed:
+        t0 = time.perf_counter()
     try:
-        p = ensure_parent(path)
-        line = json.dumps(beacon, separators=(",", ":"), ensure_ascii=False)
-        with open(p, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
+        if _BROKER is not None:
+            n = _broker_publisher().publish(beacon)
+        else:
+            n = _shared_writer(path).write(beacon)
     except Exception as e:
+        if timed:
+            _M_APPEND_ERRORS.inc()
         print(f"[beacon_writer] append error: {e}")
+        return
+    if timed:
+        _M_APPEND_SECONDS.observe(time.perf_counter() - t0)
+        _M_APPEND_BYTES.inc(n)
 
 
-def read_recent(path: str, max_lines: int = 200) -> List[Dict[str, Any]]:
+def close_shared_writers():
+    """Close handles opened by append_beacon (e.g. after moving the file);
+    a broker publisher is flushed and reconnects on the next beacon."""
+    global _PUBLISHER
+    with _SHARED_LOCK:
+        writers = list(_SHARED.values())
+        _SHARED.clear()
+        publisher, _PUBLISHER = _PUBLISHER, None
+    for w in writers:
+        w.close()
+    if publisher is not None:
+        publisher.close()
+
+
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def tail_lines(path: str | os.PathLike, max_lines: int = 200,
+               block_size: int = TAIL_BLOCK_SIZE, end: Optional[int] = None) -> List[bytes]:
     """
-    Return up to last max_lines beacons (newest last).
-    If file absent -> [].
+    Return up to last max_lines non-blank raw lines (newest last, no newline).
+    Reads backwards from EOF (or from byte offset end) in block_size chunks;
+    nothing before the requested window is read or decoded. Raises OSError
+    like open().
     """
-    p = Path(path)
-    if not p.exists():
+    if max_lines <= 0:
         return []
-    dq: deque[str] = deque(maxlen=max_lines)
+    out: List[bytes] = []
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        if end is not None:
+            pos = min(pos, end)
+        carry = b""
+        while pos > 0 and len(out) < max_lines:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            parts = (f.read(step) + carry).split(b"\n")
+            # parts[0] may continue in the previous block; keep it for later
+            carry = parts[0]
+            for raw in reversed(parts[1:]):
+                if raw.strip():
+                    out.append(raw)
+                    if len(out) >= max_lines:
+                        break
+        if pos == 0 and len(out) < max_lines and carry.strip():
+            out.append(carry)
+    out.reverse()
+    return out
+
+
+def recent_lines(path: str | os.PathLike, max_lines: int = 200,
+                 end: Optional[int] = None) -> List[bytes]:
+    """
+    Like tail_lines, but continues into the newest rotated segments when
+    the active file holds fewer than max_lines. Missing files -> [].
+    end bounds the part of the active file that is considered.
+    """
+    p = Path(path)
     try:
-        with open(p, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    dq.append(line.rstrip("\n"))
+        out = tail_lines(p, max_lines, end=end)
+    except FileNotFoundError:
+        out = []
+    if len(out) < max_lines:
+        for seg in reversed(beacon_segments.list_segments(p)):
+            try:
+                older = beacon_segments.segment_tail_lines(seg, max_lines - len(out))
+            except FileNotFoundError:
+                continue  # compressed meanwhile; the .gz copy was listed too late
+            out = older + out
+            if len(out) >= max_lines:
+                break
+    return out
+
+
+_M_RECENT_SECONDS = metrics.histogram("beacon_read_recent_seconds", "read_recent latency")
+_M_RECENT_SCANNED = metrics.counter("beacon_read_recent_lines_scanned_total",
+                                    "Raw lines read from the tail by read_recent")
+_M_RECENT_RETURNED = metrics.counter("beacon_read_recent_lines_returned_total",
+                                     "Parsed beacons returned by read_recent")
+
+
+def read_recent(path: str, max_lines: int = 200) -> List[Dict[str, Any]]:
+    """
+    Return up to last max_lines beacons (newest last), spanning into
+    rotated segments if needed.
+    If file absent (and no segments) -> [].
+    Malformed or partial (still being written) lines count towards
+    max_lines but are skipped in the result.
+    """
+    timed = metrics.ENABLED
+    if timed:
+        t0 = time.perf_counter()
+    try:
+        raw_lines = recent_lines(path, max_lines)
     except Exception as e:
         print(f"[beacon_writer] read error: {e}")
         return []
     out: List[Dict[str, Any]] = []
-    for raw in dq:
+    for raw in raw_lines:
         try:
-            out.append(json.loads(raw))
+            out.append(codec.loads(raw))
         except Exception:
             continue
+    if timed:
+        _M_RECENT_SECONDS.observe(time.perf_counter() - t0)
+        _M_RECENT_SCANNED.inc(len(raw_lines))
+        _M_RECENT_RETURNED.inc(len(out))
     return out
 
-__all__ = ["append_beacon", "read_recent", "ensure_parent"]
\ No newline at end of file
+
+# --- Incremental follow ------------------------------------------------------
+
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DIR_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+                | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+
+
+class _Inotify:
+    """Minimal ctypes inotify watch on a directory (Linux only)."""
+
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(fd, os.fsencode(directory), _IN_DIR_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+        self.fd = fd
+
+    def drain(self) -> None:
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+
+    def wait(self, timeout: float) -> None:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            self.drain()
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class BeaconFollower:
+    """
+    Incremental reader for a growing beacons.jsonl.
+
+    Remembers (inode, byte offset) and returns only complete lines appended
+    since the last call; a partial trailing line is left for the next call.
+    Truncation (size < offset) restarts from byte 0. Rotation (path now
+    points to a different inode) drains the remaining complete lines of
+    the old file before switching to the new one.
+
+    wait() blocks until the directory changes (inotify on Linux) or
+    poll_interval_s elapses (stat-polling fallback). Iterating (sync or
+    async) yields decoded beacons forever; malformed lines are skipped.
+    """
+
+    READ_CHUNK = 1 << 20
+
+    def __init__(self, path: str | os.PathLike, *, from_start: bool = False,
+                 poll_interval_s: float = 0.25, idle_timeout_s: float = 1.0,
+                 use_inotify: Optional[bool] = None):
+        self.path = Path(path)
+        self.poll_interval_s = poll_interval_s
+        self.idle_timeout_s = idle_timeout_s
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self._f = None
+        self._closed = False
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(self.path.parent)
+            except Exception:
+                self._inotify = None
+        if self._open_current() and not from_start:
+            self.offset = os.fstat(self._f.fileno()).st_size
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    # --- Reading ------------------------------------------------------------
+
+    def read_lines(self) -> List[bytes]:
+        """Return new complete non-blank raw lines (without newline)."""
+        out: List[bytes] = []
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if self._f is not None and (st is None or st.st_ino != self.inode):
+            # Rotated or removed: finish what the old file still holds.
+            self._read_available(out)
+            self._close_file()
+        if self._f is None:
+            if st is None or not self._open_current():
+                return out
+        size = os.fstat(self._f.fileno()).st_size
+        if size < self.offset:
+            self.offset = 0
+        self._read_available(out, size)
+        return out
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Return newly appended beacons (non-blocking)."""
+        out: List[Dict[str, Any]] = []
+        for raw in self.read_lines():
+            try:
+                out.append(codec.loads(raw))
+            except Exception:
+                continue
+        return out
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until the file may have changed or timeout elapses."""
+        if self._inotify is not None:
+            self._inotify.wait(self.idle_timeout_s if timeout is None else timeout)
+        else:
+            time.sleep(self.poll_interval_s if timeout is None
+                       else min(timeout, self.poll_interval_s))
+
+    async def wait_async(self, timeout: Optional[float] = None) -> None:
+        import asyncio  # only async followers pay for it (health probes import this module)
+
+        if self._inotify is None:
+            await asyncio.sleep(self.poll_interval_s if timeout is None
+                                else min(timeout, self.poll_interval_s))
+            return
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        fd = self._inotify.fd
+        loop.add_reader(fd, lambda: fut.done() or fut.set_result(None))
+        try:
+            await asyncio.wait_for(fut, self.idle_timeout_s if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(fd)
+        self._inotify.drain()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while not self._closed:
+            yield from self.poll()
+            self.wait()
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self._aiter()
+
+    async def _aiter(self) -> AsyncIterator[Dict[str, Any]]:
+        while not self._closed:
+            for beacon in self.poll():
+                yield beacon
+            await self.wait_async()
+
+    def close(self) -> None:
+        self._closed = True
+        self._close_file()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> "BeaconFollower":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Internal -----------------------------------------------------------
+
+    def _open_current(self) -> bool:
+        try:
+            self._f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.inode = os.fstat(self._f.fileno()).st_ino
+        self.offset = 0
+        return True
+
+    def _close_file(self) -> None:
+        if self._f is not None:
+            self._f.close()
+        self._f = None
+        self.inode = None
+        self.offset = 0
+
+    def _read_available(self, out: List[bytes], size: Optional[int] = None) -> None:
+        if size is None:
+            size = os.fstat(self._f.fileno()).st_size
+        while self.offset < size:
+            self._f.seek(self.offset)
+            chunk = self._f.read(min(self.READ_CHUNK, size - self.offset))
+            end = chunk.rfind(b"\n")
+            if end < 0:
+                if len(chunk) < self.READ_CHUNK:
+                    return  # only a partial line so far
+                # A single line longer than READ_CHUNK: read it whole.
+                self._f.seek(self.offset)
+                chunk = self._f.read(size - self.offset)
+                end = chunk.rfind(b"\n")
+                if end < 0:
+                    return
+            for raw in chunk[:end].split(b"\n"):
+                if raw.strip():
+                    out.append(raw)
+            self.offset += end + 1
+
+
+def follow(path: str | os.PathLike, *, from_start: bool = False,
+           poll_interval_s: float = 0.25,
+           use_inotify: Optional[bool] = None) -> BeaconFollower:
+    """
+    Follow beacons appended to path (like `tail -F`).
+    The returned BeaconFollower is a (async) iterator of beacon dicts and
+    also offers non-blocking poll() for loops that do other work.
+    """
+    return BeaconFollower(path, from_start=from_start,
+                          poll_interval_s=poll_interval_s, use_inotify=use_inotify)
+
+
+__all__ = [
+    "BeaconFollower",
+    "BeaconWriter",
+    "DURABILITY_POLICIES",
+    "append_beacon",
+    "close_shared_writers",
+    "follow",
+    "read_recent",
+    "recent_lines",
+    "tail_lines",
+    "ensure_parent",
+    "use_broker",
+]
@@ -0,0 +1,169 @@
+"""
+JSON codec used for all beacon / subscription I/O.
+
+Uses orjson when importable and falls back to the stdlib json module.
+Both backends produce the same compact output (separators "," / ":",
+non-ASCII kept as UTF-8, orjson float formatting, NaN/Infinity as null).
+The stdlib path encodes with the C encoder and only re-encodes through
+a pure-Python JSONEncoder subclass with orjson-style floats when the
+output contains an exponent or a non-finite float. Objects orjson rejects (non-str keys,
+ints beyond 64 bits) are encoded by the stdlib path instead.
+
+API:
+  dumps(obj) -> str          compact
+  dumpb(obj) -> bytes        compact, UTF-8 (what JSONL writers want)
+  dumps_pretty(obj) -> str   indent=2, for human-facing files / output
+  loads(str | bytes) -> obj  raises ValueError on malformed input
+"""
+
+from __future__ import annotations
+import json
+import math
+import re
+from typing import Any, Optional
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+_std_compact = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+_std_pretty = json.JSONEncoder(indent=2, ensure_ascii=False).encode
+# Float spellings where float.__repr__ and orjson disagree (may also match
+# inside strings; that only costs a slower, still identical, re-encode).
+_NEEDS_ORJSON_FLOATS = re.compile(r"\de[+-]\d|NaN|Infinity").search
+
+
+def _orjson_floatstr(o: float, _repr=float.__repr__, _inf=math.inf) -> str:
+    if o != o or o == _inf or o == -_inf:
+        return "null"
+    r = _repr(o)
+    if "e" not in r:
+        return r
+    mantissa, exp = r.split("e")
+    if exp == "-05":
+        # orjson (ryu) keeps 1e-5 <= |x| < 1e-4 in positional notation
+        sign = "-" if mantissa[0] == "-" else ""
+        return f"{sign}0.0000{mantissa.lstrip('-').replace('.', '')}"
+    return f"{mantissa}e{int(exp)}"
+
+
+class _OrjsonFloatEncoder(json.JSONEncoder):
+    """
+    Pure-Python encoder producing json.dumps layout with orjson float
+    spelling. Only the public JSONEncoder API is used (strings and other
+    scalars go through the C encoder), so it does not depend on the
+    private json.encoder internals of a given Python version.
+    """
+
+    def __init__(self, indent: Optional[str] = None):
+        super().__init__(ensure_ascii=False, indent=indent,
+                         separators=(",", ":") if indent is None else (",", ": "))
+
+    def encode(self, o: Any) -> str:
+        out: list = []
+        self._encode(o, 0, out.append)
+        return "".join(out)
+
+    def _newline(self, level: int) -> str:
+        return "" if self.indent is None else "\n" + self.indent * level
+
+    def _key(self, k: Any) -> str:
+        if isinstance(k, str):
+            return k
+        if isinstance(k, float):
+            return _orjson_floatstr(k)
+        if k is True or k is False or k is None:
+            return _std_compact(k)
+        if isinstance(k, int):
+            return int.__repr__(k)
+        raise TypeError(f"keys must be str, int, float, bool or None, not {k.__class__.__name__}")
+
+    def _encode(self, o: Any, level: int, w) -> None:
+        if isinstance(o, str) or o is None or o is True or o is False:
+            w(_std_compact(o))
+        elif isinstance(o, int):
+            w(int.__repr__(o))
+        elif isinstance(o, float):
+            w(_orjson_floatstr(o))
+        elif isinstance(o, (list, tuple)):
+            if not o:
+                w("[]")
+                return
+            inner = self._newline(level + 1)
+            w("[")
+            for i, v in enumerate(o):
+                w(inner if i == 0 else "," + inner)
+                self._encode(v, level + 1, w)
+            w(self._newline(level) + "]")
+        elif isinstance(o, dict):
+            if not o:
+                w("{}")
+                return
+            inner = self._newline(level + 1)
+            w("{")
+            for i, (k, v) in enumerate(o.items()):
+                w(inner if i == 0 else "," + inner)
+                w(_std_compact(self._key(k)) + self.key_separator)
+                self._encode(v, level + 1, w)
+            w(self._newline(level) + "}")
+        else:
+            self._encode(self.default(o), level, w)  # default() raises TypeError
+
+
+_py_compact = _OrjsonFloatEncoder().encode
+_py_pretty = _OrjsonFloatEncoder(indent="  ").encode
+
+
+def _std_dumps(obj: Any) -> str:
+    out = _std_compact(obj)
+    if _NEEDS_ORJSON_FLOATS(out):
+        out = _py_compact(obj)
+    return out
+
+
+def _std_dumpb(obj: Any) -> bytes:
+    return _std_dumps(obj).encode("utf-8")
+
+
+def _std_dumps_pretty(obj: Any) -> str:
+    out = _std_pretty(obj)
+    if _NEEDS_ORJSON_FLOATS(out):
+        out = _py_pretty(obj)
+    return out
+
+
+if orjson is not None:
+    _odumps = orjson.dumps
+    _OPT_PRETTY = orjson.OPT_INDENT_2
+
+    def dumpb(obj: Any) -> bytes:
+        try:
+            return _odumps(obj)
+        except TypeError:
+            return _std_dumpb(obj)
+
+    def dumps(obj: Any) -> str:
+        try:
+            return _odumps(obj).decode("utf-8")
+        except TypeError:
+            return _std_dumps(obj)
+
+    def dumps_pretty(obj: Any) -> str:
+        try:
+            return _odumps(obj, option=_OPT_PRETTY).decode("utf-8")
+        except TypeError:
+            return _std_dumps_pretty(obj)
+
+    loads = orjson.loads
+
+else:
+    dumps = _std_dumps
+    dumpb = _std_dumpb
+    dumps_pretty = _std_dumps_pretty
+    loads = json.loads
+
+
+__all__ = ["BACKEND", "dumps", "dumpb", "dumps_pretty", "loads"]
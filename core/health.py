@@ -15,26 +15,50 @@ Exit code:
   0 if no fatal errors
   1 if a fatal error (writability or hard parse failure) occurred
 
+Checks are provided by core.health_plugins (see run_all); the check_*
+helpers below are kept for callers that import them directly.
+
 Usage:
   python -m core.health            # human-readable table
   python -m core.health --json     # machine-readable JSON list
+  python -m core.health --serial   # run checks one at a time
+  python -m core.health --only 'beacon*' --skip beacon_shape   # select checks (globs)
+  python -m core.health --list-checks   # registered checks, without importing plugins
+  python -m core.health --serve [--port 8787 | --unix runtime/health.sock] [--interval 5]
+                                   # daemon serving cached results (core.health_daemon)
 """
 
 from __future__ import annotations
 import os
 import sys
-import json
 import argparse
 from pathlib import Path
 from typing import Any, List, Dict
 
-try:
-    from core import beacon_writer  # type: ignore
-except Exception as e:
-    beacon_writer = None  # type: ignore
-    _import_error = e
-else:
-    _import_error = None
+from core import codec
+
+
+def _load_beacon_writer():
+    """
+    Import core.beacon_writer on first use (so probes and --list-checks do not
+    pay for it); sets the module globals beacon_writer / _import_error.
+    """
+    g = globals()
+    if "beacon_writer" not in g:
+        try:
+            from core import beacon_writer as bw  # type: ignore
+        except Exception as e:
+            g["beacon_writer"], g["_import_error"] = None, e
+        else:
+            g["beacon_writer"], g["_import_error"] = bw, None
+    return g["beacon_writer"]
+
+
+def __getattr__(name: str):
+    if name in ("beacon_writer", "_import_error"):
+        _load_beacon_writer()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 BEACON_PATH = os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl")
 SUBSCRIPTIONS_PATH = os.getenv("NOISE_SEEK_SUBSCRIPTIONS_PATH", "runtime/subscriptions.json")
@@ -104,9 +128,10 @@ def parse_beacons(report: HealthReport) -> List[Dict[str, Any]]:
     if not path.exists():
         report.add("beacons_file", "INFO", "absent (no beacons yet)")
         return []
-    if beacon_writer and hasattr(beacon_writer, "read_recent"):
+    bw = _load_beacon_writer()
+    if bw and hasattr(bw, "read_recent"):
         try:
-            data = beacon_writer.read_recent(str(path), max_lines=500)
+            data = bw.read_recent(str(path), max_lines=500)
             if isinstance(data, list):
                 report.add("beacons_file", "OK", f"{len(data)} entries (via beacon_writer)")
                 return data
@@ -120,7 +145,7 @@ def parse_beacons(report: HealthReport) -> List[Dict[str, Any]]:
     bad = 0
     for ln in lines[-500:]:
         try:
-            obj = json.loads(ln)
+            obj = codec.loads(ln)
             if isinstance(obj, dict):
                 parsed.append(obj)
         except Exception:
@@ -139,7 +164,7 @@ def check_subscriptions(report: HealthReport):
         report.add("subscriptions_file", "INFO", "absent (no subscriptions yet)")
         return
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = codec.loads(path.read_bytes())
         if isinstance(data, dict):
             keys = len(data)
             report.add("subscriptions_file", "OK", f"{keys} stream keys")
@@ -174,8 +199,10 @@ def check_target_presence(report: HealthReport, beacons: List[Dict[str, Any]]):
 
 
 def check_import(report: HealthReport):
-    if _import_error:
-        report.add("import:core.beacon_writer", "INFO", f"not imported: {_import_error}")
+    _load_beacon_writer()
+    err = globals()["_import_error"]
+    if err:
+        report.add("import:core.beacon_writer", "INFO", f"not imported: {err}")
     else:
         report.add("import:core.beacon_writer", "OK", "loaded")
 
@@ -183,20 +210,69 @@ def check_import(report: HealthReport):
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--json", action="store_true", help="Output report as JSON list")
+    parser.add_argument("--serial", action="store_true", help="Run checks one at a time")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Per-check timeout in seconds (default HEALTH_CHECK_TIMEOUT_S or 10)")
+    parser.add_argument("--only", action="append", default=None, metavar="PATTERN",
+                        help="Run only matching checks (glob, repeatable or comma-separated)")
+    parser.add_argument("--skip", action="append", default=None, metavar="PATTERN",
+                        help="Skip matching checks (glob, repeatable or comma-separated)")
+    parser.add_argument("--list-checks", action="store_true",
+                        help="List selected checks and exit (plugins are not imported)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Keep running; serve cached results over HTTP (see core.health_daemon)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None,
+                        help="HTTP port for --serve (default HEALTH_SERVE_PORT or 8787)")
+    parser.add_argument("--unix", default=None, help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="Refresh interval for --serve (default HEALTH_SERVE_INTERVAL_S or 5)")
     args = parser.parse_args()
 
-    report = HealthReport()
-    check_python(report)
-    check_env(report)
-    check_import(report)
-    check_runtime_dir(report)
-    beacons = parse_beacons(report)
-    check_subscriptions(report)
-    check_beacon_shape(report, beacons)
-    check_target_presence(report, beacons)
+    from core import health_plugins
+
+    def patterns(values):
+        return [p for v in values or () for p in v.split(",") if p] or None
+
+    try:
+        specs = health_plugins.select(patterns(args.only), patterns(args.skip))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.list_checks:
+        rows = [{"check": s.name, "order": s.order, "needs": list(s.needs),
+                 "timeout_s": s.timeout_s,
+                 "source": (f"{s.fn.module}:{s.fn.attr}" if isinstance(s.fn, health_plugins.LazyCheck)
+                            else f"{s.fn.__module__}:{s.fn.__qualname__}")}
+                for s in sorted(specs, key=lambda t: t.order)]
+        if args.json:
+            print(codec.dumps_pretty(rows))
+        else:
+            width = max((len(r["check"]) for r in rows), default=5) + 2
+            for r in rows:
+                needs = f"  needs={','.join(r['needs'])}" if r["needs"] else ""
+                print(f"{r['check']:<{width}} {r['order']:>4}  {r['source']}{needs}")
+        return
+
+    if args.serve:
+        from core import health_daemon
+
+        health_daemon.serve(
+            args.interval if args.interval is not None else health_daemon.DEFAULT_INTERVAL_S,
+            host=args.host,
+            port=args.port if args.port is not None else health_daemon.DEFAULT_PORT,
+            unix_path=args.unix,
+            parallel=not args.serial,
+            timeout_s=args.timeout,
+            specs=specs,
+        )
+        return
+
+    report = health_plugins.run_all(parallel=not args.serial, timeout_s=args.timeout,
+                                    specs=specs)
 
     if args.json:
-        print(json.dumps(report.to_json(), indent=2))
+        print(codec.dumps_pretty(report.to_json()))
     else:
         print(report.render())
     if report.fatal:
@@ -0,0 +1,174 @@
+"""
+Long-running health daemon (`python -m core.health --serve`).
+
+Keeps the check registry loaded and re-runs all checks every
+HEALTH_SERVE_INTERVAL_S seconds on a background thread. A check that timed
+out is not started again until its previous run returns; meanwhile it is
+reported as FAIL ("still running"). The beacon checks
+(beacons_parse, beacon_shape, target_stream) read a LiveBeaconTail that
+decodes only the bytes appended since the previous refresh; its rolling
+counters are reported next to the checks. Each refresh encodes the report
+once; requests just return the cached bytes.
+
+Endpoints (HTTP over TCP, or over a Unix socket with --unix):
+  GET /health       cached report as JSON (503 when a fatal check failed)
+  GET /health.txt   same, rendered as the CLI table
+
+Payload: {"ts", "runs", "fatal", "refresh_ms", "items": [...], "tail": {...}}
+
+  curl -s localhost:8787/health
+  curl -s --unix-socket runtime/health.sock http://x/health
+"""
+
+from __future__ import annotations
+import os
+import signal
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import codec
+
+DEFAULT_INTERVAL_S = float(os.getenv("HEALTH_SERVE_INTERVAL_S", 5))
+DEFAULT_PORT = int(os.getenv("HEALTH_SERVE_PORT", 8787))
+
+
+class HealthDaemon:
+    """Periodic run_all over a persistent LiveBeaconTail, with a cached result."""
+
+    def __init__(self, interval_s: float = DEFAULT_INTERVAL_S, *, parallel: bool = True,
+                 timeout_s: Optional[float] = None, beacon_path: Optional[str] = None,
+                 subscriptions_path: Optional[str] = None, specs: Optional[List[Any]] = None):
+        from core import health_plugins
+
+        self._plugins = health_plugins
+        self.interval_s = interval_s
+        self.parallel = parallel
+        self.timeout_s = timeout_s
+        self.subscriptions_path = subscriptions_path
+        self.specs = specs
+        self.beacon_path = health_plugins.HealthContext(beacon_path).beacon_path
+        self.live = health_plugins.LiveBeaconTail(self.beacon_path)
+        self.runs = 0
+        self.report = None
+        self._cache: Tuple[bool, bytes, bytes] = (False, b"{}", b"")
+        self._inflight: Dict[str, Any] = {}  # check name -> timed-out run still going
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        ctx = self._plugins.HealthContext(str(self.beacon_path), self.subscriptions_path,
+                                          live_tail=self.live)
+        report = self._plugins.run_all(ctx=ctx, parallel=self.parallel, timeout_s=self.timeout_s,
+                                       specs=self.specs, inflight=self._inflight)
+        self.runs += 1
+        payload = {
+            "ts": round(time.time(), 3),
+            "runs": self.runs,
+            "fatal": report.fatal,
+            "refresh_ms": round((time.perf_counter() - t0) * 1000, 2),
+            "items": report.to_json(),
+            "tail": self.live.counters(),
+        }
+        self.report = report
+        # One tuple swap, so readers never see JSON and text from different runs.
+        self._cache = (report.fatal, codec.dumpb(payload),
+                       (report.render() + "\n").encode("utf-8"))
+        return payload
+
+    def cached(self, text: bool = False) -> Tuple[bool, bytes]:
+        """(fatal, body) of the latest refresh."""
+        fatal, as_json, as_text = self._cache
+        return fatal, as_text if text else as_json
+
+    def start(self) -> "HealthDaemon":
+        """First refresh inline (so the cache is never empty), then on a thread."""
+        self.refresh()
+        self._thread = threading.Thread(target=self._loop, name="health-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_s + 1)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[health] refresh error: {e}")
+
+
+def _handler(daemon: HealthDaemon):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path not in ("/", "/health", "/health.txt"):
+                self.send_error(404)
+                return
+            text = path.endswith(".txt")
+            fatal, body = daemon.cached(text)
+            self.send_response(503 if fatal else 200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8" if text
+                             else "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self):
+            return str(self.client_address or "unix")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(daemon: HealthDaemon, *, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                unix_path: Optional[str] = None):
+    """HTTP server for daemon's cache (not started; call serve_forever())."""
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)  # stale socket from a previous run
+        return _UnixHTTPServer(unix_path, _handler(daemon))
+    return ThreadingHTTPServer((host, port), _handler(daemon))
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(interval_s: float = DEFAULT_INTERVAL_S, *, host: str = "127.0.0.1",
+          port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+          parallel: bool = True, timeout_s: Optional[float] = None,
+          specs: Optional[List[Any]] = None) -> None:
+    daemon = HealthDaemon(interval_s, parallel=parallel, timeout_s=timeout_s,
+                          specs=specs).start()
+    server = make_server(daemon, host=host, port=port, unix_path=unix_path)
+    try:
+        signal.signal(signal.SIGTERM, _raise_interrupt)  # k8s / systemd stop -> clean exit
+    except ValueError:
+        pass  # not the main thread
+    where = unix_path or f"http://{host}:{server.server_address[1]}/health"
+    print(f"[health] serving {where} (refresh every {interval_s}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stop()
+        if unix_path and os.path.exists(unix_path):
+            os.unlink(unix_path)
+
+
+__all__ = ["DEFAULT_INTERVAL_S", "DEFAULT_PORT", "HealthDaemon", "make_server", "serve"]
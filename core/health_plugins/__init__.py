@@ -1,9 +1,25 @@
+"""
+Health check plugin registry and runner.
+
+run_all() executes registered checks on daemon threads. Each check writes
+into its own HealthReport which is merged back in registry order, so the
+output order and each item's elapsed_ms (time spent inside the check
+itself) do not depend on scheduling. Checks taking a second positional
+parameter receive the per-run HealthContext, which reads and parses the
+beacon tail once for all beacon checks.
+"""
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Callable, List, Tuple
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+import os
+import threading
 import time
 
+from core import metrics
+
 @dataclass
 class HealthItem:
     check: str
@@ -55,46 +71,540 @@ class HealthReport:
             for i in self.items
         ]
 
-# Internal registry entries: (order, name, fn)
-REGISTRY: List[Tuple[int, str, Callable[[HealthReport], Any]]] = []
+_M_CHECK_SECONDS = metrics.histogram("health_check_seconds", "Time spent inside each check")
+_M_CHECK_STATUS = metrics.counter("health_check_status_total", "Check results by status")
+_M_RUN_SECONDS = metrics.histogram("health_run_all_seconds", "run_all wall time")
+
+TAIL_LINES = 500  # beacon tail shared by all beacon checks (max window they use)
+DEFAULT_TIMEOUT_S = float(os.getenv("HEALTH_CHECK_TIMEOUT_S", 10))
+
+
+@dataclass
+class BeaconTail:
+    # (parsed_ok, obj) per non-blank line, oldest first
+    entries: List[Tuple[bool, Any]] = field(default_factory=list)
+    error: Optional[Exception] = None
+
+
+def _decode_lines(raw_lines: List[bytes]) -> List[Tuple[bool, Any]]:
+    """(parsed_ok, obj) per raw line."""
+    from core import codec
+
+    entries: List[Tuple[bool, Any]] = []
+    for raw in raw_lines:
+        try:
+            entries.append((True, codec.loads(raw)))
+        except Exception:
+            entries.append((False, None))
+    return entries
+
+
+class LiveBeaconTail:
+    """
+    Rolling TAIL_LINES window over a growing beacon file, for long-running
+    callers (health daemon). The first update() seeds the window from the
+    file tail (and rotated segments); later calls decode only the complete
+    lines appended since, so a refresh costs O(new bytes) instead of a tail
+    re-scan. Rotation or truncation re-seeds; so does a jump of more than
+    reseed_bytes (the window only needs the newest lines).
 
-def register(name: str, *, order: int = 100):
+    The counters (lines, good, bad, bytes, reseeds) cover everything decoded
+    since construction. Not thread-safe; call update() from one thread.
+    """
+
+    def __init__(self, path: str | os.PathLike, maxlen: int = TAIL_LINES,
+                 reseed_bytes: int = 8 << 20):
+        self.path = Path(path)
+        self.maxlen = maxlen
+        self.reseed_bytes = reseed_bytes
+        self.entries: Deque[Tuple[bool, Any]] = deque(maxlen=maxlen)
+        self._ident: Tuple[int, int] | None = None
+        self._offset = 0  # always just past a newline
+        self.lines = 0
+        self.good = 0
+        self.bad = 0
+        self.bytes = 0
+        self.reseeds = 0
+
+    def update(self) -> BeaconTail:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._ident = None
+            self.entries.clear()
+            return BeaconTail()
+        except OSError as e:
+            return BeaconTail(error=e)
+        try:
+            ident = (st.st_dev, st.st_ino)
+            if (ident != self._ident or st.st_size < self._offset
+                    or st.st_size - self._offset > self.reseed_bytes):
+                self._seed(ident)
+            elif st.st_size > self._offset:
+                self._read_appended()
+        except OSError as e:
+            return BeaconTail(error=e)
+        return BeaconTail(list(self.entries))
+
+    def counters(self) -> Dict[str, int]:
+        return {"lines": self.lines, "good": self.good, "bad": self.bad,
+                "bytes": self.bytes, "reseeds": self.reseeds, "offset": self._offset}
+
+    def _feed(self, raws: List[bytes]) -> None:
+        entries = _decode_lines(raws)
+        self.entries.extend(entries)
+        good = sum(1 for ok, _ in entries if ok)
+        self.lines += len(entries)
+        self.good += good
+        self.bad += len(entries) - good
+
+    def _seed(self, ident: Tuple[int, int]) -> None:
+        from core.beacon_writer import recent_lines
+
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            boundary = _last_line_end(f, size)
+        self.entries.clear()
+        self._feed(recent_lines(self.path, self.maxlen, end=boundary))
+        self._ident = ident
+        self._offset = boundary
+        self.reseeds += 1
+
+    def _read_appended(self) -> None:
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return  # only a partial line so far
+        self._feed([raw for raw in chunk[:end].split(b"\n") if raw.strip()])
+        self._offset += end + 1
+        self.bytes += end + 1
+
+
+def _last_line_end(f, size: int, block: int = 64 * 1024) -> int:
+    """Offset just past the last newline in the first size bytes of f (0 if none)."""
+    pos = size
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        i = f.read(step).rfind(b"\n")
+        if i >= 0:
+            return pos + i + 1
+    return 0
+
+
+class HealthContext:
+    """Per-run shared state; lazily computed values are thread-safe."""
+
+    def __init__(self, beacon_path: str | None = None, subscriptions_path: str | None = None,
+                 live_tail: LiveBeaconTail | None = None):
+        self.beacon_path = Path(
+            beacon_path or os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl")
+        )
+        self.subscriptions_path = Path(
+            subscriptions_path
+            or os.getenv("NOISE_SEEK_SUBSCRIPTIONS_PATH", "runtime/subscriptions.json")
+        )
+        self._lock = threading.Lock()
+        self._tail: BeaconTail | None = None
+        self._live = live_tail
+
+    def beacon_tail(self) -> BeaconTail:
+        """Last TAIL_LINES non-blank beacon lines, read and decoded once per run."""
+        if self._tail is None:
+            with self._lock:
+                if self._tail is None:
+                    self._tail = self._load_tail()
+        return self._tail
+
+    def _load_tail(self) -> BeaconTail:
+        if self._live is not None:
+            return self._live.update()
+        from core.beacon_writer import recent_lines
+
+        try:
+            raw_lines = recent_lines(self.beacon_path, TAIL_LINES)
+        except Exception as e:
+            return BeaconTail(error=e)
+        return BeaconTail(_decode_lines(raw_lines))
+
+
+class CheckSpec(NamedTuple):
+    order: int
+    name: str
+    fn: Callable[..., Any]
+    needs: Tuple[str, ...] = ()
+    timeout_s: float | None = None
+    wants_ctx: bool = False
+
+
+# Internal registry entries (first three fields: order, name, fn)
+REGISTRY: List[CheckSpec] = []
+
+def _wants_ctx(fn: Callable[..., Any]) -> bool:
+    import inspect
+
+    try:
+        params = [
+            p for p in inspect.signature(fn).parameters.values()
+            if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+        ]
+    except (TypeError, ValueError):  # pragma: no cover - builtins
+        return False
+    return len(params) >= 2
+
+def register(
+    name: str,
+    *,
+    order: int = 100,
+    needs: Tuple[str, ...] | List[str] = (),
+    timeout_s: float | None = None,
+):
     """
     Decorator to register a health check.
 
     order: smaller runs earlier. Non-unique is fine; stable sort keeps definition order
     within identical order values.
+    needs: names of checks that must finish before this one starts (names not
+    registered are ignored).
+    timeout_s: per-check timeout (default HEALTH_CHECK_TIMEOUT_S); a check that
+    overruns is reported as FAIL and its late output discarded.
+    The check is called as fn(report) or, if it takes two arguments,
+    fn(report, ctx) with the shared HealthContext.
     """
 
-    def dec(fn: Callable[[HealthReport], Any]):
-        REGISTRY.append((order, name, fn))
+    def dec(fn: Callable[..., Any]):
+        if getattr(fn, "__module__", None) in _LAZY_MODULES:
+            return fn  # already registered from the manifest
+        REGISTRY.append(CheckSpec(order, name, fn, tuple(needs), timeout_s, _wants_ctx(fn)))
         return fn
 
     return dec
 
-# Import plugin modules (side effect: registration)
-from . import python_version  # noqa: E402,F401
-from . import env  # noqa: E402,F401
-from . import import_bw  # noqa: E402,F401
-from . import runtime_dir  # noqa: E402,F401
-from . import beacons  # noqa: E402,F401
-from . import subscriptions  # noqa: E402,F401
-from . import target_stream  # noqa: E402,F401
 
-def run_all() -> HealthReport:
-    report = HealthReport()
-    for order, name, fn in sorted(REGISTRY, key=lambda t: t[0]):
-        start = time.perf_counter()
+# --- Plugin discovery ---------------------------------------------------------
+#
+# Every non-underscore module in this directory is a plugin. Its @register
+# calls are read statically (ast) into a manifest, cached in __pycache__ and
+# keyed by the plugin files' (name, size, mtime), so startup stats a few
+# files and reads one small JSON file; a plugin module is imported the first
+# time one of its checks runs. Plugins whose register() arguments are not
+# literals are imported eagerly instead.
+
+PLUGIN_DIR = Path(__file__).resolve().parent
+MANIFEST_VERSION = 1
+_LAZY_MODULES: set = set()
+
+
+class LazyCheck:
+    """Stand-in for a check function; imports module.attr on first call."""
+
+    __slots__ = ("module", "attr", "_fn")
+
+    def __init__(self, module: str, attr: str):
+        self.module = module
+        self.attr = attr
+        self._fn: Callable[..., Any] | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._fn is not None
+
+    def __call__(self, *args: Any) -> Any:
+        if self._fn is None:
+            import importlib
+
+            self._fn = getattr(importlib.import_module(self.module), self.attr)
+        return self._fn(*args)
+
+    def __repr__(self) -> str:
+        return f"LazyCheck({self.module}:{self.attr})"
+
+
+def manifest_path() -> Path:
+    override = os.getenv("HEALTH_PLUGIN_MANIFEST")
+    return Path(override) if override else PLUGIN_DIR / "__pycache__" / "health_manifest.json"
+
+
+def _plugin_files(directory: Path = PLUGIN_DIR) -> List[Tuple[str, int, int]]:
+    out = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith(".py") and not entry.name.startswith("_"):
+                st = entry.stat()
+                out.append((entry.name, st.st_size, st.st_mtime_ns))
+    out.sort()
+    return out
+
+
+def _scan_plugin(path: Path, module: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """(@register entries, fully_static) for one plugin file, without importing it."""
+    import ast
+
+    tree = ast.parse(path.read_bytes(), filename=str(path))
+    entries: List[Dict[str, Any]] = []
+    static = True
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for dec in node.decorator_list:
+            if not isinstance(dec, ast.Call):
+                continue
+            func = dec.func
+            if not ((isinstance(func, ast.Name) and func.id == "register")
+                    or (isinstance(func, ast.Attribute) and func.attr == "register")):
+                continue
+            try:
+                if len(dec.args) != 1:
+                    raise ValueError("register() takes one positional argument")
+                kw = {k.arg: ast.literal_eval(k.value) for k in dec.keywords}
+                entries.append({
+                    "name": ast.literal_eval(dec.args[0]),
+                    "order": kw.get("order", 100),
+                    "needs": list(kw.get("needs", ())),
+                    "timeout_s": kw.get("timeout_s"),
+                    "wants_ctx": len(node.args.posonlyargs) + len(node.args.args) >= 2,
+                    "module": module,
+                    "attr": node.name,
+                })
+            except (ValueError, TypeError, SyntaxError):
+                static = False
+    # register() used any other way (loops, factories) is only seen by importing.
+    calls = sum(1 for n in ast.walk(tree) if isinstance(n, ast.Call) and (
+        (isinstance(n.func, ast.Name) and n.func.id == "register")
+        or (isinstance(n.func, ast.Attribute) and n.func.attr == "register")))
+    if calls != len(entries):
+        static = False
+    return entries, static
+
+
+def build_manifest(directory: Path = PLUGIN_DIR, package: str = __name__) -> Dict[str, Any]:
+    files = _plugin_files(directory)
+    checks: List[Dict[str, Any]] = []
+    eager: List[str] = []
+    for name, _, _ in files:
+        module = f"{package}.{name[:-3]}"
+        entries, static = _scan_plugin(directory / name, module)
+        if static:
+            checks.extend(entries)
+        else:
+            eager.append(module)
+    return {"version": MANIFEST_VERSION, "files": [list(f) for f in files],
+            "checks": checks, "eager": eager}
+
+
+def load_manifest() -> Dict[str, Any]:
+    """Cached manifest if still valid for the plugin files, else rebuilt (and cached)."""
+    from core import codec
+
+    files = [list(f) for f in _plugin_files()]
+    path = manifest_path()
+    try:
+        cached = codec.loads(path.read_bytes())
+        if cached.get("version") == MANIFEST_VERSION and cached.get("files") == files:
+            return cached
+    except (OSError, ValueError, AttributeError):
+        pass
+    manifest = build_manifest()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(codec.dumpb(manifest))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only install: rebuild (cheap) next time
+    return manifest
+
+
+def _register_manifest(manifest: Dict[str, Any]) -> None:
+    import importlib
+
+    for c in manifest["checks"]:
+        _LAZY_MODULES.add(c["module"])
+        REGISTRY.append(CheckSpec(c["order"], c["name"], LazyCheck(c["module"], c["attr"]),
+                                  tuple(c["needs"]), c["timeout_s"], c["wants_ctx"]))
+    for module in manifest["eager"]:
+        importlib.import_module(module)
+
+
+def select(only: List[str] | None = None, skip: List[str] | None = None,
+           specs: List[CheckSpec] | None = None) -> List[CheckSpec]:
+    """
+    Registry entries whose name matches any `only` pattern (all if None) and
+    no `skip` pattern. Patterns are fnmatch globs ("beacon*", "env:*").
+    Raises ValueError for an `only` pattern that matches nothing.
+    """
+    from fnmatch import fnmatchcase
+
+    pool = REGISTRY if specs is None else specs
+    if only:
+        unknown = [p for p in only if not any(fnmatchcase(s.name, p) for s in pool)]
+        if unknown:
+            raise ValueError(f"unknown check(s): {', '.join(unknown)}")
+        pool = [s for s in pool if any(fnmatchcase(s.name, p) for p in only)]
+    if skip:
+        pool = [s for s in pool if not any(fnmatchcase(s.name, p) for p in skip)]
+    return list(pool)
+
+
+_register_manifest(load_manifest())
+
+def _run_check(spec: CheckSpec, ctx: HealthContext) -> HealthReport:
+    sub = HealthReport()
+    start = time.perf_counter()
+    try:
+        if spec.wants_ctx:
+            spec.fn(sub, ctx)
+        else:
+            spec.fn(sub)
+    except Exception as e:  # pragma: no cover - defensive
+        elapsed = (time.perf_counter() - start) * 1000
+        sub.add(spec.name, "FAIL", f"exception: {e}", fatal=False, elapsed_ms=elapsed)
+    else:
+        elapsed = (time.perf_counter() - start) * 1000
+        if not sub.items or sub.items[-1].check != spec.name:
+            sub.add(spec.name, "OK", "no detail", elapsed_ms=elapsed)
+        else:
+            sub.items[-1].elapsed_ms = elapsed
+    return sub
+
+class _CheckRun:
+    """
+    One check running on its own daemon thread (a small future). Daemon
+    threads are not joined at interpreter exit, so a check that hangs past
+    its timeout cannot keep a probe process alive.
+    """
+
+    __slots__ = ("spec", "started", "result", "_done", "_notify")
+
+    def __init__(self, spec: CheckSpec, ctx: HealthContext, notify: Callable[["_CheckRun"], None]):
+        self.spec = spec
+        self.started = time.monotonic()
+        self.result: Optional[HealthReport] = None
+        self._done = threading.Event()
+        self._notify = notify
+        threading.Thread(target=self._run, args=(ctx,), name=f"health-{spec.name}",
+                         daemon=True).start()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def _run(self, ctx: HealthContext) -> None:
+        self.result = _run_check(self.spec, ctx)
+        self._done.set()
+        self._notify(self)
+
+
+def run_all(
+    *,
+    parallel: bool = True,
+    max_workers: int | None = None,
+    timeout_s: float | None = None,
+    ctx: HealthContext | None = None,
+    specs: List[CheckSpec] | None = None,
+    inflight: Dict[str, _CheckRun] | None = None,
+) -> HealthReport:
+    """
+    Run checks (default: whole REGISTRY) and return the merged report.
+
+    parallel=False runs one check at a time in registry order. Dependencies
+    (`needs`) are honoured either way; checks caught in a dependency cycle
+    are reported as FAIL. A check still running at its timeout is reported
+    as FAIL and left behind on its daemon thread.
+
+    inflight (check name -> run) carries those timed-out runs between calls:
+    a check whose previous run has not returned yet is reported as FAIL
+    instead of being started again, so repeated calls (HealthDaemon) keep
+    at most one thread per hung check.
+    """
+    import queue
+
+    started = time.perf_counter()
+    ctx = ctx or HealthContext()
+    ordered = sorted(REGISTRY if specs is None else specs, key=lambda t: t.order)
+    default_timeout = DEFAULT_TIMEOUT_S if timeout_s is None else timeout_s
+    names = {s.name for s in ordered}
+    deps = [tuple(d for d in s.needs if d in names and d != s.name) for s in ordered]
+    remaining_by_name: Dict[str, int] = {}
+    for s in ordered:
+        remaining_by_name[s.name] = remaining_by_name.get(s.name, 0) + 1
+
+    results: Dict[int, HealthReport] = {}
+    pending = list(range(len(ordered)))
+    running: Dict[_CheckRun, Tuple[int, float]] = {}
+    completed: "queue.SimpleQueue[_CheckRun]" = queue.SimpleQueue()
+    workers = 1 if not parallel else (max_workers or min(8, max(1, len(ordered))))
+
+    def limit_of(spec: CheckSpec) -> float:
+        return spec.timeout_s if spec.timeout_s is not None else default_timeout
+
+    def finish(idx: int, sub: HealthReport) -> None:
+        results[idx] = sub
+        remaining_by_name[ordered[idx].name] -= 1
+
+    while pending or running:
+        for idx in list(pending):
+            if len(running) >= workers:
+                break
+            if all(remaining_by_name[d] == 0 for d in deps[idx]):
+                pending.remove(idx)
+                spec = ordered[idx]
+                stuck = inflight.pop(spec.name, None) if inflight is not None else None
+                if stuck is not None and not stuck.done():
+                    inflight[spec.name] = stuck
+                    age = time.monotonic() - stuck.started
+                    sub = HealthReport()
+                    sub.add(spec.name, "FAIL",
+                            f"still running after {age:.1f}s (timed out earlier)", elapsed_ms=0.0)
+                    finish(idx, sub)
+                    continue
+                run = _CheckRun(spec, ctx, completed.put)
+                running[run] = (idx, run.started + limit_of(spec))
+        if not running:
+            # Nothing runnable and nothing in flight: dependency cycle.
+            for idx in pending:
+                sub = HealthReport()
+                sub.add(ordered[idx].name, "FAIL",
+                        f"dependency cycle: needs {','.join(deps[idx])}", elapsed_ms=0.0)
+                finish(idx, sub)
+            pending.clear()
+            break
+        next_deadline = min(deadline for _, deadline in running.values())
         try:
-            fn(report)
-        except Exception as e:  # pragma: no cover - defensive
-            elapsed = (time.perf_counter() - start) * 1000
-            report.add(name, "FAIL", f"exception: {e}", fatal=False, elapsed_ms=elapsed)
+            run = completed.get(timeout=max(0.0, next_deadline - time.monotonic()))
+        except queue.Empty:
+            pass
         else:
-            if not report.items or report.items[-1].check != name:
-                elapsed = (time.perf_counter() - start) * 1000
-                report.add(name, "OK", "no detail", elapsed_ms=elapsed)
-            else:
-                elapsed = (time.perf_counter() - start) * 1000
-                report.items[-1].elapsed_ms = elapsed
+            while True:
+                if run in running:  # else: it already timed out
+                    finish(running.pop(run)[0], run.result)
+                try:
+                    run = completed.get_nowait()
+                except queue.Empty:
+                    break
+        now = time.monotonic()
+        for run, (idx, deadline) in list(running.items()):
+            if now < deadline:
+                continue
+            running.pop(run)
+            limit = limit_of(run.spec)
+            sub = HealthReport()
+            sub.add(run.spec.name, "FAIL", f"timeout after {limit:g}s", elapsed_ms=limit * 1000)
+            finish(idx, sub)
+            if inflight is not None:
+                inflight[run.spec.name] = run
+
+    report = HealthReport()
+    for idx in range(len(ordered)):
+        sub = results[idx]
+        report.items.extend(sub.items)
+        report.fatal = report.fatal or sub.fatal
+    if metrics.ENABLED:
+        for item in report.items:
+            if item.elapsed_ms is not None:
+                _M_CHECK_SECONDS.observe(item.elapsed_ms / 1000, check=item.check)
+            _M_CHECK_STATUS.inc(check=item.check, status=item.status)
+        _M_RUN_SECONDS.observe(time.perf_counter() - started)
     return report
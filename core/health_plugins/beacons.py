@@ -1,16 +1,14 @@
 from __future__ import annotations
-import json
-import os
-from pathlib import Path
-from collections import deque
 from . import register
 
+# Windows over the shared context tail (non-blank lines, newest last)
 MAX_READ = 500
+SHAPE_WINDOW = 50
 
 
 @register("beacons_file", order=40)
-def file_check(report):
-    path = Path(os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl"))
+def file_check(report, ctx):
+    path = ctx.beacon_path
     if not path.exists():
         report.add("beacons_file", "WARN", f"missing {path}")
         return
@@ -25,34 +23,24 @@ def file_check(report):
 
 
 @register("beacons_parse", order=50)
-def parse_check(report):
-    path = Path(os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl"))
+def parse_check(report, ctx):
+    path = ctx.beacon_path
     if not path.exists():
         report.add("beacons_parse", "WARN", "no file")
         return
     good = 0
     bad = 0
-    lines_kept = deque(maxlen=MAX_READ)
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                lines_kept.append(line.rstrip("\n"))
-    except Exception as e:
-        report.add("beacons_parse", "FAIL", f"read error: {e}")
+    tail = ctx.beacon_tail()
+    if tail.error is not None:
+        report.add("beacons_parse", "FAIL", f"read error: {tail.error}")
         return
     last_struct_ok = 0
-    for ln in lines_kept:
-        if not ln.strip():
-            continue
-        try:
-            obj = json.loads(ln)
-            if isinstance(obj, dict):
-                good += 1
-                if "stream_id" in obj and "state" in obj:
-                    last_struct_ok += 1
-            else:
-                bad += 1
-        except Exception:
+    for ok, obj in tail.entries[-MAX_READ:]:
+        if ok and isinstance(obj, dict):
+            good += 1
+            if "stream_id" in obj and "state" in obj:
+                last_struct_ok += 1
+        else:
             bad += 1
     total = good + bad
     if total == 0:
@@ -68,30 +56,26 @@ def parse_check(report):
 
 
 @register("beacon_shape", order=60)
-def shape_check(report):
-    path = Path(os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl"))
+def shape_check(report, ctx):
+    path = ctx.beacon_path
     if not path.exists():
         report.add("beacon_shape", "WARN", "no file")
         return
     structural = 0
     scanned = 0
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            for line in deque(f, maxlen=50):
-                scanned += 1
-                try:
-                    obj = json.loads(line)
-                    if (
-                        isinstance(obj, dict)
-                        and "state" in obj
-                        and "stream_id" in obj
-                    ):
-                        structural += 1
-                except Exception:
-                    pass
-    except Exception as e:
-        report.add("beacon_shape", "FAIL", f"read error: {e}")
+    tail = ctx.beacon_tail()
+    if tail.error is not None:
+        report.add("beacon_shape", "FAIL", f"read error: {tail.error}")
         return
+    for ok, obj in tail.entries[-SHAPE_WINDOW:]:
+        scanned += 1
+        if (
+            ok
+            and isinstance(obj, dict)
+            and "state" in obj
+            and "stream_id" in obj
+        ):
+            structural += 1
     if scanned == 0:
         report.add("beacon_shape", "WARN", "no lines")
         return
@@ -1,23 +1,22 @@
 from __future__ import annotations
-import json
-import os
-from pathlib import Path
+from core import subscriptions
 from . import register
 
 
 @register("subscriptions_file", order=70)
-def check(report):
-    path = Path(os.getenv("NOISE_SEEK_SUBSCRIPTIONS_PATH", "runtime/subscriptions.json"))
-    if not path.exists():
+def check(report, ctx):
+    path = ctx.subscriptions_path
+    journal = subscriptions.journal_path(path)
+    if not path.exists() and not journal.exists():
         report.add("subscriptions_file", "WARN", "missing")
         return
     try:
-        raw = path.read_text(encoding="utf-8")
-        data = json.loads(raw)
+        # snapshot + journal replay, i.e. what SeekingController sees
+        data = subscriptions.materialize(path)
     except Exception as e:
         report.add("subscriptions_file", "FAIL", f"parse error: {e}")
         return
-    if not isinstance(data, dict):
-        report.add("subscriptions_file", "FAIL", "root not object")
-        return
-    report.add("subscriptions_file", "OK", f"streams={len(data)}")
+    detail = f"streams={len(data)}"
+    if journal.exists():
+        detail += f" journal_bytes={journal.stat().st_size}"
+    report.add("subscriptions_file", "OK", detail)
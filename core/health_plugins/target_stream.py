@@ -1,39 +1,30 @@
 from __future__ import annotations
-import json
 import os
-from pathlib import Path
-from collections import deque
 from . import register
 
+WINDOW = 400
+
 
 @register("target_stream", order=80)
-def check(report):
+def check(report, ctx):
     target = os.getenv("TARGET_STREAM_ID")
     if not target:
         report.add("target_stream", "WARN", "TARGET_STREAM_ID unset")
         return
-    path = Path(os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl"))
-    if not path.exists():
+    if not ctx.beacon_path.exists():
         report.add("target_stream", "WARN", "no beacons file")
         return
-    found = False
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            for line in deque(f, maxlen=400):
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    continue
-                if (
-                    isinstance(obj, dict)
-                    and obj.get("stream_id") == target
-                    and str(obj.get("state", "")).startswith("seeking_")
-                ): 
-                    found = True
-                    break
-    except Exception as e:
-        report.add("target_stream", "FAIL", f"read error: {e}")
+    tail = ctx.beacon_tail()
+    if tail.error is not None:
+        report.add("target_stream", "FAIL", f"read error: {tail.error}")
         return
+    found = any(
+        ok
+        and isinstance(obj, dict)
+        and obj.get("stream_id") == target
+        and str(obj.get("state", "")).startswith("seeking_")
+        for ok, obj in tail.entries[-WINDOW:]
+    )
     if found:
         report.add("target_stream", "OK", target)
     else:
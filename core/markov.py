@@ -0,0 +1,343 @@
+"""
+Compiled Markov model for noise generation.
+
+compile_tokens() turns a token list into an order-n chain with integer
+token ids and CSR-style successor arrays:
+
+  states        S x n token ids (every n-gram window of the corpus)
+  edge_off      S + 1 offsets; edges of state s are edge_off[s]:edge_off[s+1]
+  edge_tok      successor token id per edge (duplicates folded into weights)
+  edge_next     state reached after emitting the successor, or -1 (dead end)
+  edge_prob /   Vose alias table per state, so a weighted successor is
+  edge_alias    drawn with one random() call in O(1)
+  start_prob /  alias table over states weighted by how often the window
+  start_alias   occurs (order 1: same as random.choice(tokens))
+
+Dead ends restart from the start distribution, like markov_sequence() in
+scripts/workers/noise_metadata.py. The model lives in one flat buffer
+(little-endian, 8-byte aligned sections); save() writes it as-is and
+load() maps the file with mmap, so workers start without rebuilding
+anything.
+
+CLI:
+  python -m core.markov compile corpus.txt model.nsmk [--order 2]
+  python -m core.markov sample model.nsmk [--n 12] [--count 5]
+"""
+
+from __future__ import annotations
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"NSMK"
+VERSION = 1
+# magic, version, order, vocab, states, edges, vocab blob bytes
+_HEADER = struct.Struct("<4sIIIQQQ")
+# (name, typecode) in file order; lengths follow from the header counts
+_SECTIONS = (
+    ("vocab_off", "q"),
+    ("vocab_blob", "B"),
+    ("states", "i"),
+    ("start_prob", "d"),
+    ("start_alias", "i"),
+    ("edge_off", "q"),
+    ("edge_tok", "i"),
+    ("edge_next", "i"),
+    ("edge_prob", "d"),
+    ("edge_alias", "i"),
+)
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _alias_table(weights: Sequence[int]) -> Tuple[List[float], List[int]]:
+    """Vose alias method: (prob, alias) with indexes relative to the table."""
+    k = len(weights)
+    total = sum(weights)
+    scaled = [w * k / total for w in weights]
+    prob = [1.0] * k
+    alias = list(range(k))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, g = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] -= 1.0 - scaled[s]
+        (small if scaled[g] < 1.0 else large).append(g)
+    return prob, alias
+
+
+def _lengths(order: int, n_vocab: int, n_states: int, n_edges: int, blob: int) -> Dict[str, int]:
+    return {
+        "vocab_off": n_vocab + 1,
+        "vocab_blob": blob,
+        "states": n_states * order,
+        "start_prob": n_states,
+        "start_alias": n_states,
+        "edge_off": n_states + 1,
+        "edge_tok": n_edges,
+        "edge_next": n_edges,
+        "edge_prob": n_edges,
+        "edge_alias": n_edges,
+    }
+
+
+class MarkovModel:
+    """Read-only view over a compiled model buffer (bytes or mmap)."""
+
+    def __init__(self, buf, _mm: Optional[mmap.mmap] = None, _file=None):
+        if sys.byteorder != "little":  # pragma: no cover
+            raise ValueError("compiled Markov models are little-endian only")
+        magic, version, order, n_vocab, n_states, n_edges, blob = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a compiled Markov model (bad magic/version)")
+        self.order = order
+        self.n_states = n_states
+        self.n_edges = n_edges
+        self._buf = buf
+        self._mm = _mm
+        self._file = _file
+        mv = memoryview(buf)
+        pos = _align(_HEADER.size)
+        views = {}
+        for name, code in _SECTIONS:
+            n = _lengths(order, n_vocab, n_states, n_edges, blob)[name]
+            size = n * struct.calcsize(code)
+            views[name] = mv[pos:pos + size].cast(code)
+            pos = _align(pos + size)
+        self._views = views
+        off = views["vocab_off"]
+        raw = views["vocab_blob"]
+        self.vocab: List[str] = [bytes(raw[off[i]:off[i + 1]]).decode("utf-8")
+                                 for i in range(n_vocab)]
+        self._states = views["states"]
+        self._start_prob = views["start_prob"]
+        self._start_alias = views["start_alias"]
+        self._edge_off = views["edge_off"]
+        self._edge_tok = views["edge_tok"]
+        self._edge_next = views["edge_next"]
+        self._edge_prob = views["edge_prob"]
+        self._edge_alias = views["edge_alias"]
+
+    # --- sampling ---------------------------------------------------------------
+
+    def _start(self, rnd) -> int:
+        u = rnd() * self.n_states
+        i = int(u)
+        return i if u - i < self._start_prob[i] else self._start_alias[i]
+
+    def sequence_ids(self, n: int, rng: Optional[random.Random] = None) -> List[int]:
+        """n token ids; restarts from the start distribution at dead ends."""
+        if n <= 0 or not self.n_states:
+            return []
+        rnd = (rng or random).random
+        order = self.order
+        states, e_off, e_tok, e_next = self._states, self._edge_off, self._edge_tok, self._edge_next
+        e_prob, e_alias = self._edge_prob, self._edge_alias
+        s = self._start(rnd)
+        out = list(states[s * order:(s + 1) * order])
+        while len(out) < n:
+            lo = e_off[s]
+            k = e_off[s + 1] - lo
+            if not k:
+                s = self._start(rnd)
+                out.extend(states[s * order:(s + 1) * order])
+                continue
+            u = rnd() * k
+            i = int(u)
+            e = lo + (i if u - i < e_prob[lo + i] else e_alias[lo + i])
+            out.append(e_tok[e])
+            s = e_next[e]
+            if s < 0:
+                s = self._start(rnd)
+                out.extend(states[s * order:(s + 1) * order])
+        return out[:n]
+
+    def sequence(self, n: int, rng: Optional[random.Random] = None) -> List[str]:
+        vocab = self.vocab
+        return [vocab[i] for i in self.sequence_ids(n, rng)]
+
+    def successors(self, state: Sequence[str]) -> Dict[str, float]:
+        """Successor probabilities of a state given as order tokens (for inspection)."""
+        ids = {t: i for i, t in enumerate(self.vocab)}
+        key = [ids.get(t, -1) for t in state]
+        order = self.order
+        for s in range(self.n_states):
+            if list(self._states[s * order:(s + 1) * order]) == key:
+                lo, hi = self._edge_off[s], self._edge_off[s + 1]
+                k = hi - lo
+                probs: Dict[str, float] = {}
+                for j in range(k):
+                    p = self._edge_prob[lo + j]
+                    own = self.vocab[self._edge_tok[lo + j]]
+                    other = self.vocab[self._edge_tok[lo + self._edge_alias[lo + j]]]
+                    probs[own] = probs.get(own, 0.0) + p / k
+                    probs[other] = probs.get(other, 0.0) + (1.0 - p) / k
+                return probs
+        return {}
+
+    # --- persistence ----------------------------------------------------------------
+
+    def save(self, path: str | os.PathLike) -> None:
+        tmp = f"{os.fspath(path)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._buf)
+        os.replace(tmp, path)
+
+    def close(self) -> None:
+        self._views.clear()
+        for attr in ("_states", "_start_prob", "_start_alias", "_edge_off", "_edge_tok",
+                     "_edge_next", "_edge_prob", "_edge_alias"):
+            getattr(self, attr).release()
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compile_tokens(tokens: Sequence[str], order: int = 1) -> MarkovModel:
+    """Compile an order-n chain over tokens (duplicate successors become weights)."""
+    if order < 1:
+        raise ValueError("order must be >= 1")
+    ids: Dict[str, int] = {}
+    seq = [ids.setdefault(t, len(ids)) for t in tokens]
+    state_ix: Dict[Tuple[int, ...], int] = {}
+    start_w: List[int] = []
+    succ: List[Dict[int, int]] = []
+    for i in range(len(seq) - order + 1):
+        key = tuple(seq[i:i + order])
+        s = state_ix.get(key)
+        if s is None:
+            s = state_ix[key] = len(start_w)
+            start_w.append(0)
+            succ.append({})
+        start_w[s] += 1
+        if i + order < len(seq):
+            nxt = succ[s]
+            tok = seq[i + order]
+            nxt[tok] = nxt.get(tok, 0) + 1
+
+    vocab = list(ids)
+    n_states = len(start_w)
+    states = array("i")
+    for key in state_ix:
+        states.extend(key)
+    edge_off = array("q", [0])
+    edge_tok, edge_next, edge_alias = array("i"), array("i"), array("i")
+    edge_prob = array("d")
+    for s, key in enumerate(state_ix):
+        weights = succ[s]
+        for tok in weights:
+            edge_tok.append(tok)
+            edge_next.append(state_ix.get(key[1:] + (tok,), -1))
+        if weights:
+            prob, alias = _alias_table(list(weights.values()))
+            edge_prob.extend(prob)
+            edge_alias.extend(alias)
+        edge_off.append(len(edge_tok))
+    start_prob, start_alias = _alias_table(start_w) if start_w else ([], [])
+
+    blob = bytearray()
+    vocab_off = array("q", [0])
+    for t in vocab:
+        blob += t.encode("utf-8")
+        vocab_off.append(len(blob))
+    data = {
+        "vocab_off": vocab_off,
+        "vocab_blob": bytes(blob),
+        "states": states,
+        "start_prob": array("d", start_prob),
+        "start_alias": array("i", start_alias),
+        "edge_off": edge_off,
+        "edge_tok": edge_tok,
+        "edge_next": edge_next,
+        "edge_prob": edge_prob,
+        "edge_alias": edge_alias,
+    }
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, order, len(vocab), n_states,
+                                 len(edge_tok), len(blob)))
+    for name, _ in _SECTIONS:
+        out += b"\0" * (_align(len(out)) - len(out))
+        part = data[name]
+        out += part if isinstance(part, bytes) else part.tobytes()
+    return MarkovModel(bytes(out))
+
+
+def compile_text(text: str, order: int = 1) -> MarkovModel:
+    return compile_tokens(text.split(), order)
+
+
+def compile_files(paths: Iterable[str | os.PathLike], order: int = 1) -> MarkovModel:
+    tokens: List[str] = []
+    for p in paths:
+        with open(p, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                tokens.extend(line.split())
+    return compile_tokens(tokens, order)
+
+
+def load(path: str | os.PathLike) -> MarkovModel:
+    """Memory-map a saved model (pages are shared between worker processes)."""
+    f = open(path, "rb")
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except BaseException:
+        f.close()
+        raise
+    try:
+        return MarkovModel(mm, _mm=mm, _file=f)
+    except BaseException:
+        mm.close()
+        f.close()
+        raise
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Compile / sample Markov noise models")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compile", help="compile text corpora into a model file")
+    c.add_argument("corpus", nargs="+")
+    c.add_argument("out")
+    c.add_argument("--order", type=int, default=1)
+    s = sub.add_parser("sample", help="print sequences from a model file")
+    s.add_argument("model")
+    s.add_argument("--n", type=int, default=12)
+    s.add_argument("--count", type=int, default=5)
+    args = ap.parse_args()
+    if args.cmd == "compile":
+        model = compile_files(args.corpus, args.order)
+        model.save(args.out)
+        print(f"[markov] wrote {args.out} order={model.order} vocab={len(model.vocab)} "
+              f"states={model.n_states} edges={model.n_edges}")
+    else:
+        with load(args.model) as model:
+            for _ in range(args.count):
+                print(" ".join(model.sequence(args.n)))
+
+
+__all__ = [
+    "MarkovModel",
+    "compile_files",
+    "compile_text",
+    "compile_tokens",
+    "load",
+]
+
+
+if __name__ == "__main__":
+    main()
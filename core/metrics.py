@@ -0,0 +1,346 @@
+"""
+In-process metrics: counters, gauges and HDR-style latency histograms.
+
+Disabled by default. Instrumented call sites guard on the module flag
+
+    if metrics.ENABLED:
+        ...
+
+so the cost when off is one attribute lookup. Enable with
+NOISE_SEEK_METRICS=1 (or metrics.enable()).
+
+Histograms record integer microseconds into log-linear buckets (32 linear
+sub-buckets per power of two, i.e. <= ~3% relative error) and can report
+percentiles; the Prometheus export folds them into a fixed 1-2-5 `le`
+ladder (in seconds) so bucket sets stay stable between scrapes.
+
+Export (Prometheus text format 0.0.4):
+  render_prometheus()                  -> str
+  write_prometheus(path)               atomic file write
+  start_file_exporter(path, every_s)   daemon thread (+ final write at exit)
+  start_http_server(port, host)        GET /metrics on a daemon thread
+
+Env:
+  NOISE_SEEK_METRICS=1                 enable collection
+  NOISE_SEEK_METRICS_FILE=path         export to this file periodically
+  NOISE_SEEK_METRICS_FILE_EVERY_S      export interval (default 10)
+  NOISE_SEEK_METRICS_PORT=port         serve http://127.0.0.1:port/metrics
+"""
+
+from __future__ import annotations
+import atexit
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ENABLED = os.getenv("NOISE_SEEK_METRICS", "") not in ("", "0")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_SUB_BITS = 5
+_SUB = 1 << _SUB_BITS
+# Exported `le` ladder in seconds: 10us .. 100s
+LE_BOUNDS = [m * 10.0 ** e for e in range(-5, 2) for m in (1, 2, 5)] + [100.0]
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def render(self) -> Iterator[str]:  # pragma: no cover - abstract
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, n: float = 1, **labels: str) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_key(labels), 0)
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_fmt_labels(key)} {_fmt_value(v)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, v: float, **labels: str) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = v
+
+    def inc(self, n: float = 1, **labels: str) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_key(labels), 0)
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_fmt_labels(key)} {_fmt_value(v)}"
+
+
+def _bucket(us: int) -> int:
+    if us < 2 * _SUB:
+        return us if us > 0 else 0
+    shift = us.bit_length() - _SUB_BITS - 1
+    return _SUB * shift + (us >> shift)
+
+
+def _bucket_high(idx: int) -> int:
+    """Largest microsecond value that falls into bucket idx."""
+    if idx < 2 * _SUB:
+        return idx
+    shift = idx // _SUB - 1
+    m = idx % _SUB + _SUB
+    return ((m + 1) << shift) - 1
+
+
+class _HdrData:
+    __slots__ = ("counts", "count", "sum_us", "max_us")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+
+class Histogram(_Metric):
+    """Latency histogram; observe() takes seconds, observe_us() microseconds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._data: Dict[LabelKey, _HdrData] = {}
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        self.observe_us(int(seconds * 1e6), **labels)
+
+    def observe_us(self, us: int, **labels: str) -> None:
+        key = _key(labels)
+        idx = _bucket(us)
+        with self._lock:
+            d = self._data.get(key)
+            if d is None:
+                d = self._data[key] = _HdrData()
+            d.counts[idx] = d.counts.get(idx, 0) + 1
+            d.count += 1
+            d.sum_us += us
+            if us > d.max_us:
+                d.max_us = us
+
+    def count(self, **labels: str) -> int:
+        d = self._data.get(_key(labels))
+        return d.count if d else 0
+
+    def percentile(self, p: float, **labels: str) -> Optional[float]:
+        """Approximate p-th percentile in seconds (bucket upper bound), None if empty."""
+        d = self._data.get(_key(labels))
+        if not d or not d.count:
+            return None
+        rank = max(1, int(round(p / 100.0 * d.count)))
+        seen = 0
+        for idx in sorted(d.counts):
+            seen += d.counts[idx]
+            if seen >= rank:
+                return min(_bucket_high(idx), d.max_us) / 1e6
+        return d.max_us / 1e6
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            items = [(k, sorted(d.counts.items()), d.count, d.sum_us)
+                     for k, d in sorted(self._data.items())]
+        for key, counts, total, sum_us in items:
+            cum = 0
+            pos = 0
+            for le in LE_BOUNDS:
+                limit_us = le * 1e6
+                while pos < len(counts) and _bucket_high(counts[pos][0]) <= limit_us:
+                    cum += counts[pos][1]
+                    pos += 1
+                yield f"{self.name}_bucket{_fmt_labels(key, ('le', _fmt_value(le)))} {cum}"
+            yield f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {total}"
+            yield f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(sum_us / 1e6)}"
+            yield f"{self.name}_count{_fmt_labels(key)} {total}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str):
+        m = self._metrics.get(name)
+        if m is None:
+            with self._lock:
+                m = self._metrics.setdefault(name, cls(name, help))
+        if not isinstance(m, cls):
+            raise TypeError(f"metric {name} already registered as {m.kind}")
+        return m
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "") -> Histogram:
+        return self._get(Histogram, name, help)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            m = self._metrics[name]
+            if m.help:
+                lines.append(f"# HELP {name} {m.help}")
+            lines.append(f"# TYPE {name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render_prometheus = REGISTRY.render_prometheus
+
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = on
+
+
+def write_prometheus(path: str | os.PathLike) -> None:
+    path = os.fspath(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+def start_file_exporter(path: str | os.PathLike, every_s: float = 10.0) -> threading.Thread:
+    def loop():
+        while True:
+            time.sleep(every_s)
+            try:
+                write_prometheus(path)
+            except Exception as e:
+                print(f"[metrics] export error: {e}")
+
+    atexit.register(lambda: write_prometheus(path))
+    t = threading.Thread(target=loop, name="metrics-file", daemon=True)
+    t.start()
+    return t
+
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """Serve GET /metrics; returns the server (call .shutdown() to stop)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def _configure_from_env() -> None:
+    if not ENABLED:
+        return
+    path = os.getenv("NOISE_SEEK_METRICS_FILE")
+    if path:
+        start_file_exporter(path, float(os.getenv("NOISE_SEEK_METRICS_FILE_EVERY_S", 10)))
+    port = os.getenv("NOISE_SEEK_METRICS_PORT")
+    if port:
+        try:
+            start_http_server(int(port))
+        except OSError as e:
+            print(f"[metrics] cannot serve on port {port}: {e}")
+
+
+_configure_from_env()
+
+
+__all__ = [
+    "Counter",
+    "ENABLED",
+    "Gauge",
+    "Histogram",
+    "REGISTRY",
+    "Registry",
+    "counter",
+    "enable",
+    "gauge",
+    "histogram",
+    "render_prometheus",
+    "start_file_exporter",
+    "start_http_server",
+    "write_prometheus",
+]
@@ -0,0 +1,364 @@
+"""
+Deterministic replay of the seeking state machine.
+
+Drives one SeekingController per stream from a recorded event log with a
+virtual clock (event time, never time.time()) and in-memory subscriptions,
+then diffs the beacons it produced against a recorded beacons.jsonl.
+
+Event log (JSONL, non-decreasing "t" in epoch seconds):
+  {"t": 1724871000.25, "ev": "tick",     "stream_id": "s1", "n": 3}
+  {"t": ...,           "ev": "delivery", "stream_id": "s1", "n": 1}
+  {"t": ...,           "ev": "sub",      "stream_id": "s1", "listener_id": "L1"}
+  {"t": ...,           "ev": "unsub",    "stream_id": "s1", "listener_id": "L1"}
+  {"t": ...,           "ev": "update",   "stream_id": "s1",
+   "entropy_profile": ..., "tokens_hint": [...], "spore": ...}
+
+"update" is one update_and_maybe_beacon() call. EventRecorder writes this
+format; events_from_journal() turns a subscriptions journal (whose events
+carry "ts") into sub/unsub events, and merge_events() interleaves sources.
+
+CLI:
+  python -m core.replay events.jsonl [--journal subscriptions.journal.jsonl]
+                        [--beacons runtime/beacons.jsonl] [--json]
+  python -m core.replay --synthetic 1000000 [--streams 1000]
+"""
+
+from __future__ import annotations
+import dataclasses
+import heapq
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core import codec
+from core.seeking import SeekingConfig, SeekingController, SeekingStateData
+
+class VirtualClock:
+    """Clock that only moves when the replay says so."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Stand-in for time.sleep: jump ahead instead of waiting."""
+        self.now += max(0.0, seconds)
+
+
+class ReplaySubscriptions:
+    """In-memory stand-in for SubscriptionsCache (listeners(stream_id))."""
+
+    def __init__(self, initial: Optional[Dict[str, Any]] = None):
+        self.data: Dict[str, List[str]] = {k: list(v) for k, v in (initial or {}).items()
+                                           if isinstance(v, list)}
+
+    def listeners(self, stream_id: str) -> List[str]:
+        return self.data.get(stream_id) or []
+
+    def subscribe(self, stream_id: str, listener_id: str) -> None:
+        lst = self.data.setdefault(stream_id, [])
+        if listener_id not in lst:
+            lst.append(listener_id)
+
+    def unsubscribe(self, stream_id: str, listener_id: str) -> None:
+        lst = self.data.get(stream_id)
+        if lst and listener_id in lst:
+            lst.remove(listener_id)
+            if not lst:
+                del self.data[stream_id]
+
+
+@dataclasses.dataclass
+class ReplayResult:
+    events: int
+    seconds: float
+    beacons: List[Dict[str, Any]]
+    states: Dict[str, SeekingStateData]
+    first_t: Optional[float] = None   # event time range covered
+    last_t: Optional[float] = None
+
+    @property
+    def events_per_s(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+
+class Replayer:
+    """
+    Replays events through SeekingController instances sharing one
+    VirtualClock. cfg supplies thresholds / mode / tempo; stream_id is
+    replaced per stream. Unknown event types are counted and skipped.
+    """
+
+    def __init__(self, cfg: Optional[SeekingConfig] = None,
+                 initial_subscriptions: Optional[Dict[str, Any]] = None):
+        self.cfg = cfg or SeekingConfig()
+        self.clock = VirtualClock()
+        self.subscriptions = ReplaySubscriptions(initial_subscriptions)
+        self.controllers: Dict[str, SeekingController] = {}
+        self.beacons: List[Dict[str, Any]] = []
+        self.events = 0
+        self.skipped = 0
+        self.first_t: Optional[float] = None
+
+    def controller(self, stream_id: str) -> SeekingController:
+        ctl = self.controllers.get(stream_id)
+        if ctl is None:
+            cfg = dataclasses.replace(self.cfg, stream_id=stream_id)
+            ctl = self.controllers[stream_id] = SeekingController(
+                cfg, clock=self.clock, subscriptions=self.subscriptions)
+        return ctl
+
+    def apply(self, ev: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply one event; returns the beacon an "update" produced, if any."""
+        self.events += 1
+        kind = ev.get("ev")
+        sid = ev.get("stream_id")
+        if not isinstance(sid, str):
+            self.skipped += 1
+            return None
+        t = ev.get("t")
+        if t is not None:
+            if self.first_t is None:
+                self.first_t = t
+            self.clock.now = t
+        if kind == "tick":
+            self.controller(sid).record_tick(ev.get("n", 1))
+        elif kind == "delivery":
+            self.controller(sid).record_delivery(ev.get("n", 1))
+        elif kind == "sub":
+            self.subscriptions.subscribe(sid, ev["listener_id"])
+        elif kind == "unsub":
+            self.subscriptions.unsubscribe(sid, ev["listener_id"])
+        elif kind == "update":
+            beacon = self.controller(sid).update_and_maybe_beacon(
+                now=self.clock.now,
+                entropy_profile=ev.get("entropy_profile"),
+                tokens_hint=ev.get("tokens_hint"),
+                spore=ev.get("spore"))
+            if beacon is not None:
+                self.beacons.append(beacon)
+            return beacon
+        else:
+            self.skipped += 1
+        return None
+
+    def run(self, events: Iterable[Dict[str, Any]]) -> ReplayResult:
+        apply = self.apply
+        t0 = time.perf_counter()
+        for ev in events:
+            apply(ev)
+        return ReplayResult(self.events, time.perf_counter() - t0, self.beacons,
+                            {sid: c.data for sid, c in self.controllers.items()},
+                            self.first_t, self.clock.now if self.first_t is not None else None)
+
+
+# --- Event sources ------------------------------------------------------------
+
+def read_events(path: str | os.PathLike) -> Iterator[Dict[str, Any]]:
+    """Events from a JSONL log; malformed lines are skipped."""
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                ev = codec.loads(line)
+            except Exception:
+                continue
+            if isinstance(ev, dict):
+                yield ev
+
+
+def events_from_journal(path: str | os.PathLike) -> Iterator[Dict[str, Any]]:
+    """sub/unsub events from a subscriptions journal (entries without ts are skipped)."""
+    for entry in read_events(path):
+        if entry.get("op") in ("sub", "unsub") and entry.get("ts") is not None:
+            yield {"t": entry["ts"], "ev": entry["op"], "stream_id": entry.get("stream_id"),
+                   "listener_id": entry.get("listener_id")}
+
+
+def merge_events(*sources: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Interleave time-ordered sources by "t" (stable: earlier sources win ties)."""
+    return heapq.merge(*sources, key=lambda ev: ev.get("t") or 0.0)
+
+
+def synthetic_events(n_events: int, n_streams: int = 100, seed: int = 1,
+                     start: float = 1_724_871_000.0) -> Iterator[Dict[str, Any]]:
+    """Reproducible tick / update / delivery / subscription mix for benchmarks."""
+    rng = random.Random(seed)
+    sids = [f"s{i}" for i in range(n_streams)]
+    t = start
+    for i in range(n_events):
+        t += rng.random() * 0.05
+        sid = sids[rng.randrange(n_streams)]
+        r = rng.random()
+        if r < 0.45:
+            yield {"t": t, "ev": "tick", "stream_id": sid, "n": 1 + (i % 3)}
+        elif r < 0.9:
+            yield {"t": t, "ev": "update", "stream_id": sid}
+        elif r < 0.98:
+            yield {"t": t, "ev": "delivery", "stream_id": sid, "n": 1}
+        else:
+            yield {"t": t, "ev": "sub" if r < 0.99 else "unsub", "stream_id": sid,
+                   "listener_id": "L1"}
+
+
+class EventRecorder:
+    """Append-only writer for the replay event log (buffered via BeaconWriter)."""
+
+    def __init__(self, path: str | os.PathLike, **writer_kw: Any):
+        from core.beacon_writer import BeaconWriter
+
+        self._w = BeaconWriter(path, **writer_kw)
+
+    def record(self, t: float, ev: str, stream_id: str, **fields: Any) -> None:
+        self._w.write({"t": t, "ev": ev, "stream_id": stream_id, **fields})
+
+    def tick(self, t: float, stream_id: str, n: int = 1) -> None:
+        self.record(t, "tick", stream_id, n=n)
+
+    def delivery(self, t: float, stream_id: str, n: int = 1) -> None:
+        self.record(t, "delivery", stream_id, n=n)
+
+    def update(self, t: float, stream_id: str, **hints: Any) -> None:
+        self.record(t, "update", stream_id, **{k: v for k, v in hints.items() if v is not None})
+
+    def close(self) -> None:
+        self._w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Diff -------------------------------------------------------------------------
+
+@dataclasses.dataclass
+class BeaconDiff:
+    matched: int = 0
+    mismatched: List[Tuple[Tuple[str, Any], Dict[str, Tuple[Any, Any]]]] = dataclasses.field(default_factory=list)
+    missing: List[Dict[str, Any]] = dataclasses.field(default_factory=list)   # recorded only
+    extra: List[Dict[str, Any]] = dataclasses.field(default_factory=list)     # produced only
+
+    @property
+    def ok(self) -> bool:
+        return not (self.mismatched or self.missing or self.extra)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"ok": self.ok, "matched": self.matched, "mismatched": len(self.mismatched),
+                "missing": len(self.missing), "extra": len(self.extra)}
+
+
+def diff_beacons(produced: Iterable[Dict[str, Any]], recorded: Iterable[Dict[str, Any]],
+                 ignore: Iterable[str] = ()) -> BeaconDiff:
+    """
+    Pair beacons by (stream_id, beacon_n) and compare every other field
+    present in either (minus ignore). Recorded beacons for streams the
+    replay never saw are not reported.
+    """
+    skip = set(ignore)
+    mine = {(b.get("stream_id"), b.get("beacon_n")): b for b in produced}
+    streams = {k[0] for k in mine}
+    out = BeaconDiff()
+    seen = set()
+    for rec in recorded:
+        if not isinstance(rec, dict) or rec.get("stream_id") not in streams:
+            continue
+        key = (rec.get("stream_id"), rec.get("beacon_n"))
+        seen.add(key)
+        got = mine.get(key)
+        if got is None:
+            out.missing.append(rec)
+            continue
+        fields = {f: (got.get(f), rec.get(f)) for f in got.keys() | rec.keys()
+                  if f not in skip and got.get(f) != rec.get(f)}
+        if fields:
+            out.mismatched.append((key, fields))
+        else:
+            out.matched += 1
+    out.extra = [b for k, b in mine.items() if k not in seen]
+    return out
+
+
+def recorded_beacons(path: str | os.PathLike, since: Any = None, until: Any = None) -> List[Dict[str, Any]]:
+    """Recorded beacons (rotated segments included) within [since, until]."""
+    from core.beacon_index import query
+
+    return query(path, since=since, until=until)
+
+
+def main():
+    import argparse
+    import sys
+
+    ap = argparse.ArgumentParser(description="Replay seeking events and diff against beacons")
+    ap.add_argument("events", nargs="?", help="event log (JSONL)")
+    ap.add_argument("--journal", help="subscriptions journal to merge in")
+    ap.add_argument("--subscriptions", help="initial subscriptions snapshot (JSON)")
+    ap.add_argument("--beacons", help="recorded beacons.jsonl to diff against")
+    ap.add_argument("--ignore", action="append", default=[], help="field to skip in the diff")
+    ap.add_argument("--synthetic", type=int, default=0, help="replay N synthetic events instead")
+    ap.add_argument("--streams", type=int, default=100)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    if args.synthetic:
+        events: Iterable[Dict[str, Any]] = list(synthetic_events(args.synthetic, args.streams))
+    elif args.events:
+        sources = [read_events(args.events)]
+        if args.journal:
+            sources.append(events_from_journal(args.journal))
+        events = merge_events(*sources)
+    else:
+        ap.error("need an event log or --synthetic N")
+    initial = codec.loads(Path(args.subscriptions).read_bytes()) if args.subscriptions else None
+    replayer = Replayer(initial_subscriptions=initial)
+    result = replayer.run(events)
+    report: Dict[str, Any] = {
+        "events": result.events,
+        "skipped": replayer.skipped,
+        "streams": len(result.states),
+        "beacons": len(result.beacons),
+        "seconds": round(result.seconds, 3),
+        "events_per_s": round(result.events_per_s),
+    }
+    diff = None
+    if args.beacons:
+        diff = diff_beacons(result.beacons,
+                            recorded_beacons(args.beacons, result.first_t, result.last_t),
+                            ignore=args.ignore)
+        report["diff"] = diff.summary()
+    if args.json:
+        print(codec.dumps_pretty(report))
+    else:
+        for k, v in report.items():
+            print(f"{k:<12} {v}")
+        if diff is not None:
+            for key, fields in diff.mismatched[:10]:
+                print(f"[replay] mismatch {key}: {fields}")
+    sys.exit(1 if diff is not None and not diff.ok else 0)
+
+
+__all__ = [
+    "BeaconDiff",
+    "EventRecorder",
+    "ReplayResult",
+    "ReplaySubscriptions",
+    "Replayer",
+    "VirtualClock",
+    "diff_beacons",
+    "events_from_journal",
+    "merge_events",
+    "read_events",
+    "recorded_beacons",
+    "synthetic_events",
+]
+
+
+if __name__ == "__main__":
+    main()
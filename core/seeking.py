@@ -5,14 +5,25 @@ Responsible for:
 - Tracking produced & delivered ticks
 - Determining seeking state transitions
 - Deciding when to emit a beacon dict (caller persists via beacon_writer)
+- Encoding beacons straight to JSONL bytes for large fleets (BeaconEncoder)
 """
 
 from __future__ import annotations
+import datetime
+import math
 import os
 import time
 import enum
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core import codec, metrics
+from core.subscriptions import shared_cache
+
+_M_TRANSITIONS = metrics.counter("seeking_transitions_total", "State changes (from_state -> to_state)")
+_M_BEACONS = metrics.counter("seeking_beacons_total", "Beacons emitted by state")
+_M_SUB_REFRESH = metrics.histogram("seeking_subscription_refresh_seconds",
+                                   "Subscription lookup latency per update")
 
 
 class SeekingState(str, enum.Enum):
@@ -44,7 +55,7 @@ class SeekingConfig:
                                           float(os.getenv("NOISE_MAX_INTERVAL_S", 4.0)))
 
 
-@dataclass
+@dataclass(slots=True)
 class SeekingStateData:
     state: SeekingState = SeekingState.IDLE
     produced_ticks: int = 0
@@ -60,14 +71,24 @@ class SeekingStateData:
 
 
 class SeekingController:
-    def __init__(self, cfg: SeekingConfig):
+    """
+    clock: time source used when update_and_maybe_beacon() gets no `now`
+    (replay / tests inject a virtual clock).
+    subscriptions: object with listeners(stream_id); defaults to the
+    process-wide cache of cfg.subscriptions_path.
+    """
+
+    def __init__(self, cfg: SeekingConfig, *, clock: Callable[[], float] = time.time,
+                 subscriptions: Any = None):
         self.cfg = cfg
         self.data = SeekingStateData()
+        self.clock = clock
+        self.subscriptions = subscriptions
 
     # --- External interface -------------------------------------------------
 
-    def record_tick(self):
-        self.data.produced_ticks += 1
+    def record_tick(self, n: int = 1):
+        self.data.produced_ticks += n
 
     def record_delivery(self, delivered_n: int = 1):
         """Increment delivered count (call when a listener actually consumes).
@@ -81,14 +102,24 @@ class SeekingController:
         """Update state machine; if conditions satisfied -> return beacon dict.
         Caller is responsible for persisting the beacon via beacon_writer.
         """
-        now = now or time.time()
+        now = now or self.clock()
+        timed = metrics.ENABLED
+        if timed:
+            prev = self.data.state
+            t0 = time.perf_counter()
 
         self._refresh_subscriptions(now)
+        if timed:
+            _M_SUB_REFRESH.observe(time.perf_counter() - t0)
         self._update_loneliness(now)
         self._transition(now)
+        if timed and self.data.state is not prev:
+            _M_TRANSITIONS.inc(from_state=prev.value, to_state=self.data.state.value)
 
         if self.data.state in (SeekingState.SEEKING_LOW, SeekingState.SEEKING_ESCALATE):
             if self._should_emit_beacon(now):
+                if timed:
+                    _M_BEACONS.inc(state=self.data.state.value)
                 return self._build_beacon(now,
                                           entropy_profile=entropy_profile,
                                           tokens_hint=tokens_hint,
@@ -101,21 +132,18 @@ class SeekingController:
     # --- Internal logic -----------------------------------------------------
 
     def _refresh_subscriptions(self, now: float):
-        """Load subscription file; if stream_id present with non-empty list -> attached."""
-        path = self.cfg.subscriptions_path
+        """Check subscriptions; if stream_id present with non-empty list -> attached.
+        Uses the process-wide cache, so the file is only re-parsed when it changes."""
         try:
-            if os.path.exists(path):
-                import json
-                with open(path, "r", encoding="utf-8") as f:
-                    subs = json.load(f)
-                listeners = subs.get(self.cfg.stream_id, [])
-                if listeners:
-                    if not self.data.attached:
-                        # Transition to attached
-                        self.data.attached = True
-                        self.data.state = SeekingState.ATTACHED
-                        # Reset loneliness timer
-                        self.data.first_lonely_ts = None
+            subs = self.subscriptions or shared_cache(self.cfg.subscriptions_path)
+            listeners = subs.listeners(self.cfg.stream_id)
+            if listeners:
+                if not self.data.attached:
+                    # Transition to attached
+                    self.data.attached = True
+                    self.data.state = SeekingState.ATTACHED
+                    # Reset loneliness timer
+                    self.data.first_lonely_ts = None
         except Exception as e:
             # Non-fatal; log-friendly stub
             print(f"[seeking] subscription refresh error: {e}")
@@ -172,24 +200,163 @@ class SeekingController:
         self.data.last_beacon_ts = now
         self.data.beacon_count += 1
 
-        beacon = {
-            "ts": _iso_ts(now),
-            "stream_id": self.cfg.stream_id,
-            "state": self.data.state.value,
-            "seq": self.data.produced_ticks,
-            "produced_ticks": self.data.produced_ticks,
-            "delivered_ticks": self.data.delivered_ticks,
-            "loneliness_ratio": round(self.data.loneliness_ratio, 5),
-            "mode": self.cfg.mode,
-            "entropy_profile": entropy_profile or "unknown",
-            "tempo_range_s": list(self.cfg.tempo_range_s),
-            "tokens_hint": tokens_hint or [],
-            "spore": spore or "",
-            "beacon_n": self.data.beacon_count
-        }
-        return beacon
+        return beacon_dict(now, self.cfg, self.cfg.stream_id, self.data.state,
+                           self.data.produced_ticks, self.data.delivered_ticks,
+                           self.data.loneliness_ratio, self.data.beacon_count,
+                           entropy_profile=entropy_profile,
+                           tokens_hint=tokens_hint,
+                           spore=spore)
+
+
+def beacon_dict(now: float, cfg: SeekingConfig, stream_id: str, state: SeekingState,
+                produced_ticks: int, delivered_ticks: int, loneliness_ratio: float,
+                beacon_n: int,
+                entropy_profile: Optional[str] = None,
+                tokens_hint: Optional[list[str]] = None,
+                spore: Optional[str] = None) -> Dict[str, Any]:
+    """Beacon payload shared by SeekingController and SeekingFleet (key order matters)."""
+    return {
+        "ts": _iso_ts(now),
+        "stream_id": stream_id,
+        "state": state.value,
+        "seq": produced_ticks,
+        "produced_ticks": produced_ticks,
+        "delivered_ticks": delivered_ticks,
+        "loneliness_ratio": round(loneliness_ratio, 5),
+        "mode": cfg.mode,
+        "entropy_profile": entropy_profile or "unknown",
+        "tempo_range_s": list(cfg.tempo_range_s),
+        "tokens_hint": tokens_hint or [],
+        "spore": spore or "",
+        "beacon_n": beacon_n
+    }
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+# (whole second, "YYYY-MM-DDTHH:MM:SS." as str, as bytes); beacons cluster per second.
+_TS_PREFIX: Tuple[int, str, bytes] = (0, "1970-01-01T00:00:00.", b"1970-01-01T00:00:00.")
+
+
+def _ts_split(t: float) -> Tuple[int, int]:
+    """(whole seconds, milliseconds) of t, rounded like datetime.utcfromtimestamp
+    (half-even to microseconds, then truncated to milliseconds)."""
+    frac, whole = math.modf(t)
+    us = round(frac * 1e6)
+    if us >= 1_000_000:
+        whole += 1.0
+        us -= 1_000_000
+    elif us < 0:
+        whole -= 1.0
+        us += 1_000_000
+    return int(whole), us // 1000
+
+
+def _ts_prefix(sec: int) -> Tuple[int, str, bytes]:
+    global _TS_PREFIX
+    cached = _TS_PREFIX
+    if cached[0] != sec:
+        text = (_EPOCH + datetime.timedelta(seconds=sec)).isoformat() + "."
+        cached = _TS_PREFIX = (sec, text, text.encode("ascii"))
+    return cached
 
 
 def _iso_ts(t: float) -> str:
-    import datetime
-    return datetime.datetime.utcfromtimestamp(t).isoformat(timespec="milliseconds") + "Z"
\ No newline at end of file
+    sec, ms = _ts_split(t)
+    return f"{_ts_prefix(sec)[1]}{ms:03d}Z"
+
+
+_STATE_JSON = {s: codec.dumpb(s.value) for s in SeekingState}
+_LOW_JSON = _STATE_JSON[SeekingState.SEEKING_LOW]
+_ESC_JSON = _STATE_JSON[SeekingState.SEEKING_ESCALATE]
+
+
+class BeaconEncoder:
+    """
+    codec.dumpb(beacon_dict(...)) without building the dict.
+
+    The fields fixed by cfg (mode, tempo_range_s) are baked into a bytes
+    template, stream_id / state / entropy_profile encodings are cached, and
+    the timestamp prefix is formatted once per second; a beacon costs one
+    bytes % (...) plus encoding whatever tokens_hint / spore it carries.
+    Ratios whose repr uses an exponent go through the dict path, so the
+    output is byte-identical in every case.
+    """
+
+    _CACHE_MAX = 4096  # entropy profiles; stream ids are bounded by the fleet
+
+    def __init__(self, cfg: SeekingConfig):
+        self.cfg = cfg
+
+        def const(value: Any) -> bytes:
+            return codec.dumpb(value).replace(b"%", b"%%")
+
+        self._tpl = (b'{"ts":"%s%03dZ","stream_id":%s,"state":%s,"seq":%d,"produced_ticks":%d,'
+                     b'"delivered_ticks":%d,"loneliness_ratio":%a,"mode":' + const(cfg.mode)
+                     + b',"entropy_profile":%s,"tempo_range_s":'
+                     + const(list(cfg.tempo_range_s))
+                     + b',"tokens_hint":%s,"spore":%s,"beacon_n":%d}')
+        self._tpl_line = self._tpl + b"\n"
+        self._ids: Dict[str, bytes] = {}
+        self._strs: Dict[str, bytes] = {"unknown": b'"unknown"', "": b'""'}
+
+    def _str(self, cache: Dict[str, bytes], value: str, limit: int = _CACHE_MAX) -> bytes:
+        out = cache.get(value)
+        if out is None:
+            out = codec.dumpb(value)
+            if len(cache) < limit:
+                cache[value] = out
+        return out
+
+    def encode(self, now: float, stream_id: str, state: SeekingState,
+               produced_ticks: int, delivered_ticks: int, loneliness_ratio: float,
+               beacon_n: int,
+               entropy_profile: Optional[str] = None,
+               tokens_hint: Optional[list[str]] = None,
+               spore: Optional[str] = None, *, newline: bool = False) -> bytes:
+        """Same arguments as beacon_dict(); newline=True appends b"\\n" (a JSONL line)."""
+        ratio = round(loneliness_ratio, 5)
+        if not (1e-4 <= abs(ratio) < 1e16 or ratio == 0.0):
+            line = codec.dumpb(beacon_dict(now, self.cfg, stream_id, state, produced_ticks,
+                                           delivered_ticks, loneliness_ratio, beacon_n,
+                                           entropy_profile, tokens_hint, spore))
+            return line + b"\n" if newline else line
+        # _ts_split / _ts_prefix inlined: this runs once per beacon.
+        frac, whole = math.modf(now)
+        us = round(frac * 1e6)
+        if us >= 1_000_000:
+            whole += 1.0
+            us -= 1_000_000
+        elif us < 0:
+            whole -= 1.0
+            us += 1_000_000
+        sec = int(whole)
+        prefix = _TS_PREFIX
+        if prefix[0] != sec:
+            prefix = _ts_prefix(sec)
+        sid = self._ids.get(stream_id)
+        if sid is None:
+            sid = self._str(self._ids, stream_id, 1 << 20)
+        # Enum.__hash__ is Python-level; beacons are (almost) always one of these two.
+        if state is SeekingState.SEEKING_LOW:
+            st = _LOW_JSON
+        elif state is SeekingState.SEEKING_ESCALATE:
+            st = _ESC_JSON
+        else:
+            st = _STATE_JSON[state]
+        return (self._tpl_line if newline else self._tpl) % (
+            prefix[2], us // 1000, sid, st,
+            produced_ticks, produced_ticks, delivered_ticks, ratio,
+            self._strs.get(entropy_profile or "unknown")
+            or self._str(self._strs, entropy_profile or "unknown"),
+            codec.dumpb(tokens_hint) if tokens_hint else b"[]",
+            codec.dumpb(spore) if spore else b'""',
+            beacon_n)
+
+__all__ = [
+    "BeaconEncoder",
+    "SeekingConfig",
+    "SeekingController",
+    "SeekingState",
+    "SeekingStateData",
+    "beacon_dict",
+]
@@ -0,0 +1,196 @@
+"""
+Multi-stream seeking state machine.
+
+Responsible for:
+- Holding seeking state for many stream_ids in columnar arrays
+- Advancing every stream in one update(now) pass (one subscriptions
+  snapshot per pass instead of one stat per controller)
+- Returning the beacons due in that pass (caller persists via beacon_writer),
+  as dicts or, with lines=True, as ready JSONL lines from a BeaconEncoder
+
+Semantics match SeekingController / SeekingConfig exactly; state_of()
+returns the equivalent SeekingStateData for a stream.
+"""
+
+from __future__ import annotations
+import math
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from core.seeking import (BeaconEncoder, SeekingConfig, SeekingState, SeekingStateData,
+                          beacon_dict)
+from core.subscriptions import shared_cache
+
+# Column state codes (index into STATE_BY_CODE)
+IDLE, SEEKING_LOW, SEEKING_ESCALATE, ATTACHED = 0, 1, 2, 3
+STATE_BY_CODE = (SeekingState.IDLE, SeekingState.SEEKING_LOW,
+                 SeekingState.SEEKING_ESCALATE, SeekingState.ATTACHED)
+
+_NAN = math.nan
+
+
+class SeekingFleet:
+    """
+    Columnar seeking state for N streams sharing one SeekingConfig.
+
+    Columns (index i == stream_ids[i]):
+      produced, delivered, beacon_count : int64
+      first_lonely_ts                   : float64, NaN == None
+      last_beacon_ts                    : float64, 0.0 == None (as `or 0.0`)
+      loneliness                        : float64
+      state                             : int8 code (see STATE_BY_CODE)
+    """
+
+    def __init__(self, cfg: SeekingConfig, stream_ids: Iterable[str] = ()):
+        self.cfg = cfg
+        self.stream_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.produced = array("q")
+        self.delivered = array("q")
+        self.beacon_count = array("q")
+        self.first_lonely_ts = array("d")
+        self.last_beacon_ts = array("d")
+        self.loneliness = array("d")
+        self.state = array("b")
+        self._encoder: Optional[BeaconEncoder] = None
+        for sid in stream_ids:
+            self.add_stream(sid)
+
+    def __len__(self) -> int:
+        return len(self.stream_ids)
+
+    def add_stream(self, stream_id: str) -> int:
+        idx = self._index.get(stream_id)
+        if idx is not None:
+            return idx
+        idx = len(self.stream_ids)
+        self._index[stream_id] = idx
+        self.stream_ids.append(stream_id)
+        self.produced.append(0)
+        self.delivered.append(0)
+        self.beacon_count.append(0)
+        self.first_lonely_ts.append(_NAN)
+        self.last_beacon_ts.append(0.0)
+        self.loneliness.append(0.0)
+        self.state.append(IDLE)
+        return idx
+
+    def index(self, stream_id: str) -> int:
+        return self._index[stream_id]
+
+    # --- External interface -------------------------------------------------
+
+    def record_tick(self, stream_id: str, n: int = 1):
+        self.produced[self._index[stream_id]] += n
+
+    def record_delivery(self, stream_id: str, delivered_n: int = 1):
+        self.delivered[self._index[stream_id]] += delivered_n
+
+    def record_ticks(self, counts: Mapping[str, int]):
+        idx = self._index
+        produced = self.produced
+        for sid, n in counts.items():
+            produced[idx[sid]] += n
+
+    def update(self, now: Optional[float] = None,
+               hints: Optional[Mapping[str, Mapping[str, Any]]] = None, *,
+               lines: bool = False) -> List[Any]:
+        """Advance all streams; return beacons due (in stream order).
+        hints: optional stream_id -> {entropy_profile, tokens_hint, spore}.
+        lines=True returns codec.dumpb(beacon) + b"\\n" per beacon instead of
+        dicts (BeaconWriter.write_line), without building the dicts."""
+        return self.update_streams(range(len(self.stream_ids)), now, hints, lines=lines)
+
+    def update_streams(self, indices: Iterable[int], now: Optional[float] = None,
+                       hints: Optional[Mapping[str, Mapping[str, Any]]] = None, *,
+                       lines: bool = False) -> List[Any]:
+        """update() for the given stream indices only (beacons in that order);
+        used by core.seeking_scheduler to touch just the streams that are due."""
+        now = now or time.time()
+        if lines and self._encoder is None:
+            self._encoder = BeaconEncoder(self.cfg)
+        encode = self._encoder.encode if lines else None
+        cfg = self.cfg
+        try:
+            subs = shared_cache(cfg.subscriptions_path).snapshot()
+        except Exception as e:
+            print(f"[seeking] subscription refresh error: {e}")
+            subs = {}
+
+        lonely_after = cfg.lonely_after_s
+        escalate_after = min(cfg.escalate_after_s, cfg.shutdown_after_s)
+        interval_low = cfg.beacon_interval_low_s
+        interval_esc = cfg.beacon_interval_escalate_s
+
+        ids = self.stream_ids
+        produced = self.produced
+        delivered = self.delivered
+        first = self.first_lonely_ts
+        last = self.last_beacon_ts
+        ratio = self.loneliness
+        state = self.state
+        out: List[Any] = []
+
+        for i in indices:
+            st = state[i]
+            if st != ATTACHED and subs and subs.get(ids[i]):
+                state[i] = st = ATTACHED
+                first[i] = _NAN
+
+            p = produced[i]
+            d = delivered[i]
+            ratio[i] = 0.0 if (p <= 0 or d >= p) else (p - d) / p
+            if st == ATTACHED:
+                continue
+
+            f = first[i]
+            if f != f:  # NaN: loneliness timer starts now
+                first[i] = f = now
+            duration = now - f
+            if duration >= escalate_after:
+                st, interval = SEEKING_ESCALATE, interval_esc
+            elif duration >= lonely_after:
+                st, interval = SEEKING_LOW, interval_low
+            else:
+                state[i] = IDLE
+                continue
+            state[i] = st
+
+            if now - last[i] >= interval:
+                last[i] = now
+                self.beacon_count[i] += 1
+                h = hints.get(ids[i]) if hints else None
+                if encode is not None:
+                    out.append(encode(now, ids[i], STATE_BY_CODE[st], p, d, ratio[i],
+                                      self.beacon_count[i], **(h or {}), newline=True))
+                else:
+                    out.append(beacon_dict(now, cfg, ids[i], STATE_BY_CODE[st],
+                                           p, d, ratio[i], self.beacon_count[i],
+                                           **(h or {})))
+        return out
+
+    def state_of(self, stream_id: str) -> SeekingStateData:
+        i = self._index[stream_id]
+        f = self.first_lonely_ts[i]
+        last = self.last_beacon_ts[i]
+        st = STATE_BY_CODE[self.state[i]]
+        return SeekingStateData(
+            state=st,
+            produced_ticks=self.produced[i],
+            delivered_ticks=self.delivered[i],
+            first_lonely_ts=None if f != f else f,
+            last_beacon_ts=last or None,
+            beacon_count=self.beacon_count[i],
+            attached=st == SeekingState.ATTACHED,
+            loneliness_ratio=self.loneliness[i],
+        )
+
+    def counts_by_state(self) -> Dict[SeekingState, int]:
+        out = {s: 0 for s in STATE_BY_CODE}
+        for code in self.state:
+            out[STATE_BY_CODE[code]] += 1
+        return out
+
+
+__all__ = ["SeekingFleet", "STATE_BY_CODE"]
@@ -0,0 +1,176 @@
+"""
+Due-time scheduler for SeekingFleet.
+
+SeekingFleet.update() walks every stream to find the few that changed state
+or owe a beacon. BeaconScheduler instead keeps each stream's next due time
+in a heap and only hands the due streams to SeekingFleet.update_streams():
+
+  idle                next due at first_lonely_ts + lonely_after_s (or the
+                      escalate threshold, if lower)
+  seeking_low         the earlier of last_beacon_ts + beacon_interval_low_s
+                      and first_lonely_ts + escalate_after_s
+  seeking_escalate    last_beacon_ts + beacon_interval_escalate_s
+  attached            never (attachment is final, as in the fleet)
+
+Due times are the earliest float at which the fleet's own comparisons
+(`now - last >= interval`, `now - first >= threshold`) hold, so advance(now)
+returns exactly the beacons fleet.update(now) would, for any sequence of
+now values. Work per advance() is O(k log n) for k due streams; a pass with
+nothing due is one heap peek.
+
+Ticks and deliveries only change the ratio reported at the next beacon, so
+they never reschedule. Subscriptions are read for the woken streams only:
+a stream that gains a listener is marked attached at its next wake-up (its
+beacons are unaffected); call wake(stream_id) to re-check it sooner.
+
+Runs on any clock: run() sleeps with time.sleep-like `sleep` until the next
+due time, so passing replay.VirtualClock and its sleep() simulates hours of
+a large fleet in a moment.
+"""
+
+from __future__ import annotations
+import heapq
+import math
+import threading
+import time
+from array import array
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+from core.seeking_fleet import ATTACHED, IDLE, SEEKING_LOW, SeekingFleet
+
+_INF = math.inf
+
+
+def _earliest(base: float, delta: float) -> float:
+    """Smallest float t with `t - base >= delta` (how the fleet compares)."""
+    t = base + delta
+    while (lower := math.nextafter(t, -_INF)) - base >= delta:
+        t = lower
+    while t - base < delta:
+        t = math.nextafter(t, _INF)
+    return t
+
+
+class BeaconScheduler:
+    """Wakes only the streams of a SeekingFleet that have something due."""
+
+    def __init__(self, fleet: SeekingFleet, *, clock: Callable[[], float] = time.time):
+        self.fleet = fleet
+        self.clock = clock
+        self._heap: List[Tuple[float, int]] = []
+        self._due = array("d")  # per stream index; inf == nothing scheduled
+        self._lock = threading.Lock()
+        self.wakeups = 0  # streams evaluated
+        self.passes = 0  # advance() calls that had something due
+        for i in range(len(fleet)):
+            self._push(i, -_INF)
+
+    def __len__(self) -> int:
+        return len(self.fleet)
+
+    # --- Scheduling ---------------------------------------------------------
+
+    def add_stream(self, stream_id: str) -> int:
+        """Add to the fleet (if new) and evaluate it on the next advance()."""
+        with self._lock:
+            idx = self.fleet.add_stream(stream_id)
+            self._push(idx, -_INF)
+            return idx
+
+    def wake(self, stream_id: str) -> None:
+        """Re-evaluate stream_id on the next advance (e.g. after a subscription change)."""
+        with self._lock:
+            self._push(self.fleet.index(stream_id), -_INF)
+
+    def next_due(self) -> Optional[float]:
+        """Earliest due time, None when no stream has anything scheduled."""
+        with self._lock:
+            heap, due = self._heap, self._due
+            while heap and heap[0][0] != due[heap[0][1]]:
+                heapq.heappop(heap)  # superseded entry
+            return heap[0][0] if heap else None
+
+    def due_at(self, stream_id: str) -> Optional[float]:
+        t = self._due[self.fleet.index(stream_id)]
+        return None if t == _INF else t
+
+    def _push(self, i: int, t: float) -> None:
+        due = self._due
+        while len(due) <= i:
+            due.append(_INF)
+        if t < due[i]:
+            due[i] = t
+            heapq.heappush(self._heap, (t, i))
+        if len(self._heap) > 2 * len(due) + 64:
+            self._heap = [(t, j) for j, t in enumerate(due) if t != _INF]
+            heapq.heapify(self._heap)
+
+    def _next_due(self, i: int) -> float:
+        fleet = self.fleet
+        cfg = fleet.cfg
+        st = fleet.state[i]
+        if st == ATTACHED:
+            return _INF
+        first = fleet.first_lonely_ts[i]
+        last = fleet.last_beacon_ts[i]
+        escalate_after = min(cfg.escalate_after_s, cfg.shutdown_after_s)
+        if st == IDLE:
+            return _earliest(first, min(cfg.lonely_after_s, escalate_after))
+        if st == SEEKING_LOW:
+            return min(_earliest(last, cfg.beacon_interval_low_s),
+                       _earliest(first, escalate_after))
+        return _earliest(last, cfg.beacon_interval_escalate_s)
+
+    # --- Running ------------------------------------------------------------
+
+    def advance(self, now: Optional[float] = None,
+                hints: Optional[Mapping[str, Mapping[str, Any]]] = None, *,
+                lines: bool = False) -> List[Any]:
+        """Evaluate the streams due at or before now; return their beacons (stream
+        order), as JSONL lines with lines=True (see SeekingFleet.update)."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            heap, due = self._heap, self._due
+            batch: List[int] = []
+            while heap and heap[0][0] <= now:
+                t, i = heapq.heappop(heap)
+                if due[i] == t:
+                    due[i] = _INF
+                    batch.append(i)
+            if not batch:
+                return []
+            batch.sort()
+            out = self.fleet.update_streams(batch, now, hints, lines=lines)
+            for i in batch:
+                self._push(i, self._next_due(i))
+            self.wakeups += len(batch)
+            self.passes += 1
+            return out
+
+    def run(self, sink: Callable[[List[Any]], None], *,
+            until: Optional[float] = None, stop: Optional[threading.Event] = None,
+            sleep: Optional[Callable[[float], None]] = None,
+            max_sleep_s: float = 1.0, lines: bool = False) -> None:
+        """
+        Emit due beacons to sink (one list per pass) until the clock reaches
+        `until` or stop is set. Sleeps until the next due time, at most
+        max_sleep_s so streams added or woken from other threads are picked
+        up; sleep defaults to stop.wait (or time.sleep).
+        """
+        if sleep is None:
+            sleep = stop.wait if stop is not None else time.sleep
+        while stop is None or not stop.is_set():
+            now = self.clock()
+            beacons = self.advance(now, lines=lines)
+            if beacons:
+                sink(beacons)
+            if until is not None and now >= until:
+                break
+            nxt = self.next_due()
+            target = now + max_sleep_s if nxt is None else min(nxt, now + max_sleep_s)
+            if until is not None:
+                target = min(target, until)
+            sleep(max(0.0, target - now))
+
+
+__all__ = ["BeaconScheduler"]
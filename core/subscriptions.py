@@ -0,0 +1,475 @@
+"""
+Shared, change-aware view of subscriptions.json.
+
+Responsibilities:
+- Parse subscriptions.json only when it changed on disk, detected via
+  (st_ino, st_mtime_ns, st_size)
+- Share one parsed snapshot between every reader in the process
+  (e.g. many SeekingController instances)
+- Serialise writers (SubscriptionStore): queued subscribe / unsubscribe
+  operations are applied in one locked read-modify-write and committed
+  with an atomic rename; a change-sequence number is kept in
+  `<path>.seq`
+- Journal mode: instead of rewriting the snapshot, commits append events
+  to `subscriptions.journal.jsonl`; compact() folds them back into the
+  snapshot and truncates the journal
+
+The materialized view is always snapshot + journal replay, so readers
+work the same in both modes. Journal events
+  {"seq": n, "op": "sub" | "unsub", "stream_id": ..., "listener_id": ..., "ts": epoch_s}
+are only written when they changed state, and replaying them is
+idempotent (the last event for a (stream, listener) pair wins), so a
+journal that survived a crash mid-compaction is still correct.
+
+Snapshots are shared objects: treat them as read-only. A commit that
+changes nothing does not touch any file, so the cache keys only move
+when the content did.
+"""
+
+from __future__ import annotations
+import contextlib
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core import codec
+
+try:
+    from filelock import FileLock  # type: ignore
+except ImportError:  # pragma: no cover - exercised where filelock is missing
+    FileLock = None  # type: ignore
+
+FileKey = Tuple[int, int, int]
+Op = Tuple[str, str, str, Optional[int]]  # (op, stream_id, listener_id, only_if_fewer_than)
+
+JOURNAL = os.getenv("NOISE_SEEK_SUBSCRIPTIONS_JOURNAL", "0").lower() in ("1", "true", "yes")
+COMPACT_BYTES = int(os.getenv("NOISE_SEEK_SUBSCRIPTIONS_COMPACT_BYTES", 1 << 20))
+
+
+def _file_key(path: str | os.PathLike) -> Optional[FileKey]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def journal_path(path: str | os.PathLike) -> Path:
+    """subscriptions.json -> subscriptions.journal.jsonl"""
+    p = Path(path)
+    return p.with_name(p.stem + ".journal.jsonl")
+
+
+def _read_snapshot(path: str | os.PathLike) -> Tuple[Dict[str, Any], Optional[FileKey]]:
+    """Parsed snapshot and the key of the file version that was read.
+    Raises ValueError if it does not parse or is not an object."""
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            raw = f.read()
+    except FileNotFoundError:
+        return {}, None
+    data = codec.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("root is not an object")
+    return data, (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _read_journal(jpath: str | os.PathLike, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """Events from complete lines at/after offset, and the offset after them."""
+    try:
+        with open(jpath, "rb") as f:
+            f.seek(offset)
+            raw = f.read()
+    except FileNotFoundError:
+        return [], 0
+    end = raw.rfind(b"\n") + 1  # ignore a torn trailing line
+    events = []
+    for line in raw[:end].splitlines():
+        try:
+            ev = codec.loads(line)
+        except Exception:
+            continue
+        if isinstance(ev, dict) and ev.get("op") in ("sub", "unsub"):
+            events.append(ev)
+    return events, offset + end
+
+
+def _replay(data: Dict[str, Any], events: List[Dict[str, Any]]) -> None:
+    for ev in events:
+        sid, lid = ev.get("stream_id"), ev.get("listener_id")
+        if isinstance(sid, str) and isinstance(lid, str):
+            _apply(data, (ev["op"], sid, lid, None))
+
+
+def _load_view(path: str | os.PathLike
+               ) -> Tuple[Dict[str, Any], Optional[FileKey], Optional[int], int]:
+    """
+    Consistent snapshot + journal read: (view, snapshot key, journal inode,
+    journal offset). Retries if a compaction replaced the snapshot while
+    the journal was being read. Raises ValueError on a corrupt snapshot.
+    """
+    jpath = journal_path(path)
+    for _ in range(10):
+        data, key = _read_snapshot(path)
+        jkey = _file_key(jpath)
+        events, offset = _read_journal(jpath)
+        if _file_key(path) == key:
+            break
+    _replay(data, events)
+    return data, key, (jkey[0] if jkey else None), offset
+
+
+def materialize(path: str | os.PathLike) -> Dict[str, Any]:
+    """Current subscriptions (snapshot + journal). Raises ValueError on a corrupt snapshot."""
+    return _load_view(path)[0]
+
+
+class SubscriptionsCache:
+    """
+    Cached materialized view of one subscriptions file (+ journal).
+
+    snapshot() costs two stat() calls while nothing changed (or nothing at
+    all within stat_interval_s of the previous check). Journal growth is
+    applied incrementally from the last read offset onto a copy of the
+    previous view; a new snapshot file triggers a full reload. A snapshot
+    that fails to parse keeps serving the last good view; the error is
+    reported once per file version and kept in .error.
+    """
+
+    def __init__(self, path: str, stat_interval_s: float = 0.0):
+        self.path = path
+        self.journal_path = str(journal_path(path))
+        self.stat_interval_s = stat_interval_s
+        self.version = 0          # bumped whenever a new view is built
+        self.error: Optional[str] = None
+        self._key: Optional[Tuple[Optional[FileKey], Optional[FileKey]]] = None
+        self._snap_key: Optional[FileKey] = None
+        self._j_ino: Optional[int] = None
+        self._j_off = 0
+        self._data: Dict[str, Any] = {}
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.stat_interval_s > 0:
+            now = time.monotonic()
+            if now - self._checked_at < self.stat_interval_s:
+                return self._data
+            self._checked_at = now
+        key = (_file_key(self.path), _file_key(self.journal_path))
+        if key == self._key:
+            return self._data
+        with self._lock:
+            if key != self._key:
+                self._reload(key)
+        return self._data
+
+    def listeners(self, stream_id: str) -> List[Any]:
+        return self.snapshot().get(stream_id) or []
+
+    def _reload(self, key: Tuple[Optional[FileKey], Optional[FileKey]]) -> None:
+        snap_key, j_key = key
+        self._key = key
+        if (self.error is None and snap_key is not None and snap_key == self._snap_key
+                and j_key is not None and j_key[0] == self._j_ino and j_key[2] >= self._j_off):
+            # Only the journal grew: apply the new events on a copy.
+            events, offset = _read_journal(self.journal_path, self._j_off)
+            if _file_key(self.path) == snap_key:
+                self._j_off = offset
+                if events:
+                    data = dict(self._data)
+                    _replay(data, events)
+                    self._data = data
+                    self.version += 1
+                return
+        try:
+            data, self._snap_key, self._j_ino, self._j_off = _load_view(self.path)
+        except Exception as e:
+            msg = f"parse error for {self.path}: {e}"
+            if msg != self.error:
+                print(f"[subscriptions] {msg}")
+            self.error = msg
+            return
+        self.error = None
+        self._data = data
+        self.version += 1
+
+
+_SHARED: Dict[str, SubscriptionsCache] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_cache(path: str) -> SubscriptionsCache:
+    """Process-wide SubscriptionsCache for path (created on first use)."""
+    cache = _SHARED.get(path)
+    if cache is None:
+        with _SHARED_LOCK:
+            cache = _SHARED.setdefault(path, SubscriptionsCache(path))
+    return cache
+
+
+# --- Writers ------------------------------------------------------------------
+
+class _FlockLock:
+    """fcntl.flock based stand-in with FileLock's context-manager API."""
+
+    def __init__(self, lock_path: str, timeout: float = -1):
+        self.lock_path = lock_path
+        self.timeout = timeout
+        self._fd: Optional[int] = None
+
+    def __enter__(self):
+        import fcntl
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout < 0 else time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"could not lock {self.lock_path}")
+                time.sleep(0.005)
+        self._fd = fd
+        return self
+
+    def __exit__(self, *exc):
+        import fcntl
+
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+def seq_path(path: str | os.PathLike) -> Path:
+    p = Path(path)
+    return p.with_name(p.name + ".seq")
+
+
+def read_seq(path: str | os.PathLike) -> int:
+    """Current change-sequence number for a subscriptions file (0 if never committed)."""
+    try:
+        return int(seq_path(path).read_text(encoding="utf-8").strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    # Unique temp name per writer so concurrent processes never collide.
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class SubscriptionStore:
+    """
+    Lock-safe, batched writer for subscriptions.json.
+
+    subscribe() / unsubscribe() only queue operations; commit() takes the
+    file lock (`<path>.lock`, filelock or fcntl.flock), re-reads the
+    current file, applies the queue in order and, if anything changed,
+    writes compact JSON via a uniquely named temp file + os.replace and
+    bumps the sequence number. Concurrent writers therefore never lose
+    each other's updates. Empty listener lists are dropped.
+
+    With journal=True (default: NOISE_SEEK_SUBSCRIPTIONS_JOURNAL) commit()
+    appends the applied operations to the journal instead of rewriting
+    the snapshot, and compacts once the journal exceeds compact_bytes
+    (NOISE_SEEK_SUBSCRIPTIONS_COMPACT_BYTES; 0 = only on compact()).
+    """
+
+    def __init__(self, path: str | os.PathLike, lock_timeout_s: float = 10.0,
+                 journal: Optional[bool] = None, compact_bytes: Optional[int] = None):
+        self.path = Path(path)
+        self.journal_path = journal_path(self.path)
+        self.journal = JOURNAL if journal is None else journal
+        self.compact_bytes = COMPACT_BYTES if compact_bytes is None else compact_bytes
+        self.lock_timeout_s = lock_timeout_s
+        self._view = SubscriptionsCache(str(self.path))
+        self._ops: List[Op] = []
+        self._ops_lock = threading.Lock()
+        lock_path = str(self.path) + ".lock"
+        if FileLock is not None:
+            self._file_lock = FileLock(lock_path, timeout=lock_timeout_s)
+        else:
+            self._file_lock = _FlockLock(lock_path, timeout=lock_timeout_s)
+
+    # --- queueing -------------------------------------------------------------
+
+    def subscribe(self, stream_id: str, listener_id: str, *,
+                  only_if_fewer_than: Optional[int] = None) -> None:
+        """Queue a subscription; with only_if_fewer_than=N it is applied only
+        if the stream has fewer than N listeners at commit time."""
+        with self._ops_lock:
+            self._ops.append(("sub", stream_id, listener_id, only_if_fewer_than))
+
+    def unsubscribe(self, stream_id: str, listener_id: str) -> None:
+        with self._ops_lock:
+            self._ops.append(("unsub", stream_id, listener_id, None))
+
+    @property
+    def pending(self) -> int:
+        return len(self._ops)
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["SubscriptionStore"]:
+        """Queue operations inside the block; commit once on exit."""
+        yield self
+        self.commit()
+
+    # --- reading ---------------------------------------------------------------
+
+    def read(self) -> Dict[str, List[str]]:
+        """Current materialized view (read-only; no lock needed)."""
+        data = self._view.snapshot()
+        if self._view.error:
+            raise ValueError(self._view.error)
+        return data
+
+    @property
+    def seq(self) -> int:
+        return read_seq(self.path)
+
+    # --- committing ---------------------------------------------------------------
+
+    def commit(self) -> List[Op]:
+        """Apply queued operations atomically; return the ones that changed state."""
+        with self._ops_lock:
+            ops, self._ops = self._ops, []
+        if not ops:
+            return []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with self._file_lock:
+                # Fresh read: the stat-keyed cache can miss a same-size rewrite
+                # within one mtime tick, and this write must not lose it.
+                data = _load_view(self.path)[0]
+                applied = [op for op in ops if _apply(data, op)]
+                if applied:
+                    seq = read_seq(self.path) + 1
+                    if self.journal:
+                        self._append_journal(applied, seq)
+                    else:
+                        self._write_snapshot(data)
+                    _atomic_write(seq_path(self.path), b"%d\n" % seq)
+                    if self.journal and self.compact_bytes > 0:
+                        if os.path.getsize(self.journal_path) >= self.compact_bytes:
+                            self._compact_locked()
+        except BaseException:
+            with self._ops_lock:
+                self._ops = ops + self._ops  # keep them for the next attempt
+            raise
+        return applied
+
+    def compact(self) -> int:
+        """Fold the journal into the snapshot; returns the number of streams."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._file_lock:
+            return self._compact_locked()
+
+    # --- internal ------------------------------------------------------------------
+
+    def _compact_locked(self) -> int:
+        data = materialize(self.path)
+        self._write_snapshot(data)
+        return len(data)
+
+    def _write_snapshot(self, data: Dict[str, Any]) -> None:
+        # Snapshot first, then drop the journal: a crash in between leaves
+        # events that replay idempotently on top of the new snapshot.
+        _atomic_write(self.path, codec.dumpb(data) + b"\n")
+        try:
+            os.truncate(self.journal_path, 0)
+        except FileNotFoundError:
+            pass
+
+    def _append_journal(self, applied: List[Op], seq: int) -> None:
+        ts = round(time.time(), 3)
+        lines = [codec.dumpb({"seq": seq, "op": op, "stream_id": sid, "listener_id": lid,
+                              "ts": ts}) + b"\n"
+                 for op, sid, lid, _ in applied]
+        with open(self.journal_path, "ab+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    # Torn line from a crashed writer: cut back to the last full event.
+                    f.seek(0)
+                    f.truncate(f.read().rfind(b"\n") + 1)
+            f.write(b"".join(lines))
+
+
+def _apply(data: Dict[str, Any], op: Op) -> bool:
+    kind, stream_id, listener_id, limit = op
+    current = data.get(stream_id, [])
+    if not isinstance(current, list):
+        return False  # foreign entry shape (e.g. a filter dict): leave it alone
+    if kind == "sub":
+        if listener_id in current:
+            return False
+        if limit is not None and len(current) >= limit:
+            return False
+        data[stream_id] = current + [listener_id]
+        return True
+    if listener_id not in current:
+        return False
+    remaining = [lid for lid in current if lid != listener_id]
+    if remaining:
+        data[stream_id] = remaining
+    else:
+        data.pop(stream_id, None)
+    return True
+
+
+def compact(path: str | os.PathLike) -> int:
+    """Fold subscriptions.journal.jsonl into subscriptions.json (locked)."""
+    return SubscriptionStore(path, journal=True).compact()
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Compact the subscriptions journal into the snapshot")
+    ap.add_argument("path", nargs="?",
+                    default=os.getenv("NOISE_SEEK_SUBSCRIPTIONS_PATH",
+                                      "runtime/subscriptions.json"))
+    ap.add_argument("--every", type=float, default=0.0,
+                    help="keep running, compacting every N seconds")
+    args = ap.parse_args()
+    while True:
+        try:
+            streams = compact(args.path)
+            print(f"[subscriptions] compacted {args.path} streams={streams} "
+                  f"seq={read_seq(args.path)}")
+        except Exception as e:
+            print(f"[subscriptions] compact error: {e}")
+        if args.every <= 0:
+            return
+        time.sleep(args.every)
+
+
+__all__ = [
+    "SubscriptionStore",
+    "SubscriptionsCache",
+    "compact",
+    "journal_path",
+    "materialize",
+    "read_seq",
+    "seq_path",
+    "shared_cache",
+]
+
+
+if __name__ == "__main__":
+    main()
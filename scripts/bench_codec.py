@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for core.codec on realistic beacon dicts.
+
+Beacons are produced by SeekingController._build_beacon, then encoded and
+decoded with the active codec backend and with the stdlib fallback.
+
+Run (from repo root):
+  python -m scripts.bench_codec [--n 20000] [--repeat 5]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from core import codec
+from core.seeking import SeekingConfig, SeekingController, SeekingState
+
+
+def sample_beacons(n: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    out = []
+    ctl = SeekingController(SeekingConfig(stream_id="noise_metadata", mode="markov"))
+    words = ["aurora", "flux", "drift", "lattice", "vector", "prism", "ion", "echo"]
+    for i in range(n):
+        ctl.data.produced_ticks += rng.randint(1, 5)
+        ctl.data.loneliness_ratio = rng.random()
+        ctl.data.state = rng.choice((SeekingState.SEEKING_LOW, SeekingState.SEEKING_ESCALATE))
+        out.append(ctl._build_beacon(
+            1_724_871_000.0 + i * 0.25,
+            entropy_profile=rng.choice(("low", "mid", "high")),
+            tokens_hint=rng.sample(words, 3),
+            spore=f"{rng.getrandbits(32):08x}",
+        ))
+    return out
+
+
+def _best(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    beacons = sample_beacons(args.n)
+    encoded = [codec.dumpb(b) for b in beacons]
+    total_bytes = sum(len(e) for e in encoded)
+    std_enc = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+    rows = [
+        ("encode", codec.BACKEND, lambda: [codec.dumpb(b) for b in beacons]),
+        ("encode", "json", lambda: [std_enc(b).encode("utf-8") for b in beacons]),
+        ("decode", codec.BACKEND, lambda: [codec.loads(e) for e in encoded]),
+        ("decode", "json", lambda: [json.loads(e) for e in encoded]),
+    ]
+    print(f"{args.n} beacons, avg {total_bytes / args.n:.0f} bytes/line, best of {args.repeat}")
+    for op, backend, fn in rows:
+        dt = _best(fn, args.repeat)
+        print(f"{op:<7} {backend:<7} {args.n / dt:>12,.0f} ops/s {total_bytes / dt / 1e6:>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Asyncio listener engine: many simulated listeners in one process.
+
+- One shared BeaconFollower (inotify / polling) feeds every listener
+- Each new seeking_* beacon is fanned out to all listener tasks
+- A listener claims the stream if it still has room (LISTENER_MAX_PER_STREAM,
+  default 1 == listener_sim's "no subscribers yet" rule) and it has not used
+  up its own quota (LISTENER_STREAMS_EACH); claims are reserved in memory so
+  concurrent listeners never over-subscribe
+- Claims are coalesced and committed to subscriptions.json every
+  LISTENER_COMMIT_INTERVAL_S in one SubscriptionStore commit (file lock,
+  atomic rename, or the journal in journal mode); claims that lost a race
+  with another process are rolled back and counted as `rejected`, and the
+  stream's view is refreshed from the committed state
+- Attach latency = commit wall time - beacon `ts` of the claims that were
+  applied, reported as percentiles
+
+Env:
+  LISTENER_COUNT              (default 1000)
+  LISTENER_MAX_PER_STREAM     (default 1)
+  LISTENER_STREAMS_EACH       (default 1)
+  LISTENER_COMMIT_INTERVAL_S  (default 0.05)
+  LISTENER_RUN_S              (default 0 = until Ctrl+C)
+  NOISE_SEEK_BEACON_PATH
+  NOISE_SEEK_SUBSCRIPTIONS_PATH
+  TARGET_STREAM_ID            (optional; only attach to this stream)
+
+Uses uvloop when installed.
+
+Run (from repo root):
+  python -m scripts.listener_async
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from core import beacon_writer
+from core.beacon_index import to_epoch_ms
+from core.subscriptions import SubscriptionStore
+from scripts.listener_sim import load_subscriptions
+
+BEACON_PATH = os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl")
+SUBSCRIPTIONS_PATH = os.getenv("NOISE_SEEK_SUBSCRIPTIONS_PATH", "runtime/subscriptions.json")
+TARGET_STREAM_ID = os.getenv("TARGET_STREAM_ID")
+
+LISTENER_COUNT = int(os.getenv("LISTENER_COUNT", 1000))
+MAX_PER_STREAM = int(os.getenv("LISTENER_MAX_PER_STREAM", 1))
+STREAMS_EACH = int(os.getenv("LISTENER_STREAMS_EACH", 1))
+COMMIT_INTERVAL_S = float(os.getenv("LISTENER_COMMIT_INTERVAL_S", 0.05))
+RUN_S = float(os.getenv("LISTENER_RUN_S", 0))
+
+
+def install_uvloop() -> bool:
+    try:
+        import uvloop  # type: ignore
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def percentiles(values: List[float], ps=(50, 90, 99)) -> Dict[str, float]:
+    if not values:
+        return {}
+    s = sorted(values)
+    out = {f"p{p}": s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] for p in ps}
+    out["max"] = s[-1]
+    out["n"] = len(s)
+    return out
+
+
+class ListenerEngine:
+    def __init__(self, beacon_path: str = BEACON_PATH,
+                 subscriptions_path: str = SUBSCRIPTIONS_PATH,
+                 n_listeners: int = LISTENER_COUNT,
+                 target_stream_id: Optional[str] = TARGET_STREAM_ID,
+                 max_per_stream: int = MAX_PER_STREAM,
+                 streams_each: int = STREAMS_EACH,
+                 commit_interval_s: float = COMMIT_INTERVAL_S,
+                 poll_interval_s: float = 0.05):
+        self.beacon_path = beacon_path
+        self.subscriptions_path = subscriptions_path
+        self.listener_ids = [f"alistener-{i:05d}" for i in range(n_listeners)]
+        self.target_stream_id = target_stream_id
+        self.max_per_stream = max_per_stream
+        self.streams_each = streams_each
+        self.commit_interval_s = commit_interval_s
+        self.poll_interval_s = poll_interval_s
+        self.store = SubscriptionStore(subscriptions_path)
+
+        # committed + reserved view, stream_id -> listeners
+        self.view: Dict[str, List[str]] = {}
+        self.owned: Dict[str, Set[str]] = {lid: set() for lid in self.listener_ids}
+        self.pending: List[Tuple[str, str, Optional[int]]] = []  # (stream, listener, beacon ts ms)
+        self.latencies_ms: List[float] = []
+        self.commits = 0
+        self.rejected = 0
+        self.beacons_seen = 0
+        self._queues: List[asyncio.Queue] = []
+        self._stop = asyncio.Event()
+        self._commit_wake = asyncio.Event()
+
+    # --- listeners ----------------------------------------------------------
+
+    def _try_claim(self, lid: str, beacon: Dict[str, Any]) -> bool:
+        stream_id = beacon.get("stream_id")
+        if not isinstance(stream_id, str):
+            return False
+        if self.target_stream_id and stream_id != self.target_stream_id:
+            return False
+        mine = self.owned[lid]
+        if stream_id in mine or len(mine) >= self.streams_each:
+            return False
+        current = self.view.setdefault(stream_id, [])
+        if len(current) >= self.max_per_stream:
+            return False
+        current.append(lid)
+        mine.add(stream_id)
+        self.pending.append((stream_id, lid, to_epoch_ms(beacon.get("ts"))))
+        self._commit_wake.set()
+        return True
+
+    async def _listener(self, lid: str, q: asyncio.Queue):
+        while True:
+            beacon = await q.get()
+            if beacon is None:
+                return
+            self._try_claim(lid, beacon)
+
+    # --- shared follower / fan-out -----------------------------------------
+
+    async def _pump(self, follower: beacon_writer.BeaconFollower):
+        while not self._stop.is_set():
+            for beacon in follower.poll():
+                if not isinstance(beacon, dict):
+                    continue
+                if not str(beacon.get("state", "")).startswith("seeking_"):
+                    continue
+                self.beacons_seen += 1
+                for q in self._queues:
+                    q.put_nowait(beacon)
+            await follower.wait_async(self.poll_interval_s)
+
+    # --- batched commits ----------------------------------------------------
+
+    def _commit_sync(self, batch: List[Tuple[str, str, Optional[int]]]
+                     ) -> Tuple[float, Set[Tuple[str, str]], Dict[str, List[str]]]:
+        """Commit batch; (commit time, claims that hold, committed listeners
+        of the streams where a claim was rejected)."""
+        for stream_id, lid, _ in batch:
+            self.store.subscribe(stream_id, lid, only_if_fewer_than=self.max_per_stream)
+        won = {(op[1], op[2]) for op in self.store.commit()}
+        committed_at = time.time()
+        rest = [(sid, lid) for sid, lid, _ in batch if (sid, lid) not in won]
+        if not rest:
+            return committed_at, won, {}
+        data = self.store.read()
+        won.update((sid, lid) for sid, lid in rest if lid in (data.get(sid) or []))  # already ours
+        lost = {sid for sid, lid in rest if (sid, lid) not in won}
+        return committed_at, won, {sid: list(data.get(sid) or []) for sid in lost}
+
+    async def _flush(self) -> None:
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        loop = asyncio.get_running_loop()
+        try:
+            committed_at, won, current = await loop.run_in_executor(
+                None, self._commit_sync, batch)
+        except Exception as e:
+            print(f"[listener_async] commit error: {e}")
+            self.pending = batch + self.pending
+            return
+        self.commits += 1
+        now_ms = committed_at * 1000
+        for stream_id, lid, ts in batch:
+            if (stream_id, lid) in won:
+                if ts is not None:
+                    self.latencies_ms.append(now_ms - ts)
+            else:  # another process filled the stream first
+                self.rejected += 1
+                self.owned[lid].discard(stream_id)
+        for stream_id, listeners in current.items():
+            reserved = [lid for sid, lid, _ in self.pending if sid == stream_id]
+            self.view[stream_id] = listeners + [lid for lid in reserved if lid not in listeners]
+
+    async def _committer(self):
+        while not self._stop.is_set():
+            await self._commit_wake.wait()
+            self._commit_wake.clear()
+            await asyncio.sleep(self.commit_interval_s)  # coalesce
+            await self._flush()
+        await self._flush()
+
+    # --- run ----------------------------------------------------------------
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._commit_wake.set()
+
+    async def run(self, duration_s: float = 0.0) -> Dict[str, Any]:
+        for stream_id, lst in load_subscriptions(self.subscriptions_path).items():
+            if isinstance(lst, list):
+                self.view[stream_id] = list(lst)
+        follower = beacon_writer.follow(self.beacon_path, poll_interval_s=self.poll_interval_s)
+        self._queues = [asyncio.Queue() for _ in self.listener_ids]
+        tasks = [asyncio.create_task(self._listener(lid, q))
+                 for lid, q in zip(self.listener_ids, self._queues)]
+        pump = asyncio.create_task(self._pump(follower))
+        committer = asyncio.create_task(self._committer())
+        try:
+            if duration_s > 0:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), duration_s)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self._stop.wait()
+        finally:
+            self.stop()
+            pump.cancel()
+            for q in self._queues:
+                q.put_nowait(None)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.gather(pump, return_exceptions=True)
+            await committer
+            await self._flush()  # claims made while the committer was exiting
+            follower.close()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "listeners": len(self.listener_ids),
+            "beacons_seen": self.beacons_seen,
+            "subscriptions": sum(len(v) for v in self.owned.values()),
+            "rejected": self.rejected,
+            "commits": self.commits,
+            "attach_latency_ms": {k: round(v, 2) if isinstance(v, float) else v
+                                  for k, v in percentiles(self.latencies_ms).items()},
+        }
+
+
+def main():
+    loop_name = "uvloop" if install_uvloop() else "asyncio"
+    print(f"[listener_async] start listeners={LISTENER_COUNT} loop={loop_name} "
+          f"beacon_path={BEACON_PATH}")
+    engine = ListenerEngine()
+    try:
+        stats = asyncio.run(engine.run(RUN_S))
+    except KeyboardInterrupt:
+        stats = engine.stats()
+    print(f"[listener_async] stats {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,13 @@ Minimal listener simulation.
 
 Loop:
 1. Load / create subscriptions.json
-2. If already subscribed to target stream -> sleep
-3. Tail beacons.jsonl (last N lines)
+2. If already subscribed to target stream -> wait
+3. Pull newly appended beacons into a window of the last N (seeded once from the
+   tail, up to where the follower starts)
 4. Find newest beacon with state starting 'seeking_' whose stream_id not in subscriptions (or empty list)
-5. Append listener id, write subscriptions atomically
-6. Log & sleep
+5. Append listener id via SubscriptionStore (file lock + atomic rename; the
+   claim is dropped if another listener got there first)
+6. Log & wait for the beacon file to change (inotify) or LISTENER_POLL_INTERVAL_S
 
 Env:
   LISTENER_ID (default: auto uuid shortened)
@@ -23,12 +25,12 @@ Press Ctrl+C to stop.
 
 from __future__ import annotations
 import os
-import json
-import time
 import uuid
-from pathlib import Path
+from collections import deque
 from typing import Dict, Any, List
-from core import beacon_writer  # assumes package style import (adjust if needed)
+from core import beacon_writer, codec  # assumes package style import (adjust if needed)
+from core import subscriptions
+from core.subscriptions import SubscriptionStore
 
 SLEEP_S = float(os.getenv("LISTENER_POLL_INTERVAL_S", 2.5))
 MAX_TAIL = int(os.getenv("LISTENER_TAIL_N", 250))
@@ -40,23 +42,22 @@ TARGET_STREAM_ID = os.getenv("TARGET_STREAM_ID")  # if None => pick first eligib
 LISTENER_ID = os.getenv("LISTENER_ID") or ("listener-" + uuid.uuid4().hex[:8])
 
 def load_subscriptions(path: str) -> Dict[str, List[str]]:
-    if not os.path.exists(path):
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"[listener_sim] load subscriptions error: {e}")
-        return {}
-
-def atomic_write_json(path: str, data: Any):
-    p = Path(path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    tmp = p.with_suffix(".tmp")
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-    os.replace(tmp, p)
+    """Current subscriptions (snapshot + journal) through the process-wide
+    cache, so claims committed in journal mode are seen too. Read-only."""
+    return subscriptions.shared_cache(path).snapshot()
+
+def seed_window(follower: beacon_writer.BeaconFollower, path: str,
+                max_lines: int) -> deque[Dict[str, Any]]:
+    """Last max_lines beacons up to the follower's start offset, so lines
+    appended meanwhile are read once (by the follower), not twice."""
+    end = follower.offset if follower.inode is not None else None
+    window: deque[Dict[str, Any]] = deque(maxlen=max_lines)
+    for raw in beacon_writer.recent_lines(path, max_lines, end=end):
+        try:
+            window.append(codec.loads(raw))
+        except ValueError:
+            continue
+    return window
 
 def pick_beacon(beacons: List[Dict[str, Any]], subs: Dict[str, List[str]]) -> Dict[str, Any] | None:
     # iterate reversed (newest last)
@@ -75,38 +76,43 @@ def pick_beacon(beacons: List[Dict[str, Any]], subs: Dict[str, List[str]]) -> Di
 
 def main():
     print(f"[listener_sim] start id={LISTENER_ID} beacon_path={BEACON_PATH}")
+    follower = beacon_writer.follow(BEACON_PATH, poll_interval_s=SLEEP_S)
+    store = SubscriptionStore(SUBSCRIPTIONS_PATH)
+    window = seed_window(follower, BEACON_PATH, MAX_TAIL)
     try:
         while True:
+            window.extend(follower.poll())
             subs = load_subscriptions(SUBSCRIPTIONS_PATH)
 
-            # If targeting specific stream and already subscribed -> idle sleep
+            # If targeting specific stream and already subscribed -> idle wait
             if TARGET_STREAM_ID:
                 if LISTENER_ID in subs.get(TARGET_STREAM_ID, []):
-                    time.sleep(SLEEP_S)
+                    follower.wait(SLEEP_S)
                     continue
 
-            beacons = beacon_writer.read_recent(BEACON_PATH, max_lines=MAX_TAIL)
-            if not beacons:
-                time.sleep(SLEEP_S)
+            if not window:
+                follower.wait(SLEEP_S)
                 continue
 
-            chosen = pick_beacon(beacons, subs)
+            chosen = pick_beacon(list(window), subs)
             if chosen is None:
-                time.sleep(SLEEP_S)
+                follower.wait(SLEEP_S)
                 continue
 
             stream_id = chosen["stream_id"]
-            lst = subs.setdefault(stream_id, [])
-            if LISTENER_ID not in lst:
-                lst.append(LISTENER_ID)
+            if LISTENER_ID not in subs.get(stream_id, []):
+                # Re-checked under the file lock: only claim a still-empty stream.
+                store.subscribe(stream_id, LISTENER_ID, only_if_fewer_than=1)
                 try:
-                    atomic_write_json(SUBSCRIPTIONS_PATH, subs)
-                    print(f"[listener_sim] subscribed stream={stream_id} beacon_n={chosen.get('beacon_n')} seq={chosen.get('seq')}")
+                    if store.commit():
+                        print(f"[listener_sim] subscribed stream={stream_id} beacon_n={chosen.get('beacon_n')} seq={chosen.get('seq')}")
                 except Exception as e:
                     print(f"[listener_sim] write subscription error: {e}")
-            time.sleep(SLEEP_S)
+            follower.wait(SLEEP_S)
     except KeyboardInterrupt:
         print("[listener_sim] exit")
+    finally:
+        follower.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,4 +1,3 @@
-"""
 #!/usr/bin/env python3
 """Generate a small demo beacon sequence for manual testing of core.health.
 
@@ -12,13 +11,19 @@ import os
 import time
 from pathlib import Path
 
+try:
+    from core.codec import dumps as json_dumps
+except Exception:  # run as a plain script without the repo root on sys.path
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
 BEACON_PATH = os.getenv("NOISE_SEEK_BEACON_PATH", "runtime/beacons.jsonl")
 path = Path(BEACON_PATH)
 path.parent.mkdir(parents=True, exist_ok=True)
 
 def write(obj):
     with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        f.write(json_dumps(obj) + "\n")
 
 sid = os.getenv("TARGET_STREAM_ID", "demo_stream")
 now_ms = lambda: int(time.time() * 1000)
@@ -27,4 +32,3 @@ write({"stream_id": sid, "state": "seeking_init", "ts": base})
 write({"stream_id": sid, "state": "seeking_active", "ts": base + 10})
 write({"stream_id": sid, "state": "seeking_satisfied", "ts": base + 20, "payload": {"count": 42}})
 print(f"Wrote 3 beacon lines to {path}")
-"""
\ No newline at end of file
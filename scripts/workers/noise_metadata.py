@@ -25,9 +25,38 @@ Env:
   NOISE_ENTROPY_BITS (default 128) - reported nominal value
   NOISE_MAX_WORDS (default 8)
   NOISE_DISABLE_TOKEN_ENT (set to any value to skip token entropy)
+  NOISE_SESSION (default random) - session id stamped on events
+  NOISE_MARKOV_MODEL (path to a compiled model, see core/markov.py; memory-mapped)
+  NOISE_MARKOV_CORPUS (comma separated text files compiled at startup instead of SEED_CORPUS)
+  NOISE_MARKOV_ORDER (default 1)
+  NOISE_BATCH_SIZE (default 0) - >0 switches to batch mode: no sleeps, events are
+                                 generated, measured and written in blocks of this size
+  NOISE_BATCH_TOTAL (default 0) - batch mode: stop after this many events (0 = forever)
+
+Batch mode is for load tests: entropy is counted for the whole block at once
+(NumPy histograms when installed, Counter otherwise) with metrics identical to
+the per-event functions, output goes through one buffered write per block, and
+`seq` is a per-event counter starting at the block's epoch ms (never reused). A summary with
+events/s is printed to stderr at the end.
 """
 from __future__ import annotations
-import os, time, json, random, datetime, uuid, math, collections
+import os, sys, time, json, random, datetime, uuid, math, collections, functools
+
+try:
+    from core import markov as markov_model
+except Exception:  # standalone run: fall back to the dict chain below
+    markov_model = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: batch entropy falls back to Counter per event
+    np = None
+
+try:
+    from core.codec import dumps as json_dumps
+except Exception:  # standalone run without the repo root on sys.path
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
 
 MODE = os.environ.get("NOISE_MODE", "words").lower()
 MIN_I = float(os.environ.get("NOISE_MIN_INTERVAL", "0.8"))
@@ -36,7 +65,12 @@ WORDSET_RAW = os.environ.get("NOISE_WORDSET")
 ENTROPY_BITS = int(os.environ.get("NOISE_ENTROPY_BITS", "128"))
 MAX_WORDS = int(os.environ.get("NOISE_MAX_WORDS", "8"))
 DISABLE_TOKEN_ENT = os.environ.get("NOISE_DISABLE_TOKEN_ENT")
-SESSION = uuid.uuid4().hex[:12]
+MARKOV_MODEL_PATH = os.environ.get("NOISE_MARKOV_MODEL")
+MARKOV_CORPUS = os.environ.get("NOISE_MARKOV_CORPUS")
+MARKOV_ORDER = int(os.environ.get("NOISE_MARKOV_ORDER", "1"))
+BATCH_SIZE = int(os.environ.get("NOISE_BATCH_SIZE", "0"))
+BATCH_TOTAL = int(os.environ.get("NOISE_BATCH_TOTAL", "0"))
+SESSION = os.environ.get("NOISE_SESSION") or uuid.uuid4().hex[:12]
 
 DEFAULT_WORDS = [
     "aurora","flux","drift","lattice","vector","oblique","quantum","slag",
@@ -62,7 +96,26 @@ def build_markov(tokens):
 MARKOV_TOKENS = SEED_CORPUS.split()
 MARKOV = build_markov(MARKOV_TOKENS)
 
+_compiled = []
+
+def compiled_markov():
+    """Compiled model (loaded / built on first use), or None without core.markov."""
+    if markov_model is None:
+        return None
+    if not _compiled:
+        if MARKOV_MODEL_PATH:
+            _compiled.append(markov_model.load(MARKOV_MODEL_PATH))
+        elif MARKOV_CORPUS:
+            paths = [p.strip() for p in MARKOV_CORPUS.split(",") if p.strip()]
+            _compiled.append(markov_model.compile_files(paths, MARKOV_ORDER))
+        else:
+            _compiled.append(markov_model.compile_tokens(MARKOV_TOKENS, MARKOV_ORDER))
+    return _compiled[0]
+
 def markov_sequence(n=MAX_WORDS):
+    model = compiled_markov()
+    if model is not None:
+        return model.sequence(n)
     out = []
     cur = random.choice(MARKOV_TOKENS)
     for _ in range(n):
@@ -86,17 +139,47 @@ def gen_text():
         count = random.randint(3, MAX_WORDS)
         return " ".join(random.choice(WORDS) for _ in range(count))
 
-def shannon_entropy_avg(symbols: list[str]) -> float:
-    if not symbols:
-        return 0.0
-    counter = collections.Counter(symbols)
-    total = sum(counter.values())
+@functools.lru_cache(maxsize=1 << 16)
+def entropy_from_counts(counts: tuple) -> float:
+    # counts in first-occurrence order (Counter order) so the float sum is
+    # bit-identical to summing over a Counter of the same symbols
+    total = sum(counts)
     h = 0.0
-    for c in counter.values():
+    for c in counts:
         p = c / total
         h -= p * math.log2(p)
     return h  # bits per symbol
 
+def gen_texts(n: int) -> list[str]:
+    """n texts with gen_text's distribution, drawing all randomness per block."""
+    if MODE == "markov":
+        return [gen_text() for _ in range(n)]
+    if MODE == "bytes":
+        groups = [g // 2 for g in random.choices(range(4, 13), k=n)]
+        sizes = [2 * k for k in random.choices(range(2, 5), k=sum(groups))]
+        chars = "".join(random.choices("0123456789abcdef", k=sum(sizes)))
+        out, pos, gi = [], 0, 0
+        for g in groups:
+            parts = []
+            for size in sizes[gi:gi + g]:
+                parts.append(chars[pos:pos + size])
+                pos += size
+            gi += g
+            out.append(" ".join(parts))
+        return out
+    counts = random.choices(range(3, MAX_WORDS + 1), k=n)
+    words = random.choices(WORDS, k=sum(counts))
+    out, pos = [], 0
+    for c in counts:
+        out.append(" ".join(words[pos:pos + c]))
+        pos += c
+    return out
+
+def shannon_entropy_avg(symbols: list[str]) -> float:
+    if not symbols:
+        return 0.0
+    return entropy_from_counts(tuple(collections.Counter(symbols).values()))
+
 def entropy_char_metrics(text: str):
     if not text:
         return 0, 0.0, 0.0
@@ -115,52 +198,151 @@ def entropy_token_metrics(text: str):
     total = avg * n
     return n, round(avg, 6), round(total, 6)
 
+def _metrics(counts: tuple, n: int):
+    if not n:
+        return 0, 0.0, 0.0
+    avg = entropy_from_counts(counts)
+    return n, round(avg, 6), round(avg * n, 6)
+
+def _np_count_tuples(codes, lengths, width):
+    """Per-event symbol counts in first-occurrence order for a flat code array."""
+    ev = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+    keys = ev * width + codes
+    uniq, first, cnt = np.unique(keys, return_index=True, return_counts=True)
+    owner = uniq // width
+    order = np.lexsort((first, owner))
+    counts = cnt[order].tolist()
+    bounds = np.cumsum(np.bincount(owner, minlength=len(lengths))).tolist()
+    out, a = [], 0
+    for b in bounds:
+        out.append(tuple(counts[a:b]))
+        a = b
+    return out
+
+def char_metrics_batch(texts: list[str]):
+    """entropy_char_metrics for every text, counted over the whole batch."""
+    if np is None:
+        return [entropy_char_metrics(t) for t in texts]
+    out = [None] * len(texts)
+    idx = [i for i, t in enumerate(texts) if t.isascii()]
+    for i in range(len(texts)):
+        if not texts[i].isascii():
+            out[i] = entropy_char_metrics(texts[i])
+    if idx:
+        sel = [texts[i] for i in idx]
+        lengths = np.fromiter(map(len, sel), dtype=np.int64, count=len(sel))
+        codes = np.frombuffer("".join(sel).encode("ascii"), dtype=np.uint8).astype(np.int64)
+        for i, counts, n in zip(idx, _np_count_tuples(codes, lengths, 128), lengths.tolist()):
+            out[i] = _metrics(counts, n)
+    return out
+
+def token_metrics_batch(texts: list[str]):
+    """entropy_token_metrics for every text, counted over the whole batch."""
+    if np is None:
+        return [entropy_token_metrics(t) for t in texts]
+    vocab = {}
+    token_lists = [t.split() for t in texts]
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(texts))
+    ids = [vocab.setdefault(tok, len(vocab)) for toks in token_lists for tok in toks]
+    codes = np.array(ids, dtype=np.int64)
+    width = max(1, len(vocab))
+    return [_metrics(counts, n)
+            for counts, n in zip(_np_count_tuples(codes, lengths, width), lengths.tolist())]
+
 def band_from_interval(i: float) -> str:
     if i < 1.0: return "hf"
     if i < 2.0: return "mf"
     return "lf"
 
+def build_record(interval, txt, seq, ts, char_m, token_m=None):
+    char_len, char_avg, char_total = char_m
+    record = {
+        "event": "noise_meta",
+        "session": SESSION,
+        "mode": MODE,
+        "seq": seq,
+        "band": band_from_interval(interval),
+        "interval_s": round(interval, 3),
+        "entropy_bits": ENTROPY_BITS,
+        "char_len": char_len,
+        "char_entropy_avg_bits": char_avg,
+        "char_entropy_total_bits": char_total,
+        "text": txt,
+        "ts": ts
+    }
+    if token_m is not None:
+        token_count, token_avg, token_total = token_m
+        record.update({
+            "token_count": token_count,
+            "token_entropy_avg_bits": token_avg,
+            "token_entropy_total_bits": token_total
+        })
+    return record
+
+def wants_token_entropy() -> bool:
+    return MODE in ("words", "markov") and not DISABLE_TOKEN_ENT
+
+def gen_block(n: int, seq0: int):
+    """n records (no sleeping); entropy is computed for the whole block at once."""
+    span = MAX_I - MIN_I
+    intervals = [MIN_I + span * random.random() for _ in range(n)]
+    texts = gen_texts(n)
+    char_ms = char_metrics_batch(texts)
+    token_ms = token_metrics_batch(texts) if wants_token_entropy() else [None] * n
+    ts = datetime.datetime.utcnow().isoformat()
+    return [build_record(intervals[i], texts[i], seq0 + i, ts, char_ms[i], token_ms[i])
+            for i in range(n)]
+
+def iter_blocks(block=BATCH_SIZE, total=BATCH_TOTAL):
+    """Yield lists of records (blocks of `block`, `total` overall, 0 = forever)."""
+    done = seq = 0
+    while not total or done < total:
+        n = block if not total else min(block, total - done)
+        seq = max(seq, int(time.time() * 1000))  # unique even for sub-ms blocks
+        yield gen_block(n, seq)
+        seq += n
+        done += n
+
+def run_batch(out, block=BATCH_SIZE, total=BATCH_TOTAL):
+    """Write blocks of records to a binary stream; returns (events, seconds)."""
+    done = 0
+    t0 = time.perf_counter()
+    for records in iter_blocks(block, total):
+        out.write(("\n".join(map(json_dumps, records)) + "\n").encode("utf-8"))
+        out.flush()
+        done += len(records)
+    return done, time.perf_counter() - t0
+
 def main():
-    print(json.dumps({
+    print(json_dumps({
         "event": "noise_start",
         "session": SESSION,
         "mode": MODE,
         "entropy_bits": ENTROPY_BITS,
         "ts": datetime.datetime.utcnow().isoformat()
     }), flush=True)
+    if BATCH_SIZE > 0:
+        out = open(sys.stdout.fileno(), "wb", buffering=1 << 20, closefd=False)
+        events, secs = run_batch(out)
+        backend = "numpy" if np is not None else "counter"
+        print(f"[noise_metadata] batch events={events} seconds={secs:.3f} "
+              f"events_per_s={events / secs if secs else 0:.0f} entropy={backend}", file=sys.stderr)
+        return
     while True:
         interval = random.uniform(MIN_I, MAX_I)
         time.sleep(interval)
         txt = gen_text()
-        char_len, char_avg, char_total = entropy_char_metrics(txt)
-        record = {
-            "event": "noise_meta",
-            "session": SESSION,
-            "mode": MODE,
-            "seq": int(time.time() * 1000),
-            "band": band_from_interval(interval),
-            "interval_s": round(interval, 3),
-            "entropy_bits": ENTROPY_BITS,
-            "char_len": char_len,
-            "char_entropy_avg_bits": char_avg,
-            "char_entropy_total_bits": char_total,
-            "text": txt,
-            "ts": datetime.datetime.utcnow().isoformat()
-        }
-        if MODE in ("words", "markov") and not DISABLE_TOKEN_ENT:
-            token_count, token_avg, token_total = entropy_token_metrics(txt)
-            record.update({
-                "token_count": token_count,
-                "token_entropy_avg_bits": token_avg,
-                "token_entropy_total_bits": token_total
-            })
-        print(json.dumps(record, separators=(",", ":")), flush=True)
+        token_m = entropy_token_metrics(txt) if wants_token_entropy() else None
+        record = build_record(interval, txt, int(time.time() * 1000),
+                              datetime.datetime.utcnow().isoformat(),
+                              entropy_char_metrics(txt), token_m)
+        print(json_dumps(record), flush=True)
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        print(json.dumps({
+        print(json_dumps({
             "event": "noise_stop",
             "session": SESSION,
             "ts": datetime.datetime.utcnow().isoformat()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+noise_pool:
+Supervisor that runs N noise_metadata batch workers in separate processes and
+merges their JSONL output into one stream (stdout or --out).
+
+- Worker i seeds `random` with worker_seed(SESSION, i), so a given session
+  reproduces the same texts / intervals per worker
+- Workers hand finished blocks to the supervisor through bounded queues
+  (--queue blocks per worker); a slow consumer blocks the workers instead of
+  growing memory
+- --ordered merges the workers' streams by `seq` (k-way heap merge; each
+  worker's seq is already increasing); otherwise blocks are written as they
+  arrive
+- Every event gets a "worker" field; per-worker and total throughput are
+  reported on stderr (every --report-every seconds and at the end)
+- A worker that raises reports the error with its final message; one that
+  dies without it (killed, os._exit) is noticed within POLL_S. Either way
+  the run fails with RuntimeError instead of waiting for it
+
+Env: as noise_metadata (NOISE_MODE, NOISE_SESSION, ...).
+
+Run (from repo root):
+  python -m scripts.workers.noise_pool --workers 4 --events 1000000 > /dev/null
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import heapq
+import multiprocessing as mp
+import queue
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from scripts.workers import noise_metadata as nm
+
+POLL_S = 1.0  # how often the supervisor checks for dead workers while waiting
+
+
+def worker_seed(session: str, index: int) -> int:
+    digest = hashlib.sha256(f"{session}:{index}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _worker(index: int, session: str, total: int, block: int, ordered: bool, q) -> None:
+    done = 0
+    error = None
+    t0 = time.perf_counter()
+    try:
+        nm.SESSION = session
+        random.seed(worker_seed(session, index))
+        for records in nm.iter_blocks(block, total):
+            lines = []
+            for r in records:
+                r["worker"] = index
+                lines.append(nm.json_dumps(r).encode("utf-8") + b"\n")
+            if ordered:
+                q.put((index, [r["seq"] for r in records], lines))
+            else:
+                q.put((index, len(lines), b"".join(lines)))
+            done += len(records)
+    except KeyboardInterrupt:
+        pass
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        q.put((index, None, (done, time.perf_counter() - t0, error)))
+
+
+class NoisePool:
+    def __init__(self, workers: int, total: int = 0, block: int = 1024,
+                 ordered: bool = False, queue_blocks: int = 4,
+                 session: Optional[str] = None, report_every_s: float = 0.0):
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        if total > 0:
+            workers = min(workers, total)  # a share of 0 would mean "run until Ctrl+C"
+        self.workers = workers
+        self.total = total
+        self.block = block
+        self.ordered = ordered
+        self.queue_blocks = queue_blocks
+        self.session = session or nm.SESSION
+        self.report_every_s = report_every_s
+        self.received = [0] * workers
+        self.worker_stats: Dict[int, Any] = {}
+        self._procs: List[Any] = []
+        self._last_report = time.monotonic()
+
+    def _share(self, i: int) -> int:
+        if not self.total:
+            return 0
+        return self.total // self.workers + (1 if i < self.total % self.workers else 0)
+
+    def _maybe_report(self, t0: float) -> None:
+        if self.report_every_s <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_report >= self.report_every_s:
+            self._last_report = now
+            el = time.perf_counter() - t0
+            per = " ".join(f"w{i}={n / el:.0f}/s" for i, n in enumerate(self.received))
+            print(f"[noise_pool] {sum(self.received)} events {per}", file=sys.stderr, flush=True)
+
+    def run(self, out) -> Dict[str, Any]:
+        """Start workers, merge into binary stream out, return throughput stats."""
+        ctx = mp.get_context()
+        if self.ordered:
+            queues = [ctx.Queue(maxsize=self.queue_blocks) for _ in range(self.workers)]
+        else:
+            shared = ctx.Queue(maxsize=self.queue_blocks * self.workers)
+            queues = [shared] * self.workers
+        procs = self._procs = [ctx.Process(target=_worker, name=f"noise-worker-{i}",
+                             args=(i, self.session, self._share(i), self.block,
+                                   self.ordered, queues[i]),
+                             daemon=True)
+                 for i in range(self.workers)]
+        t0 = time.perf_counter()
+        for p in procs:
+            p.start()
+        try:
+            if self.ordered:
+                self._merge_ordered(queues, out, t0)
+            else:
+                self._merge_unordered(queues[0], out, t0)
+        except BaseException:
+            for p in procs:
+                p.terminate()
+            raise
+        finally:
+            out.flush()
+            for p in procs:
+                p.join(timeout=5)
+                if p.is_alive():
+                    p.terminate()
+        return self.stats(time.perf_counter() - t0)
+
+    def _get(self, q):
+        """q.get() that raises once a worker has exited without sending its
+        final message (checked every POLL_S, with one more POLL_S of grace
+        for a message still in flight)."""
+        suspects = None
+        while True:
+            try:
+                return q.get(timeout=POLL_S)
+            except queue.Empty:
+                dead = {i for i, p in enumerate(self._procs)
+                        if p.exitcode is not None and i not in self.worker_stats}
+                if dead and dead == suspects:
+                    i = min(dead)
+                    raise RuntimeError(f"noise worker {i} exited with code "
+                                       f"{self._procs[i].exitcode} before finishing")
+                suspects = dead
+
+    def _finish(self, index: int, payload) -> None:
+        done, secs, error = payload
+        self.worker_stats[index] = (done, secs)
+        if error is not None:
+            raise RuntimeError(f"noise worker {index} failed: {error}")
+
+    def _merge_unordered(self, q, out, t0: float) -> None:
+        live = self.workers
+        while live:
+            index, n, payload = self._get(q)
+            if n is None:
+                self._finish(index, payload)
+                live -= 1
+                continue
+            out.write(payload)
+            self.received[index] += n
+            self._maybe_report(t0)
+
+    def _merge_ordered(self, queues, out, t0: float) -> None:
+        pending: List[List[Any]] = [[] for _ in queues]  # per worker: [seqs, lines, pos]
+
+        def head(i: int):
+            buf = pending[i]
+            while not buf or buf[2] >= len(buf[0]):
+                index, seqs, lines = self._get(queues[i])
+                if seqs is None:
+                    self._finish(index, lines)
+                    return None
+                buf[:] = [seqs, lines, 0]
+            seqs, lines, pos = buf
+            buf[2] = pos + 1
+            return (seqs[pos], i, lines[pos])
+
+        heap = [h for h in (head(i) for i in range(len(queues))) if h is not None]
+        heapq.heapify(heap)
+        chunk: List[bytes] = []
+        while heap:
+            _, i, line = heap[0]
+            chunk.append(line)
+            self.received[i] += 1
+            nxt = head(i)
+            if nxt is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, nxt)
+            if len(chunk) >= self.block:
+                out.write(b"".join(chunk))
+                chunk.clear()
+                self._maybe_report(t0)
+        out.write(b"".join(chunk))
+
+    def stats(self, seconds: float) -> Dict[str, Any]:
+        workers = []
+        for i in range(self.workers):
+            done, secs = self.worker_stats.get(i, (self.received[i], seconds))
+            workers.append({"worker": i, "seed": worker_seed(self.session, i), "events": done,
+                            "seconds": round(secs, 3),
+                            "events_per_s": round(done / secs) if secs else 0})
+        events = sum(self.received)
+        return {"session": self.session, "events": events, "seconds": round(seconds, 3),
+                "events_per_s": round(events / seconds) if seconds else 0, "workers": workers}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run noise_metadata workers in parallel")
+    ap.add_argument("--workers", type=int, default=mp.cpu_count())
+    ap.add_argument("--events", type=int, default=0, help="total events (0 = until Ctrl+C)")
+    ap.add_argument("--block", type=int, default=1024)
+    ap.add_argument("--queue", type=int, default=4, help="queued blocks per worker")
+    ap.add_argument("--ordered", action="store_true", help="merge by seq")
+    ap.add_argument("--report-every", type=float, default=5.0)
+    ap.add_argument("--out", help="write JSONL here instead of stdout")
+    args = ap.parse_args()
+
+    pool = NoisePool(args.workers, args.events, args.block, args.ordered, args.queue,
+                     report_every_s=args.report_every)
+    out = (open(args.out, "wb") if args.out
+           else open(sys.stdout.fileno(), "wb", buffering=1 << 20, closefd=False))
+    try:
+        stats = pool.run(out)
+    except KeyboardInterrupt:
+        stats = pool.stats(0.0)
+    finally:
+        out.close()
+    for w in stats["workers"]:
+        print(f"[noise_pool] worker={w['worker']} events={w['events']} "
+              f"events_per_s={w['events_per_s']}", file=sys.stderr)
+    print(f"[noise_pool] total events={stats['events']} seconds={stats['seconds']} "
+          f"events_per_s={stats['events_per_s']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from core import codec
+from core.beacon_aggregate import BeaconAggregator, ts_seconds
+from core.seeking import SeekingState, beacon_dict
+from tests.test_seeking import _cfg
+
+T0 = 1_724_871_000.0
+LOW, ESC = SeekingState.SEEKING_LOW, SeekingState.SEEKING_ESCALATE
+
+
+def _b(cfg, t, state=LOW, stream="a", ratio=0.5, n=1):
+    return beacon_dict(T0 + t, cfg, stream, state, 10, 5, ratio, n)
+
+
+def _sub(t, op="sub", stream="a", listener="L1"):
+    return {"seq": 1, "op": op, "stream_id": stream, "listener_id": listener, "ts": T0 + t}
+
+
+def test_ts_seconds():
+    assert ts_seconds("2024-08-28T18:50:00.125Z") == 1_724_871_000.125
+    assert ts_seconds("2024-08-28T18:50:00.125Z") == 1_724_871_000.125  # cached prefix
+    assert ts_seconds("2024-08-28T18:50:00.1x5Z") is None
+    assert ts_seconds("2024-08-28T18:50:00Z") == 1_724_871_000.0
+    assert ts_seconds(12) == 12.0 and ts_seconds(None) is None and ts_seconds("nope") is None
+
+
+def test_stream_lifecycle(tmp_path):
+    cfg = _cfg(tmp_path)
+    agg = BeaconAggregator(window_s=60, gap_s=20)
+    for t, state, ratio in ((0, LOW, 0.5), (10, LOW, 0.6), (20, LOW, 0.7), (30, ESC, 0.8),
+                            (35, ESC, 0.9)):
+        assert agg.observe(_b(cfg, t, state, ratio=ratio))
+    view = agg.stream("a")
+    assert view["state"] == "seeking_escalate" and view["loneliness_ratio"] == 0.9
+    assert view["lonely_for_s"] == 35.0 and view["rate_per_min"] == 5.0
+    assert view["time_in_state_s"] == {"seeking_escalate": 5.0, "seeking_low": 30.0}
+
+    assert agg.observe_subscription(_sub(37))
+    assert agg.observe_subscription(_sub(38, listener="L2"))
+    assert agg.observe_subscription(_sub(100, "unsub"))
+    view = agg.stream("a")
+    assert view["state"] == "attached" and view["lonely_for_s"] is None
+    assert (view["time_to_attach_s"], view["attaches"]) == (37.0, 1)
+    # Quiet states are charged in full; the second listener keeps it attached.
+    assert agg.stream("a", now=T0 + 1000)["time_in_state_s"]["attached"] == 963.0
+
+    assert agg.observe_subscription(_sub(1000, "unsub", listener="L2"))
+    agg.observe(_b(cfg, 1200))
+    agg.observe(_b(cfg, 1210, ESC))
+    agg.observe(_b(cfg, 1300))  # 90s seeking gap > gap_s: dropped, new episode
+    agg.observe(_b(cfg, 1305, SeekingState.ATTACHED))
+    view = agg.stream("a")
+    assert view["time_in_state_s"] == {"attached": 963.0, "idle": 200.0,
+                                       "seeking_escalate": 7.0, "seeking_low": 45.0}
+    assert (view["time_to_attach_s"], view["mean_time_to_attach_s"], view["attaches"]) == \
+        (5.0, 21.0, 2)
+    assert agg.observe_subscription(_sub(1, stream="a")) is False  # older than the stream
+    assert agg.observe_subscription(_sub(2000, stream="unknown")) is False
+    assert agg.totals()["late"] == 1
+
+    # A sub after a dropped quiet gap does not close the stale episode.
+    agg.observe(_b(cfg, 0, stream="b"))
+    assert agg.observe_subscription(_sub(500, stream="b"))
+    view = agg.stream("b")
+    assert view["state"] == "attached" and view["attaches"] == 0
+    assert view["time_to_attach_s"] is None and "seeking_low" not in view["time_in_state_s"]
+
+
+def test_feed_lines_interleaves_journal(tmp_path):
+    cfg = _cfg(tmp_path)
+    lines = [codec.dumpb(_b(cfg, t)) for t in (0, 5, 10)]
+    lines += [b"{broken", b"[1]", codec.dumpb({"stream_id": "a"}), codec.dumpb(_b(cfg, 30))]
+    agg = BeaconAggregator(gap_s=60)
+    assert agg.feed_lines(lines, [_sub(12), _sub(11, "unsub"), {"op": "sub"}]) == 4
+    t = agg.totals()
+    assert (t["lines"], t["beacons"], t["bad"], t["subscription_events"]) == (7, 4, 3, 2)
+    view = agg.stream("a")
+    # unsub@11 (no effect), sub@12 ends the episode, the beacon at 30 opens a new one.
+    assert view["time_to_attach_s"] == 12.0 and view["lonely_for_s"] == 0.0
+    assert view["time_in_state_s"] == {"attached": 18.0, "seeking_low": 12.0}
+
+
+def test_windows_eviction_and_top(tmp_path):
+    cfg = _cfg(tmp_path)
+    agg = BeaconAggregator(window_s=10, windows=3, gap_s=30, idle_s=100, max_streams=3,
+                           ring_size=4)
+    for i in range(40):
+        agg.observe(_b(cfg, i, ESC if i % 2 else LOW, stream="fast", ratio=0.2))
+    assert [w["start"] - T0 for w in agg.window_stats()] == [10, 20, 30]
+    assert agg.window_stats()[-1]["by_state"] == {"seeking_escalate": 5, "seeking_low": 5}
+    assert agg.stream("fast")["rate_per_min"] == 60.0  # ring saturated: estimated from its span
+    assert agg.observe(_b(cfg, 5, stream="fast")) and agg.totals()["late"] == 1
+    assert agg.window_stats()[0]["beacons"] == 10  # t=5 is older than every kept window
+
+    agg.observe(_b(cfg, 39, stream="lonely", ratio=0.9))
+    agg.observe(_b(cfg, 39.5, stream="mid", ratio=0.5))
+    agg.observe_subscription(_sub(39.6, stream="mid"))
+    assert [r["stream_id"] for r in agg.top_loneliest(5)] == ["lonely", "fast"]
+    assert [r["stream_id"] for r in agg.top_loneliest(5, now=T0 + 80)] == []  # stale
+    agg.observe(_b(cfg, 40, stream="new"))
+    assert set(agg.streams) == {"lonely", "mid", "new"} and agg.totals()["evicted"] == 1
+    agg.observe(_b(cfg, 200, stream="late"))
+    for _ in range(1023):  # idle eviction runs every 1024 beacons
+        agg.observe(_b(cfg, 200, stream="late"))
+    assert set(agg.streams) == {"late"}
+    snap = agg.snapshot()
+    assert snap["now"] == T0 + 200 and list(snap["streams"]) == ["late"]
+    with pytest.raises(ValueError):
+        BeaconAggregator(ring_size=1)
+
+
+def test_cli_top_json(tmp_path):
+    cfg = _cfg(tmp_path)
+    beacons = tmp_path / "beacons.jsonl"
+    journal = tmp_path / "subscriptions.journal.jsonl"
+    beacons.write_bytes(b"".join(codec.dumpb(b) + b"\n" for b in (
+        _b(cfg, 0, stream="x", ratio=0.3), _b(cfg, 1, stream="y", ratio=0.8),
+        _b(cfg, 2, stream="z", ratio=0.9), _b(cfg, 3, stream="x", ratio=0.4))))
+    journal.write_bytes(codec.dumpb(_sub(2.5, stream="z")) + b"\n")
+    out = subprocess.run([sys.executable, "-m", "core.beacon_aggregate", str(beacons),
+                          "--journal", str(journal), "--top", "2", "--json"],
+                         capture_output=True, text=True, check=True).stdout
+    report = json.loads(out)
+    assert [r["stream_id"] for r in report["top"]] == ["y", "x"]
+    assert report["totals"]["beacons"] == 4 and report["top"][1]["beacons"] == 2
+    text = subprocess.run([sys.executable, "-m", "core.beacon_aggregate", str(beacons)],
+                          capture_output=True, text=True, check=True).stdout
+    assert text.splitlines()[0].startswith("[beacon_aggregate] streams=3")
+    assert text.splitlines()[2].split()[:3] == ["z", "seeking_low", "0.900"]
@@ -0,0 +1,159 @@
+import gzip
+import os
+import pickle
+
+import pytest
+
+from core import beacon_archive as ba
+from core import codec
+from core.seeking import SeekingController, SeekingState, beacon_dict
+from tests.test_seeking import _cfg
+
+
+def _beacons(tmp_path):
+    out = []
+    ctl = SeekingController(_cfg(tmp_path, stream_id="strøm-1"))
+    t0 = 1_724_871_000.123
+    ctl.update_and_maybe_beacon(now=t0)
+    for i in range(1, 200):
+        ctl.record_tick()
+        if i % 3 == 0:
+            ctl.record_delivery()
+        b = ctl.update_and_maybe_beacon(now=t0 + 2.5 * i, entropy_profile="low" if i % 2 else None,
+                                        tokens_hint=["a", "ß"] if i % 5 == 0 else None,
+                                        spore="x" if i % 7 == 0 else None)
+        if b:
+            out.append(b)
+    cfg = _cfg(tmp_path)
+    out.append(beacon_dict(0.0, cfg, "s2", SeekingState.SEEKING_ESCALATE, 0, 0, 0.0, 1))
+    out.append(beacon_dict(1_999_999_999.999, cfg, "s2", SeekingState.SEEKING_LOW, 7, 3,
+                           4 / 7, 2))
+    return out
+
+
+def _write(path, beacons, extra=()):
+    lines = [codec.dumpb(b) for b in beacons]
+    for pos, raw in extra:
+        lines.insert(pos, raw)
+    path.write_bytes(b"\n".join(lines) + b"\n")
+    return lines
+
+
+def test_roundtrip_is_exact(tmp_path):
+    beacons = _beacons(tmp_path)
+    foreign = b'{"ts": 1724871000123, "stream_id": "legacy", "state": "seeking_low"}'
+    reordered = codec.dumpb(dict(reversed(list(beacons[0].items()))))
+    src = tmp_path / "beacons.jsonl.000001"
+    lines = _write(src, beacons, [(3, foreign), (5, b"{broken"), (8, reordered)])
+    with ba.open_archive(ba.convert(src)) as a:
+        assert (a.n_columnar, a.n_overflow, a.meta["skipped"]) == (len(beacons), 2, 1)
+        assert a.meta["source"] == src.name
+        assert [codec.dumpb(r) for r in a.records()] == [codec.dumpb(codec.loads(x))
+                                                         for x in lines if x != b"{broken"]
+        assert [list(r.items()) for r in a.records(range(len(beacons)))] == \
+            [list(b.items()) for b in beacons]
+        assert [pos for pos, _ in a.overflow()] == [3, 7]
+        assert a.column("ts").format == "q" and a.column("state").format == "B"
+        assert a.column("seq").tolist() == [b["seq"] for b in beacons]
+        assert a.decoded("stream_id")[0] == "strøm-1"
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_select_filters_columns(tmp_path, monkeypatch, use_numpy):
+    if use_numpy and ba.np is None:
+        pytest.skip("numpy not installed")
+    if not use_numpy:
+        monkeypatch.setattr(ba, "np", None)
+    beacons = _beacons(tmp_path)
+    src = tmp_path / "b.jsonl"
+    _write(src, beacons)
+    with ba.open_archive(ba.convert(src, tmp_path / "b.nsba")) as a:
+        since = 1_724_871_100
+
+        def want(pred):
+            return [i for i, b in enumerate(beacons) if pred(b)]
+
+        assert a.select(state="seeking_escalate") == want(lambda b: b["state"] == "seeking_escalate")
+        assert a.select(stream_id=["s2", "nope"], state="seeking_low") == \
+            want(lambda b: b["stream_id"] == "s2" and b["state"] == "seeking_low")
+        assert a.select(since=since, until=since + 100) == \
+            want(lambda b: since * 1000 <= ba.ts_to_ms(b["ts"]) <= (since + 100) * 1000)
+        edge = beacons[10]["ts"]  # both bounds inclusive, as in beacon_index.query
+        assert a.select(since=edge, until=edge) == [10]
+        assert a.select(since=ba.ts_to_ms(edge) + 1, until=beacons[11]["ts"]) == [11]
+        assert a.select(mode="nope") == []
+        rows = a.select(stream_id="strøm-1", state="seeking_low")
+        assert list(a.records(rows)) == [beacons[i] for i in rows]
+
+
+def test_export_segments_and_summary(tmp_path):
+    active = tmp_path / "beacons.jsonl"
+    active.write_text("", encoding="utf-8")
+    beacons = _beacons(tmp_path)
+    half = len(beacons) // 2
+    _write(tmp_path / "beacons.jsonl.000001", beacons[:half])
+    with gzip.open(tmp_path / "beacons.jsonl.000002.gz", "wb") as f:
+        f.write(b"".join(codec.dumpb(b) + b"\n" for b in beacons[half:]))
+    written = ba.export_segments(active)
+    assert [p.name for p in written] == ["beacons.jsonl.000001.nsba", "beacons.jsonl.000002.nsba"]
+    assert ba.export_segments(active) == []  # up to date
+    assert sum(p.stat().st_size for p in written) < sum(
+        len(codec.dumpb(b)) for b in beacons) / 3
+    archives = [ba.open_archive(p) for p in written]
+    try:
+        summary = ba.summarize(archives)
+        assert [r for a in archives for r in a.records()] == beacons
+    finally:
+        for a in archives:
+            a.close()
+    assert sum(s["beacons"] for s in summary.values()) == len(beacons)
+    assert summary["seeking_escalate"]["median_cadence_s"] == 5.0
+
+
+def test_rejects_other_files(tmp_path):
+    p = tmp_path / "x.nsba"
+    p.write_bytes(b"NSMK" + bytes(64))
+    with pytest.raises(ValueError):
+        ba.open_archive(p)
+    assert os.path.exists(p)
+
+
+def test_close_with_exported_column(tmp_path):
+    src = tmp_path / "beacons.jsonl"
+    _write(src, _beacons(tmp_path))
+    a = ba.open_archive(ba.convert(src))
+    held = pickle.PickleBuffer(a.column("seq"))  # holds a buffer export, like np.frombuffer
+    expected = a.column("seq").tolist()
+    a.close()
+    assert a._file is None and a._mm is None and a._views == {}
+    assert held.raw().cast("q").tolist() == expected
+    held.release()
+    a.close()
+
+
+def test_per_row_columns_are_not_dictionary_encoded(tmp_path, monkeypatch):
+    beacons = _beacons(tmp_path)
+    for i, b in enumerate(beacons):
+        b["spore"] = f"spore-{i:04d}-ß"
+        b["tokens_hint"] = [f"t{i}", i % 3]
+    src = tmp_path / "b.jsonl"
+    _write(src, beacons)
+    with ba.open_archive(ba.convert(src, tmp_path / "b.nsba")) as a:
+        cols = {c["name"]: c for c in a.meta["columns"]}
+        assert a.n_columnar == len(beacons)
+        assert "values" not in cols["spore"] and "values" not in cols["tokens_hint"]
+        assert "values" in cols["stream_id"] and "values" in cols["tempo_range_s"]
+        assert a.value("spore", 7) == "spore-0007-ß" and a.value("tokens_hint", 7) == ["t7", 1]
+        assert a.decoded("spore") == [b["spore"] for b in beacons]
+        assert list(a.records()) == beacons and a.record(3) == beacons[3]
+
+    # Version 1 archives (every string/list column in the dictionary) still open.
+    monkeypatch.setattr(ba, "VERSION", 1)
+    monkeypatch.setattr(ba, "COLUMNS", tuple((n, None if c == ba.BLOB else c)
+                                             for n, c in ba.COLUMNS))
+    old = ba.encode(src.read_bytes().splitlines())
+    monkeypatch.undo()
+    a = ba.BeaconArchive(old)
+    assert "values" in {c["name"]: c for c in a.meta["columns"]}["spore"]
+    assert list(a.records()) == beacons and a.value("spore", 5) == beacons[5]["spore"]
+    a.close()
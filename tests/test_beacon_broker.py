@@ -0,0 +1,173 @@
+import io
+import socket
+import threading
+import time
+
+import pytest
+
+from core import beacon_broker, beacon_writer, codec
+from core.beacon_broker import BeaconBroker, ProtocolError
+
+
+def _line(i, stream="s1"):
+    return codec.dumpb({"ts": f"2024-08-28T18:50:{i % 60:02d}.000Z", "stream_id": stream,
+                        "state": "seeking_low", "beacon_n": i}) + b"\n"
+
+
+def _collect(sub, n, timeout=5.0):
+    out, deadline = [], time.monotonic() + timeout
+    while len(out) < n and time.monotonic() < deadline:
+        out += sub.read_lines(timeout=0.1)
+    return out
+
+
+def test_frames_addresses_and_stream_ids():
+    buf = io.BytesIO(beacon_broker.encode_frame(beacon_broker.PUBLISH, b"abc\n")
+                     + beacon_broker.encode_frame(beacon_broker.FLUSH))
+    assert beacon_broker.read_frame(buf) == (ord("P"), b"abc\n")
+    assert beacon_broker.read_frame(buf) == (ord("F"), b"")
+    assert beacon_broker.read_frame(buf) is None
+    for raw in (b"\x00\x00", b"\x00\x00\x00\x09Pabc", b"\x7f\x00\x00\x00P"):
+        with pytest.raises(ProtocolError):
+            beacon_broker.read_frame(io.BytesIO(raw))
+
+    assert beacon_broker.parse_address("unix:/tmp/b.sock") == (socket.AF_UNIX, "/tmp/b.sock")
+    assert beacon_broker.parse_address("tcp:10.0.0.2:8788")[1] == ("10.0.0.2", 8788)
+    assert beacon_broker.parse_address(":9000")[1] == ("127.0.0.1", 9000)
+    with pytest.raises(ValueError):
+        beacon_broker.parse_address("broker.sock")
+
+    sid = beacon_broker.line_stream_id
+    assert sid(_line(1, "alpha")) == "alpha"
+    assert sid(b'{"payload":{"stream_id":"inner"},"stream_id":"outer"}') == "outer"
+    assert sid(b'{"stream_id": "spaced"}') == "spaced"
+    assert sid(b'{"stream_id":"a\\"b"}') == 'a"b'
+    assert sid(b"[1]") is None and sid(b"{broken") is None
+
+
+def test_local_broker_persists_and_fans_out(tmp_path, monkeypatch):
+    path = tmp_path / "beacons.jsonl"
+    broker = BeaconBroker(path)
+    everything = beacon_broker.subscribe(broker)
+    only_s2 = beacon_broker.subscribe(broker, ["s2"])
+    follower = beacon_writer.follow(path, from_start=True, use_inotify=False)
+    pub = beacon_broker.connect(broker, batch_bytes=1 << 20, max_delay_s=60)
+    lines = [_line(i, f"s{i % 3}") for i in range(30)]
+    pub.publish_lines(lines[:20])
+    assert pub.publish(codec.loads(lines[20])) == len(lines[20])
+    assert path.read_bytes() == b"" and everything.read_lines() == []
+    assert pub.flush(sync=True) and (pub.sent, pub.batches) == (21, 1)
+
+    assert broker.publish(b"\n" + b"".join(lines[21:]).rstrip(b"\n") + b"\n  \n") == 9
+    assert path.read_bytes() == b"".join(lines)
+    assert everything.read_lines() == [line[:-1] for line in lines]
+    assert [b["beacon_n"] for b in only_s2.poll()] == list(range(2, 30, 3))
+    assert follower.read_lines() == [line[:-1] for line in lines]
+    assert broker.stats()["beacons"] == 30 and broker.stats()["subscribers"] == 2
+
+    only_s2.close()
+    slow = BeaconBroker(tmp_path / "slow.jsonl", queue_bytes=3 * len(lines[0]))
+    lagging = slow.subscribe()
+    printed = []
+    monkeypatch.setattr(beacon_broker, "print", lambda msg: printed.append(
+        (msg, slow._lock.locked())), raising=False)
+    for line in lines[:5]:
+        slow.publish(line)
+    monkeypatch.undo()
+    assert [locked for msg, locked in printed if "fell" in msg] == [False]  # not under the lock
+    assert lagging.closed and lagging.overflowed
+    assert lagging.read_lines() == [line[:-1] for line in lines[:3]]  # what was queued
+    assert slow.stats()["dropped_subscribers"] == 1 and slow.stats()["subscribers"] == 0
+    assert list(lagging) == []
+    pub.close()
+    broker.close()
+    slow.close()
+    follower.close()
+
+
+def test_append_beacon_through_broker(tmp_path):
+    broker = BeaconBroker(tmp_path / "beacons.jsonl")
+    sub = broker.subscribe()
+    local = tmp_path / "local.jsonl"
+    beacon_writer.use_broker(broker)
+    try:
+        for i in range(3):
+            beacon_writer.append_beacon(codec.loads(_line(i)), str(local))
+        beacon_writer.close_shared_writers()  # flushes the shared publisher
+    finally:
+        beacon_writer.use_broker(None)
+    assert not local.exists()
+    assert (tmp_path / "beacons.jsonl").read_bytes() == b"".join(_line(i) for i in range(3))
+    assert len(sub.read_lines()) == 3
+    beacon_writer.append_beacon(codec.loads(_line(9)), str(local))
+    beacon_writer.close_shared_writers()
+    assert local.read_bytes() == _line(9)
+    broker.close()
+
+
+@pytest.mark.parametrize("transport", ["unix", "tcp"])
+def test_socket_broker_end_to_end(tmp_path, capsys, transport):
+    broker = BeaconBroker(tmp_path / "beacons.jsonl")
+    listen = f"unix:{tmp_path / 'broker.sock'}" if transport == "unix" else "127.0.0.1:0"
+    server = beacon_broker.make_server(broker, listen)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = beacon_broker.server_address(server)
+    everything = beacon_broker.subscribe(address)
+    only_s1 = beacon_broker.subscribe(address, ["s1"])
+
+    lines = [_line(i, f"s{i % 2}") for i in range(200)]
+    pub = beacon_broker.connect(address, batch_bytes=1024, max_delay_s=60)
+    pub.publish_lines(lines)
+    assert pub.flush(sync=True) and pub.batches > 1 and pub.sent == 200
+    assert (tmp_path / "beacons.jsonl").read_bytes() == b"".join(lines)
+    assert _collect(everything, 200) == [line[:-1] for line in lines]
+    assert _collect(only_s1, 100) == [line[:-1] for line in lines[1::2]]
+
+    # Nothing pending but one line: the background flush sends it after max_delay_s.
+    timed = beacon_broker.connect(address, max_delay_s=0.01)
+    timed.publish_line(_line(500, "s0"))
+    assert everything.read_lines(timeout=5) == [_line(500, "s0")[:-1]]
+    timed.close()
+
+    everything.close()
+    server.shutdown()
+    server.server_close()
+    broker.close()  # ends the remaining subscription
+    deadline = time.monotonic() + 5
+    while not only_s1.closed and time.monotonic() < deadline:
+        only_s1.wait(0.1)
+    assert only_s1.closed and list(only_s1) == []
+
+    # Broker gone: batches are dropped and the error is reported once.
+    pub.publish_line(_line(1))
+    assert not pub.flush(sync=True)
+    pub.publish_line(_line(2))
+    assert not pub.flush()  # reconnect refused
+    assert pub.dropped == 1 and capsys.readouterr().out.count("publish error") == 1
+    pub.close()
+
+
+def test_publisher_does_not_block_on_a_stalled_broker(tmp_path, capsys):
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(tmp_path / "stalled.sock"))
+    listener.listen(1)
+    accepted = []
+    threading.Thread(target=lambda: accepted.append(listener.accept()[0]), daemon=True).start()
+    pub = beacon_broker.connect(f"unix:{tmp_path / 'stalled.sock'}", batch_bytes=16 << 10,
+                                max_delay_s=60, queue_bytes=64 << 10)
+    line = _line(1)[:-2] + b',"pad":"' + b"x" * 1000 + b'"}\n'
+    worst = 0.0
+    for _ in range(10_000):  # ~10 MB, far beyond the socket buffers; never read
+        t0 = time.perf_counter()
+        pub.publish_line(line)
+        worst = max(worst, time.perf_counter() - t0)
+    assert worst < 0.5 and pub.dropped > 0
+    assert "full (65536 bytes); dropping beacons" in capsys.readouterr().out
+    deadline = time.monotonic() + 5
+    while not accepted and time.monotonic() < deadline:
+        time.sleep(0.01)
+    accepted[0].close()  # the blocked send fails instead of timing out
+    listener.close()
+    t0 = time.monotonic()
+    pub.close()
+    assert time.monotonic() - t0 < 2
@@ -0,0 +1,63 @@
+from core import beacon_index, beacon_segments, beacon_writer
+from core.seeking import _iso_ts
+
+T0 = 1_724_871_000.0
+
+
+def _beacon(i, iso=True):
+    ts = _iso_ts(T0 + i) if iso else int((T0 + i) * 1000)
+    return {"ts": ts, "stream_id": f"s{i % 4}", "state": "seeking_low", "seq": i}
+
+
+def test_to_epoch_ms_forms():
+    ms = int(T0 * 1000) + 123
+    assert beacon_index.to_epoch_ms(_iso_ts(T0 + 0.123)) == ms
+    assert beacon_index.to_epoch_ms(ms) == ms
+    assert beacon_index.to_epoch_ms(T0 + 0.123) == ms
+    assert beacon_index.to_epoch_ms("2024-08-28T18:50:00+00:00") == 1_724_871_000_000
+    assert beacon_index.to_epoch_ms("yesterday") is None
+
+
+def test_writer_index_query_across_rotation(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    with beacon_writer.BeaconWriter(p, max_buffer_bytes=2048, index_every=16,
+                                    rotate_bytes=20_000, compress=True) as w:
+        for i in range(500):
+            w.write(_beacon(i, iso=i % 2 == 0))
+    beacon_segments.wait_for_compression()
+    assert beacon_segments.list_segments(p)
+    assert beacon_index.load_blocks(p)
+
+    def expected(sid=None, lo=None, hi=None):
+        return [i for i in range(500)
+                if (sid is None or f"s{i % 4}" == sid)
+                and (lo is None or i >= lo) and (hi is None or i <= hi)]
+
+    seqs = lambda rows: [b["seq"] for b in rows]
+    assert seqs(beacon_index.query(p)) == expected()
+    assert seqs(beacon_index.query(p, stream_id="s1")) == expected("s1")
+    assert seqs(beacon_index.query(p, since=_iso_ts(T0 + 100), until=int((T0 + 180) * 1000))) \
+        == expected(lo=100, hi=180)
+    assert seqs(beacon_index.query(p, stream_id="s2", since=T0 + 430)) == expected("s2", lo=430)
+    assert beacon_index.query(p, stream_id="nobody") == []
+
+
+def test_indexer_resumes_and_rebuilds(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    with beacon_writer.BeaconWriter(p, index_every=8) as w:
+        for i in range(20):
+            w.write(_beacon(i))
+    # lines appended by someone else, then a new indexing writer picks them up
+    with open(p, "ab") as f:
+        for i in range(20, 30):
+            f.write(beacon_writer.codec.dumpb(_beacon(i)) + b"\n")
+    with beacon_writer.BeaconWriter(p, index_every=8) as w:
+        w.write(_beacon(30))
+    blocks = beacon_index.load_blocks(p)
+    assert blocks[-1]["e"] == p.stat().st_size
+    assert sum(b["n"] for b in blocks) == 31
+    assert [b["seq"] for b in beacon_index.query(p, stream_id="s3")] == [3, 7, 11, 15, 19, 23, 27]
+    # truncated data -> stale sidecar is rebuilt
+    p.write_bytes(b"")
+    assert beacon_index.build_index(p, every=8) == 0
+    assert beacon_index.query(p) == []
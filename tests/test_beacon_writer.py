@@ -0,0 +1,270 @@
+import json
+from collections import deque
+
+from core import beacon_writer
+
+
+def _reference_read_recent(path, max_lines):
+    # Forward full-scan implementation read_recent used to have.
+    dq = deque(maxlen=max_lines)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                dq.append(line.rstrip("\n"))
+    out = []
+    for raw in dq:
+        try:
+            out.append(json.loads(raw))
+        except Exception:
+            continue
+    return out
+
+
+def _write_mixed(path, n=300):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            if i % 37 == 5:
+                f.write("{not json\n")
+            elif i % 41 == 7:
+                f.write("\n   \n")
+            else:
+                f.write(json.dumps({"stream_id": f"s{i % 3}", "state": "seeking_low",
+                                    "seq": i, "pad": "x" * (i % 90)}) + "\n")
+        f.write('{"stream_id":"s0","state":"seek')  # partial trailing line
+
+
+def test_read_recent_matches_full_scan(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    _write_mixed(p)
+    for n in (1, 2, 10, 57, 299, 1000):
+        assert beacon_writer.read_recent(str(p), max_lines=n) == _reference_read_recent(p, n)
+
+
+def test_tail_lines_small_blocks(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    _write_mixed(p)
+    expected = [ln.encode() for ln in p.read_text(encoding="utf-8").splitlines() if ln.strip()]
+    for block in (1, 7, 64, 4096):
+        assert beacon_writer.tail_lines(p, 25, block_size=block) == expected[-25:]
+        assert beacon_writer.tail_lines(p, 10_000, block_size=block) == expected
+
+
+def test_read_recent_absent_and_empty(tmp_path):
+    assert beacon_writer.read_recent(str(tmp_path / "nope.jsonl")) == []
+    p = tmp_path / "empty.jsonl"
+    p.write_text("", encoding="utf-8")
+    assert beacon_writer.read_recent(str(p)) == []
+    assert beacon_writer.read_recent(str(p), max_lines=0) == []
+
+
+def test_beacon_writer_buffers_until_threshold(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    w = beacon_writer.BeaconWriter(p, max_buffer_bytes=10_000, max_delay_s=60)
+    w.write({"stream_id": "a", "state": "seeking_low"})
+    assert p.read_bytes() == b""
+    w.flush()
+    assert p.read_bytes() == b'{"stream_id":"a","state":"seeking_low"}\n'
+    w.close()
+    assert w.closed
+
+
+def test_beacon_writer_context_manager_and_policies(tmp_path):
+    for policy in beacon_writer.DURABILITY_POLICIES:
+        p = tmp_path / f"{policy}.jsonl"
+        with beacon_writer.BeaconWriter(p, max_buffer_bytes=64, durability=policy) as w:
+            w.write_many({"seq": i, "txt": "ä"} for i in range(20))
+        lines = p.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(ln)["seq"] for ln in lines] == list(range(20))
+    try:
+        beacon_writer.BeaconWriter(tmp_path / "x.jsonl", durability="sometimes")
+    except ValueError:
+        pass
+    else:  # pragma: no cover
+        raise AssertionError("invalid durability accepted")
+
+
+def test_beacon_writer_flushes_at_exit(tmp_path):
+    import subprocess
+    import sys
+
+    p = tmp_path / "exit.jsonl"
+    code = (
+        "from core.beacon_writer import BeaconWriter\n"
+        f"w = BeaconWriter({str(p)!r}, max_buffer_bytes=1 << 20, max_delay_s=3600)\n"
+        "w.write({'seq': 1})\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert p.read_text(encoding="utf-8") == '{"seq":1}\n'
+
+
+def test_append_beacon_is_immediately_visible(tmp_path):
+    p = tmp_path / "sub" / "beacons.jsonl"
+    beacon_writer.append_beacon({"stream_id": "s", "state": "seeking_low", "n": 1}, str(p))
+    beacon_writer.append_beacon({"stream_id": "s", "state": "seeking_low", "n": 2}, str(p))
+    assert [b["n"] for b in beacon_writer.read_recent(str(p))] == [1, 2]
+    beacon_writer.close_shared_writers()
+
+
+def test_buffered_writer_flushes_after_max_delay_without_writes(tmp_path):
+    import time
+
+    p = tmp_path / "beacons.jsonl"
+    w = beacon_writer.BeaconWriter(p, max_buffer_bytes=1 << 20, max_delay_s=0.05)
+    w.write({"seq": 1})
+    assert p.read_bytes() == b""
+    deadline = time.monotonic() + 5
+    while not p.read_bytes() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert p.read_bytes() == b'{"seq":1}\n'
+    w.close()
+
+
+def test_shared_writer_reopens_after_external_move(tmp_path, monkeypatch):
+    monkeypatch.setattr(beacon_writer, "REOPEN_CHECK_S", 0.0)
+    p = tmp_path / "beacons.jsonl"
+    beacon_writer.append_beacon({"n": 1}, str(p))
+    p.rename(tmp_path / "beacons.jsonl.old")  # logrotate / mv
+    beacon_writer.append_beacon({"n": 2}, str(p))
+    p.unlink()
+    beacon_writer.append_beacon({"n": 3}, str(p))
+    beacon_writer.close_shared_writers()
+    assert (tmp_path / "beacons.jsonl.old").read_bytes() == b'{"n":1}\n'
+    assert p.read_bytes() == b'{"n":3}\n'
+
+
+def _append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_follower_incremental_truncate_rotate(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    _append(p, '{"seq":0}\n')
+    for use_inotify in (False, True):
+        with beacon_writer.follow(p, use_inotify=use_inotify) as fol:
+            assert fol.poll() == []  # starts at EOF
+            _append(p, '{"seq":1}\n{"seq":2}\n{"seq":')
+            assert [b["seq"] for b in fol.poll()] == [1, 2]
+            _append(p, '3}\nbroken\n')
+            assert [b["seq"] for b in fol.poll()] == [3]
+            assert fol.poll() == []
+            # truncation
+            p.write_text('{"seq":10}\n', encoding="utf-8")
+            assert [b["seq"] for b in fol.poll()] == [10]
+            # rotation: lines written to the old inode are still delivered
+            rotated = tmp_path / "beacons.jsonl.1"
+            p.rename(rotated)
+            _append(rotated, '{"seq":11}\n')
+            _append(p, '{"seq":20}\n')
+            assert [b["seq"] for b in fol.poll()] == [11, 20]
+            rotated.unlink()
+        p.write_text('{"seq":0}\n', encoding="utf-8")
+
+
+def test_follower_from_start_and_missing_file(tmp_path):
+    p = tmp_path / "later.jsonl"
+    fol = beacon_writer.follow(p, use_inotify=False)
+    assert fol.poll() == []
+    _append(p, '{"seq":1}\n')
+    assert [b["seq"] for b in fol.poll()] == [1]
+    fol.close()
+    with beacon_writer.follow(p, from_start=True) as fol:
+        assert [b["seq"] for b in fol.poll()] == [1]
+
+
+def test_follower_async_iteration_wakes_on_append(tmp_path):
+    import asyncio
+
+    p = tmp_path / "beacons.jsonl"
+    p.write_text("", encoding="utf-8")
+
+    async def scenario():
+        fol = beacon_writer.follow(p, poll_interval_s=0.01)
+        it = fol.__aiter__()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, _append, p, '{"seq":7}\n')
+        first = await asyncio.wait_for(it.__anext__(), timeout=5)
+        await it.aclose()
+        fol.close()
+        return first
+
+    assert asyncio.run(scenario()) == {"seq": 7}
+
+
+def test_rotation_by_size_with_manifest_and_spanning_reads(tmp_path):
+    from core import beacon_segments
+
+    p = tmp_path / "beacons.jsonl"
+    with beacon_writer.BeaconWriter(p, max_buffer_bytes=0, rotate_bytes=400, compress=True) as w:
+        for i in range(60):
+            w.write({"stream_id": "s", "state": "seeking_low", "ts": 1000 + i, "seq": i})
+    beacon_segments.wait_for_compression()
+    segs = beacon_segments.list_segments(p)
+    assert len(segs) >= 3 and all(s.compressed for s in segs)
+    manifest = beacon_segments.read_manifest(p)["segments"]
+    assert [m["seq"] for m in manifest] == [s.seq for s in segs]
+    assert manifest[0]["first_ts"] == 1000 and manifest[0]["compressed"]
+    assert all(a["last_ts"] < b["first_ts"] for a, b in zip(manifest, manifest[1:]))
+    for n in (1, 5, 17, 60, 100):
+        assert [b["seq"] for b in beacon_writer.read_recent(str(p), max_lines=n)] == list(range(60))[-n:]
+
+
+def test_rotate_now_and_age_threshold(tmp_path):
+    from core import beacon_segments
+
+    p = tmp_path / "beacons.jsonl"
+    w = beacon_writer.BeaconWriter(p, max_buffer_bytes=0, rotate_age_s=3600)
+    w.write({"seq": 0})
+    assert w.rotate().seq == 1
+    w.write({"seq": 1})
+    w.rotate_age_s = 1e-9
+    w.write({"seq": 2})  # past age threshold -> rotated after the batch
+    w.close()
+    assert [s.seq for s in beacon_segments.list_segments(p)] == [1, 2]
+    assert p.read_bytes() == b""
+    assert [b["seq"] for b in beacon_writer.read_recent(str(p), 2)] == [1, 2]
+
+
+def test_env_rotation_only_for_single_writer(tmp_path, monkeypatch, capsys):
+    from core import beacon_segments
+
+    monkeypatch.setattr(beacon_writer, "ROTATE_BYTES", 50)
+    monkeypatch.setattr(beacon_writer, "ROTATE_COMPRESS", True)
+    shared = tmp_path / "shared.jsonl"
+    for i in range(10):
+        beacon_writer.append_beacon({"seq": i, "pad": "x" * 20}, str(shared))
+    beacon_writer.close_shared_writers()
+    assert beacon_segments.list_segments(shared) == [] and len(shared.read_bytes()) > 50
+    assert "NOISE_SEEK_ROTATE_* ignored" in capsys.readouterr().out
+
+    monkeypatch.setattr(beacon_writer, "SINGLE_WRITER", True)
+    owned = tmp_path / "owned.jsonl"
+    for i in range(6):
+        beacon_writer.append_beacon({"seq": i, "pad": "x" * 60}, str(owned))
+        if beacon_segments._COMPRESSORS:
+            beacon_segments._COMPRESSORS[-1].join()
+    beacon_writer.close_shared_writers()
+    assert len(beacon_segments.list_segments(owned)) == 6
+    assert len(beacon_segments._COMPRESSORS) <= 1  # finished gzip threads are pruned
+    beacon_segments.wait_for_compression()
+
+
+def test_env_index_only_for_single_writer(tmp_path, monkeypatch, capsys):
+    from core import beacon_index
+
+    monkeypatch.setattr(beacon_writer, "INDEX_EVERY", 2)
+    shared = tmp_path / "shared.jsonl"
+    for i in range(6):
+        beacon_writer.append_beacon({"ts": i, "stream_id": "s"}, str(shared))
+    beacon_writer.close_shared_writers()
+    assert not beacon_index.index_path(shared).exists()
+    assert "NOISE_SEEK_INDEX_EVERY ignored" in capsys.readouterr().out
+
+    monkeypatch.setattr(beacon_writer, "SINGLE_WRITER", True)
+    owned = tmp_path / "owned.jsonl"
+    for i in range(6):
+        beacon_writer.append_beacon({"ts": i, "stream_id": "s"}, str(owned))
+    beacon_writer.close_shared_writers()
+    assert len(beacon_index.load_blocks(owned)) == 3
+    assert len(list(beacon_index.query(owned, stream_id="s"))) == 6
@@ -0,0 +1,25 @@
+from benchmarks import run as bench
+
+
+def test_quick_run_produces_comparable_results(tmp_path):
+    current = bench.run(["seeking", "read_recent"], quick=True, workdir=str(tmp_path),
+                        log=lambda *_: None)
+    res = current["results"]
+    assert res["seeking.update_no_subscriptions_ops_per_s"]["value"] > 0
+    assert res["read_recent.1mb_ms"]["better"] == "lower"
+    rows = bench.compare(current, current)
+    assert rows and not any(r["regression"] for r in rows)
+
+
+def test_compare_flags_regressions_by_direction():
+    base = {"results": {"a": {"value": 100.0, "unit": "ops/s", "better": "higher"},
+                        "b": {"value": 10.0, "unit": "ms", "better": "lower"},
+                        "c": {"value": 5.0, "unit": "ms", "better": "lower"}}}
+    cur = {"results": {"a": {"value": 80.0, "unit": "ops/s", "better": "higher"},
+                       "b": {"value": 9.0, "unit": "ms", "better": "lower"},
+                       "c": {"value": 6.0, "unit": "ms", "better": "lower"},
+                       "new": {"value": 1.0, "unit": "ms", "better": "lower"}}}
+    rows = {r["name"]: r for r in bench.compare(cur, base, threshold=0.15)}
+    assert set(rows) == {"a", "b", "c"}
+    assert rows["a"]["regression"] and not rows["b"]["regression"]
+    assert rows["c"]["regression"] and rows["c"]["change"] == -0.2
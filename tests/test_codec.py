@@ -0,0 +1,58 @@
+import math
+import random
+
+from core import codec
+from scripts.bench_codec import sample_beacons
+
+
+def test_backends_produce_identical_compact_output():
+    rng = random.Random(3)
+    floats = [rng.uniform(-1, 1) * 10 ** rng.randint(-30, 30) for _ in range(3000)]
+    floats += [round(rng.random() / 10 ** rng.randint(0, 6), 5) for _ in range(3000)]
+    floats += [0.0, -0.0, 1e-5, 1e-4, 1e15, 1e16, 5e-324, math.nan, math.inf, -math.inf]
+    samples = sample_beacons(200) + [
+        {"txt": "ääkköset ✓ \u2028 \x7f \x00\x1f \"q\" \\ /", "n": -3, "f": 1e-7},
+        {"nested": {"a": [1, 2.5, None, True, False, {}], "b": []}},
+        {"floats": floats, "e+1 in a string": "1e+16"},
+    ]
+    for obj in samples:
+        out = codec.dumpb(obj)
+        assert out == codec._std_dumpb(obj)
+        assert codec.dumps(obj) == out.decode("utf-8")
+        assert codec.dumps_pretty(obj) == codec._std_dumps_pretty(obj)
+    # objects orjson refuses still encode (via stdlib)
+    assert codec.dumps({1: 2**70}) == '{"1":1180591620717411303424}'
+
+
+def test_loads_roundtrip_and_errors():
+    for b in sample_beacons(20):
+        assert codec.loads(codec.dumpb(b)) == b
+        assert codec.loads(codec.dumps(b)) == b
+    try:
+        codec.loads(b'{"partial":')
+    except ValueError:
+        pass
+    else:  # pragma: no cover
+        raise AssertionError("malformed input accepted")
+
+
+def test_python_fallback_matches_stdlib_layout():
+    import json
+
+    samples = sample_beacons(50) + [
+        {"nested": {"a": [1, 2.5, None, True, False, {}, []], "b": [[], {"x": "ä\n"}]}},
+        {1: "int key", 2.5: "float key", True: "bool", None: "none", "s": (1, 2)},
+        [], {}, "plain", 7, [[[]]],
+    ]
+    for obj in samples:
+        assert codec._py_compact(obj) == json.dumps(obj, separators=(",", ":"),
+                                                   ensure_ascii=False)
+        assert codec._py_pretty(obj) == json.dumps(obj, indent=2, ensure_ascii=False)
+    assert codec._py_compact([1e16, -1e-7, math.nan]) == "[1e16,-1e-7,null]"
+    for bad in ({(1, 2): 1}, {"x": object()}):
+        try:
+            codec._py_compact(bad)
+        except TypeError:
+            pass
+        else:  # pragma: no cover
+            raise AssertionError("unencodable object accepted")
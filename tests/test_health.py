@@ -2,6 +2,7 @@
 Tests for core.health module.
 """
 import json
+import os
 import subprocess
 import sys
 from pathlib import Path
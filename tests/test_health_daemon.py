@@ -0,0 +1,129 @@
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+
+from core import health_daemon
+from core.health_plugins import HealthContext, LiveBeaconTail
+
+
+def _line(i, stream="s1", state="seeking_low"):
+    return json.dumps({"stream_id": stream, "state": state, "i": i}) + "\n"
+
+
+def _full_tail(path):
+    return HealthContext(str(path)).beacon_tail().entries
+
+
+def test_live_tail_reads_only_appended_bytes(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    p.write_text("".join(_line(i) for i in range(600)) + '{"partial', encoding="utf-8")
+    live = LiveBeaconTail(p)
+    # The partial trailing line is not taken until it is complete.
+    assert live.update().entries == [(True, json.loads(_line(i))) for i in range(100, 600)]
+    assert live.reseeds == 1 and live.bytes == 0
+
+    with open(p, "a", encoding="utf-8") as f:
+        f.write('": 1}\n\n' + "not json\n" + _line(600))
+    before = live.lines
+    entries = live.update().entries
+    assert entries == _full_tail(p) and len(entries) == 500
+    assert live.lines - before == 3 and live.reseeds == 1
+    assert live.counters()["offset"] == os.path.getsize(p)
+    assert live.bytes == os.path.getsize(p) - sum(len(_line(i)) for i in range(600))
+
+    # Truncation / replacement re-seeds from the new file.
+    p.write_text(_line(0, state="attached"), encoding="utf-8")
+    assert live.update().entries == [(True, {"stream_id": "s1", "state": "attached", "i": 0})]
+    assert live.reseeds == 2
+    p.unlink()
+    assert live.update().entries == []
+
+
+def test_daemon_serves_cached_report(tmp_path, monkeypatch):
+    beacons = tmp_path / "beacons.jsonl"
+    beacons.write_text(_line(0, stream="other"), encoding="utf-8")
+    monkeypatch.setenv("TARGET_STREAM_ID", "target")
+    daemon = health_daemon.HealthDaemon(60, beacon_path=str(beacons),
+                                        subscriptions_path=str(tmp_path / "subs.json"))
+    first = daemon.refresh()
+    status = {i["check"]: i["status"] for i in first["items"]}
+    assert status["target_stream"] == "WARN" and status["beacons_parse"] == "OK"
+
+    server = health_daemon.make_server(daemon, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with open(beacons, "a", encoding="utf-8") as f:
+            f.write(_line(1, stream="target"))
+        daemon.refresh()
+        with urllib.request.urlopen(url + "/health", timeout=5) as resp:
+            body = json.loads(resp.read())
+        with urllib.request.urlopen(url + "/health.txt", timeout=5) as resp:
+            text = resp.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    status = {i["check"]: i["status"] for i in body["items"]}
+    assert status["target_stream"] == "OK"
+    assert body["runs"] == 2 and body["tail"]["lines"] == 2 and body["tail"]["reseeds"] == 1
+    assert "target_stream" in text
+
+
+def test_daemon_unix_socket(tmp_path):
+    sock_path = str(tmp_path / "health.sock")
+    daemon = health_daemon.HealthDaemon(60, beacon_path=str(tmp_path / "beacons.jsonl"),
+                                        subscriptions_path=str(tmp_path / "subs.json"))
+    daemon.refresh()
+    server = health_daemon.make_server(daemon, unix_path=sock_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(5)
+            s.connect(sock_path)
+            s.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+            raw = b""
+            while chunk := s.recv(65536):
+                raw += chunk
+    finally:
+        server.shutdown()
+        server.server_close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    assert head.split()[1] in (b"200", b"503")
+    assert json.loads(body)["runs"] == 1
+
+
+def test_daemon_does_not_restart_a_hung_check(tmp_path):
+    from core import health_plugins
+
+    release = threading.Event()
+
+    def hang(report):
+        release.wait(10)
+        report.add("hang", "OK", "returned")
+
+    spec = health_plugins.CheckSpec(10, "hang", hang, (), 0.05, False)
+    daemon = health_daemon.HealthDaemon(60, beacon_path=str(tmp_path / "b.jsonl"), specs=[spec])
+    before = threading.active_count()
+    details = [daemon.refresh()["items"][0]["detail"] for _ in range(20)]
+    assert threading.active_count() - before <= 1
+    assert details[0] == "timeout after 0.05s"
+    assert all(d.startswith("still running after") for d in details[1:])
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while not daemon._inflight["hang"].done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert daemon.refresh()["items"][0]["status"] == "OK" and not daemon._inflight
+
+
+def test_daemon_passes_subscriptions_path_to_checks(tmp_path, monkeypatch):
+    monkeypatch.delenv("NOISE_SEEK_SUBSCRIPTIONS_PATH", raising=False)
+    subs = tmp_path / "subs.json"
+    subs.write_text(json.dumps({"s1": ["L1"], "s2": ["L2"]}), encoding="utf-8")
+    daemon = health_daemon.HealthDaemon(60, beacon_path=str(tmp_path / "b.jsonl"),
+                                        subscriptions_path=str(subs))
+    item = next(i for i in daemon.refresh()["items"] if i["check"] == "subscriptions_file")
+    assert (item["status"], item["detail"]) == ("OK", "streams=2")
@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core import health_plugins
+from core.health_plugins import LazyCheck, run_all, select
+
+STATIC_PLUGIN = '''
+from . import register
+
+@register("alpha", order=5, needs=["beta"], timeout_s=2.5)
+def alpha(report, ctx):
+    pass
+
+@register("beta")
+def beta(report):
+    pass
+'''
+
+DYNAMIC_PLUGIN = '''
+from . import register
+
+for _name in ("x", "y"):
+    register(_name)(lambda report: None)
+'''
+
+
+def _importtime(*args):
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args],
+                          capture_output=True, text=True, cwd=os.getcwd())
+    assert proc.returncode == 0, proc.stderr
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return proc.stdout, modules
+
+
+def test_manifest_scan(tmp_path):
+    (tmp_path / "static.py").write_text(STATIC_PLUGIN, encoding="utf-8")
+    (tmp_path / "dynamic.py").write_text(DYNAMIC_PLUGIN, encoding="utf-8")
+    (tmp_path / "_private.py").write_text(STATIC_PLUGIN, encoding="utf-8")
+    m = health_plugins.build_manifest(tmp_path, "pkg")
+    assert [f[0] for f in m["files"]] == ["dynamic.py", "static.py"]
+    assert m["eager"] == ["pkg.dynamic"]
+    assert m["checks"] == [
+        {"name": "alpha", "order": 5, "needs": ["beta"], "timeout_s": 2.5, "wants_ctx": True,
+         "module": "pkg.static", "attr": "alpha"},
+        {"name": "beta", "order": 100, "needs": [], "timeout_s": None, "wants_ctx": False,
+         "module": "pkg.static", "attr": "beta"},
+    ]
+
+
+def test_manifest_cache(tmp_path, monkeypatch):
+    cache = tmp_path / "manifest.json"
+    monkeypatch.setenv("HEALTH_PLUGIN_MANIFEST", str(cache))
+    first = health_plugins.load_manifest()
+    assert cache.exists() and first == health_plugins.build_manifest()
+
+    def boom(*a, **k):
+        raise AssertionError("cache not used")
+
+    monkeypatch.setattr(health_plugins, "build_manifest", boom)
+    assert health_plugins.load_manifest() == first
+    stale = dict(first, files=first["files"][:-1])
+    cache.write_text(json.dumps(stale), encoding="utf-8")
+    with pytest.raises(AssertionError, match="cache not used"):
+        health_plugins.load_manifest()
+
+
+def test_registry_matches_plugins_and_is_lazy():
+    for spec in health_plugins.REGISTRY:
+        if isinstance(spec.fn, LazyCheck):
+            real = getattr(__import__(spec.fn.module, fromlist=["x"]), spec.fn.attr)
+            assert spec.wants_ctx == health_plugins._wants_ctx(real)
+    names = [s.name for s in health_plugins.REGISTRY]
+    assert len(names) == len(set(names))  # importing a plugin does not re-register it
+    code = ("import sys; from core import health_plugins as hp; "
+            "print(sorted(m for m in sys.modules if m.startswith('core.health_plugins.'))); "
+            "hp.run_all(specs=hp.select(['python_version'])); "
+            "print(sorted(m for m in sys.modules if m.startswith('core.health_plugins.')))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         check=True).stdout.splitlines()
+    assert out == ["[]", "['core.health_plugins.python_version']"]
+
+
+def test_select_patterns():
+    assert [s.name for s in select(["beacon*"], ["beacon_shape"])] == ["beacons_file",
+                                                                      "beacons_parse"]
+    assert {s.name for s in select(skip=["*"])} == set()
+    with pytest.raises(ValueError, match="nope"):
+        select(["nope"])
+    report = run_all(specs=select(["env:*"]))
+    assert [i.check for i in report.items] == ["env:variables"]
+
+
+def test_startup_importtime():
+    out, modules = _importtime("-m", "core.health", "--list-checks")
+    assert "beacons_parse" in out and "core.health_plugins.beacons:parse_check" in out
+    loaded = set(modules)
+    assert not {m for m in loaded if m.startswith("core.health_plugins.")}
+    assert not loaded & {"core.beacon_writer", "asyncio", "concurrent.futures"}
+    # Import cost of core.health itself (cumulative microseconds, cold-ish process).
+    _, modules = _importtime("-c", "import core.health")
+    assert "core.beacon_writer" not in modules
+    print(f"core.health import: {modules['core.health'] / 1000:.1f} ms")
+    assert modules["core.health"] < 1_000_000
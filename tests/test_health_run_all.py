@@ -0,0 +1,93 @@
+import threading
+import time
+
+from core import health_plugins
+from core.health_plugins import CheckSpec, HealthContext, run_all
+
+
+def _spec(order, name, fn, needs=(), timeout_s=None):
+    return CheckSpec(order, name, fn, tuple(needs), timeout_s, health_plugins._wants_ctx(fn))
+
+
+def test_parallel_order_deps_and_timeout():
+    events = []
+    gate = threading.Event()
+
+    def slow(report):
+        time.sleep(0.05)
+        events.append("slow")
+        report.add("slow", "OK", "done")
+
+    def after_slow(report):
+        events.append("after_slow")
+
+    def hang(report):
+        gate.wait(5)
+
+    def quick(report):
+        events.append("quick")
+        report.add("quick", "WARN", "meh")
+
+    specs = [
+        _spec(10, "slow", slow),
+        _spec(20, "after_slow", after_slow, needs=["slow"]),
+        _spec(30, "hang", hang, timeout_s=0.1),
+        _spec(40, "quick", quick),
+    ]
+    try:
+        report = run_all(specs=specs, max_workers=4)
+    finally:
+        gate.set()
+    assert [i.check for i in report.items] == ["slow", "after_slow", "hang", "quick"]
+    assert events.index("slow") < events.index("after_slow")
+    assert events.index("quick") < events.index("slow")  # ran concurrently
+    hang_item = report.items[2]
+    assert hang_item.status == "FAIL" and hang_item.elapsed_ms == 100.0
+    assert all(i.elapsed_ms is not None and i.elapsed_ms >= 0 for i in report.items)
+
+
+def test_dependency_cycle_reported():
+    specs = [
+        _spec(10, "a", lambda r: None, needs=["b"]),
+        _spec(20, "b", lambda r: None, needs=["a"]),
+        _spec(30, "c", lambda r: None, needs=["missing"]),
+    ]
+    report = run_all(specs=specs, parallel=False)
+    assert [(i.check, i.status) for i in report.items] == [("a", "FAIL"), ("b", "FAIL"), ("c", "OK")]
+
+
+def test_beacon_checks_share_one_tail_read(tmp_path, monkeypatch):
+    path = tmp_path / "beacons.jsonl"
+    path.write_text(
+        "".join(f'{{"stream_id":"x","state":"seeking_low","seq":{i}}}\n' for i in range(600))
+        + "garbage\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("TARGET_STREAM_ID", "x")
+    ctx = HealthContext(beacon_path=str(path), subscriptions_path=str(tmp_path / "s.json"))
+    loads = []
+    orig = ctx._load_tail
+    monkeypatch.setattr(ctx, "_load_tail", lambda: loads.append(1) or orig())
+    report = run_all(ctx=ctx)
+    assert len(loads) == 1
+    by_name = {i.check: i for i in report.items}
+    assert by_name["beacons_parse"].detail.startswith("good=499 bad=1")
+    assert by_name["beacon_shape"].detail == "49/50 (98%)"
+    assert by_name["target_stream"].status == "OK"
+
+
+def test_timed_out_check_does_not_delay_exit():
+    import subprocess
+    import sys
+
+    code = (
+        "import time\n"
+        "from core import health_plugins as hp\n"
+        "spec = hp.CheckSpec(10, 'hang', lambda r: time.sleep(30), (), 0.2, False)\n"
+        "print(hp.run_all(specs=[spec]).items[0].detail)\n"
+    )
+    t0 = time.monotonic()
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=25)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "timeout after 0.2s"
+    assert time.monotonic() - t0 < 10
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+
+from core import beacon_writer, subscriptions
+from core.seeking import _iso_ts
+from scripts.listener_async import ListenerEngine, percentiles
+
+
+def test_engine_fans_out_and_batches_commits(tmp_path):
+    beacons = tmp_path / "beacons.jsonl"
+    subs = tmp_path / "subscriptions.json"
+    beacons.write_text("", encoding="utf-8")
+    subs.write_text(json.dumps({"s0": ["old-listener"]}), encoding="utf-8")
+
+    async def scenario():
+        engine = ListenerEngine(str(beacons), str(subs), n_listeners=300,
+                                target_stream_id=None, max_per_stream=2,
+                                streams_each=1, commit_interval_s=0.02, poll_interval_s=0.01)
+        run = asyncio.create_task(engine.run(duration_s=10))
+        await asyncio.sleep(0.05)
+        with beacon_writer.BeaconWriter(beacons, max_buffer_bytes=0) as w:
+            for i in range(6):
+                w.write({"ts": _iso_ts(time.time()), "stream_id": f"s{i}", "state": "seeking_low"})
+            w.write({"ts": _iso_ts(time.time()), "stream_id": "s9", "state": "attached"})
+        deadline = time.monotonic() + 5
+        while engine.commits == 0 or engine.pending or sum(map(len, engine.owned.values())) < 11:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.01)
+        engine.stop()
+        return await run
+
+    stats = asyncio.run(scenario())
+    data = json.loads(subs.read_text(encoding="utf-8"))
+    assert len(data["s0"]) == 2 and data["s0"][0] == "old-listener"
+    assert all(len(data[f"s{i}"]) == 2 for i in range(1, 6))
+    assert "s9" not in data
+    assert stats["subscriptions"] == 11 and stats["beacons_seen"] == 6
+    assert stats["commits"] < 11
+    assert stats["attach_latency_ms"]["n"] == 11
+
+
+def test_engine_seeds_view_from_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscriptions, "JOURNAL", True)
+    beacons = tmp_path / "beacons.jsonl"
+    subs = str(tmp_path / "subscriptions.json")
+    beacons.write_text("", encoding="utf-8")
+    store = subscriptions.SubscriptionStore(subs)
+    store.subscribe("s0", "other-process")
+    store.commit()
+
+    async def scenario():
+        engine = ListenerEngine(str(beacons), subs, n_listeners=3, target_stream_id=None,
+                                max_per_stream=1, streams_each=1,
+                                commit_interval_s=0.01, poll_interval_s=0.01)
+        run = asyncio.create_task(engine.run(duration_s=10))
+        await asyncio.sleep(0.05)
+        assert engine.view["s0"] == ["other-process"]
+        with beacon_writer.BeaconWriter(beacons, max_buffer_bytes=0) as w:
+            for i in range(2):
+                w.write({"ts": _iso_ts(time.time()), "stream_id": f"s{i}", "state": "seeking_low"})
+        deadline = time.monotonic() + 5
+        while engine.commits == 0 or engine.pending:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.01)
+        engine.stop()
+        return await run
+
+    stats = asyncio.run(scenario())
+    assert not (tmp_path / "subscriptions.json").exists()  # everything went to the journal
+    data = subscriptions.materialize(subs)
+    assert data["s0"] == ["other-process"] and len(data["s1"]) == 1
+    assert stats["subscriptions"] == 1
+
+
+def test_engine_rolls_back_claims_lost_to_another_process(tmp_path):
+    beacons = tmp_path / "beacons.jsonl"
+    subs = str(tmp_path / "subscriptions.json")
+    beacons.write_text("", encoding="utf-8")
+
+    async def scenario():
+        engine = ListenerEngine(str(beacons), subs, n_listeners=3, target_stream_id=None,
+                                max_per_stream=1, streams_each=1,
+                                commit_interval_s=0.01, poll_interval_s=0.01)
+        run = asyncio.create_task(engine.run(duration_s=10))
+        await asyncio.sleep(0.05)
+        other = subscriptions.SubscriptionStore(subs)  # fills s0 behind the engine's back
+        other.subscribe("s0", "other-process")
+        other.commit()
+        with beacon_writer.BeaconWriter(beacons, max_buffer_bytes=0) as w:
+            for i in range(2):
+                w.write({"ts": _iso_ts(time.time()), "stream_id": f"s{i}", "state": "seeking_low"})
+        deadline = time.monotonic() + 5
+        while engine.rejected + engine.commits < 2 or engine.pending:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.01)
+        engine.stop()
+        return engine, await run
+
+    engine, stats = asyncio.run(scenario())
+    data = subscriptions.materialize(subs)
+    assert data["s0"] == ["other-process"] and len(data["s1"]) == 1
+    assert engine.view["s0"] == ["other-process"]
+    assert (stats["subscriptions"], stats["rejected"]) == (1, 1)
+    assert stats["attach_latency_ms"]["n"] == 1
+
+
+def test_percentiles():
+    p = percentiles([float(i) for i in range(1, 101)])
+    assert p["p50"] == 51.0 and p["p99"] == 99.0 and p["max"] == 100.0 and p["n"] == 100
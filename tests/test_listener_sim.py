@@ -0,0 +1,30 @@
+from core import beacon_writer
+from core.subscriptions import SubscriptionStore
+from scripts import listener_sim
+
+
+def test_seed_window_stops_where_follower_starts(tmp_path):
+    p = tmp_path / "beacons.jsonl"
+    p.write_text("".join(f'{{"seq":{i}}}\n' for i in range(5)), encoding="utf-8")
+    with beacon_writer.follow(p, use_inotify=False) as follower:
+        with open(p, "a", encoding="utf-8") as f:
+            f.write('{"seq":5}\n')  # appended between follow() and seeding
+        window = listener_sim.seed_window(follower, str(p), 3)
+        window.extend(follower.poll())
+    assert [b["seq"] for b in window] == [3, 4, 5]
+    with beacon_writer.follow(tmp_path / "none.jsonl", use_inotify=False) as follower:
+        assert list(listener_sim.seed_window(follower, str(tmp_path / "none.jsonl"), 3)) == []
+
+
+def test_load_subscriptions_sees_journal_claims(tmp_path):
+    path = str(tmp_path / "subscriptions.json")
+    store = SubscriptionStore(path, journal=True)
+    store.subscribe("s1", "a")
+    store.commit()
+    assert listener_sim.load_subscriptions(path) == {"s1": ["a"]}
+    store.subscribe("s2", "b")
+    store.commit()
+    subs = listener_sim.load_subscriptions(path)
+    assert subs == {"s1": ["a"], "s2": ["b"]}
+    beacons = [{"stream_id": "s2", "state": "seeking_low"}, {"stream_id": "s1", "state": "seeking_low"}]
+    assert listener_sim.pick_beacon(beacons, subs) is None
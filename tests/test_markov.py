@@ -0,0 +1,40 @@
+import random
+from collections import Counter
+
+import pytest
+
+from core import markov
+
+CORPUS = "a b a c a b d b a c c a b".split()
+
+
+def test_alias_tables_encode_successor_weights():
+    m = markov.compile_tokens(CORPUS, order=1)
+    assert m.vocab == ["a", "b", "c", "d"]
+    assert m.successors(["a"]) == pytest.approx({"b": 0.6, "c": 0.4})
+    assert m.successors(["b"]) == pytest.approx({"a": 2 / 3, "d": 1 / 3})
+    assert m.successors(["zzz"]) == {}
+
+
+def test_higher_order_sequences_only_use_corpus_ngrams():
+    m = markov.compile_tokens(CORPUS, order=2)
+    grams = {tuple(CORPUS[i:i + 3]) for i in range(len(CORPUS) - 2)}
+    rng = random.Random(4)
+    seen = Counter()
+    for _ in range(500):
+        seq = m.sequence(3, rng)
+        assert len(seq) == 3
+        seen[tuple(seq)] += 1
+    assert set(seen) <= grams
+
+
+def test_saved_model_is_memory_mapped_and_identical(tmp_path):
+    m = markov.compile_tokens(CORPUS * 3, order=2)
+    path = tmp_path / "model.nsmk"
+    m.save(path)
+    with markov.load(path) as loaded:
+        assert loaded.order == 2 and loaded.vocab == m.vocab
+        assert loaded.sequence(50, random.Random(9)) == m.sequence(50, random.Random(9))
+    path.write_bytes(b"nope" + path.read_bytes()[4:])
+    with pytest.raises(ValueError):
+        markov.load(path)
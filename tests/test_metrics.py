@@ -0,0 +1,103 @@
+import urllib.request
+
+import pytest
+
+from core import beacon_writer, health_plugins, metrics
+from core.health_plugins import CheckSpec, run_all
+from core.seeking import SeekingController
+from tests.test_seeking import _cfg
+
+
+@pytest.fixture
+def enabled():
+    saved = metrics.ENABLED
+    metrics.enable()
+    try:
+        yield metrics.REGISTRY
+    finally:
+        metrics.enable(saved)
+
+
+def test_histogram_buckets_and_percentiles():
+    for us in (0, 1, 63, 64, 65, 1000, 123_456, 10**9):
+        idx = metrics._bucket(us)
+        assert metrics._bucket_high(idx) >= us
+        assert metrics._bucket_high(idx) - us <= us / 32 + 1
+    h = metrics.Histogram("t_seconds")
+    for us in range(1, 1001):
+        h.observe_us(us)
+    assert h.count() == 1000
+    assert h.percentile(50) == pytest.approx(500e-6, rel=0.04)
+    assert h.percentile(99) == pytest.approx(990e-6, rel=0.04)
+    assert h.percentile(100) == pytest.approx(1000e-6)
+    assert h.percentile(50, other="x") is None
+
+
+def test_prometheus_text():
+    reg = metrics.Registry()
+    reg.counter("c_total", "a counter").inc(2, kind='q"x')
+    reg.gauge("g").set(1.5)
+    h = reg.histogram("h_seconds")
+    h.observe(0.003)
+    h.observe(7.0)
+    text = reg.render_prometheus()
+    assert "# HELP c_total a counter\n# TYPE c_total counter\n" in text
+    assert 'c_total{kind="q\\"x"} 2\n' in text
+    assert "g 1.5\n" in text
+    assert 'h_seconds_bucket{le="0.002"} 0\n' in text
+    assert 'h_seconds_bucket{le="0.005"} 1\n' in text
+    assert 'h_seconds_bucket{le="10"} 2\n' in text
+    assert 'h_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "h_seconds_count 2\n" in text
+    with pytest.raises(TypeError):
+        reg.gauge("c_total")
+
+
+def test_disabled_records_nothing(tmp_path):
+    assert not metrics.ENABLED
+    hist = metrics.histogram("beacon_append_seconds")
+    before = hist.count()
+    beacon_writer.append_beacon({"stream_id": "s", "state": "seeking_low"}, str(tmp_path / "b.jsonl"))
+    beacon_writer.close_shared_writers()
+    assert hist.count() == before
+
+
+def test_hot_paths_recorded(tmp_path, enabled):
+    path = str(tmp_path / "beacons.jsonl")
+    appended = enabled.counter("beacon_append_bytes_total").value()
+    for i in range(5):
+        beacon_writer.append_beacon({"stream_id": "s", "state": "seeking_low", "n": i}, path)
+    beacon_writer.close_shared_writers()
+    size = (tmp_path / "beacons.jsonl").stat().st_size
+    assert enabled.counter("beacon_append_bytes_total").value() - appended == size
+    returned = enabled.counter("beacon_read_recent_lines_returned_total").value()
+    assert len(beacon_writer.read_recent(path, 3)) == 3
+    assert enabled.counter("beacon_read_recent_lines_returned_total").value() - returned == 3
+
+    transitions = enabled.counter("seeking_transitions_total")
+    low = transitions.value(from_state="idle", to_state="seeking_low")
+    ctl = SeekingController(_cfg(tmp_path))
+    ctl.update_and_maybe_beacon(now=1_000_000.0)
+    ctl.record_tick()
+    assert ctl.update_and_maybe_beacon(now=1_000_012.0) is not None
+    assert transitions.value(from_state="idle", to_state="seeking_low") == low + 1
+    assert enabled.counter("seeking_beacons_total").value(state="seeking_low") >= 1
+
+    def check(report):
+        report.add("m_check", "WARN", "meh")
+
+    run_all(specs=[CheckSpec(10, "m_check", check, (), None, health_plugins._wants_ctx(check))])
+    assert enabled.counter("health_check_status_total").value(check="m_check", status="WARN") >= 1
+    assert enabled.histogram("health_check_seconds").count(check="m_check") >= 1
+
+
+def test_http_endpoint(enabled):
+    enabled.counter("http_probe_total").inc()
+    server = metrics.start_http_server(0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            body = resp.read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert "http_probe_total 1" in body
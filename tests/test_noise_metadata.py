@@ -0,0 +1,41 @@
+import json
+import random
+
+from scripts.workers import noise_metadata as nm
+
+
+def _texts(monkeypatch):
+    random.seed(3)
+    out = ["", "a", "zz zz", "ünï cödé ünï", "flux  flux\tflux"]
+    for mode in ("words", "bytes", "markov"):
+        monkeypatch.setattr(nm, "MODE", mode)
+        out += nm.gen_texts(300) + [nm.gen_text() for _ in range(100)]
+    return out
+
+
+def test_batch_entropy_matches_per_event(monkeypatch):
+    texts = _texts(monkeypatch)
+    assert nm.char_metrics_batch(texts) == [nm.entropy_char_metrics(t) for t in texts]
+    assert nm.token_metrics_batch(texts) == [nm.entropy_token_metrics(t) for t in texts]
+
+
+def test_batch_entropy_matches_without_numpy(monkeypatch):
+    texts = _texts(monkeypatch)
+    expected = [nm.entropy_char_metrics(t) for t in texts]
+    monkeypatch.setattr(nm, "np", None)
+    assert nm.char_metrics_batch(texts) == expected
+
+
+def test_run_batch_writes_complete_records(monkeypatch, tmp_path):
+    monkeypatch.setattr(nm, "MODE", "words")
+    path = tmp_path / "out.jsonl"
+    with open(path, "wb") as f:
+        events, _ = nm.run_batch(f, block=64, total=150)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert events == 150 and len(lines) == 150
+    recs = [json.loads(line) for line in lines]
+    assert len({r["seq"] for r in recs}) == 150
+    for r in recs:
+        assert (r["char_len"], r["char_entropy_avg_bits"], r["char_entropy_total_bits"]) \
+            == nm.entropy_char_metrics(r["text"])
+        assert r["token_count"] == len(r["text"].split())
@@ -0,0 +1,65 @@
+import io
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import Counter
+
+import pytest
+
+from scripts.workers import noise_metadata as nm
+from scripts.workers import noise_pool
+from scripts.workers.noise_pool import NoisePool, worker_seed
+
+
+def _run(**kw):
+    out = io.BytesIO()
+    stats = NoisePool(session="fixedsession", **kw).run(out)
+    return [json.loads(line) for line in out.getvalue().splitlines()], stats
+
+
+def test_ordered_merge_is_sorted_and_complete():
+    recs, stats = _run(workers=3, total=500, block=40, ordered=True, queue_blocks=1)
+    assert len(recs) == stats["events"] == 500
+    assert Counter(r["worker"] for r in recs) == {0: 167, 1: 167, 2: 166}
+    seqs = [r["seq"] for r in recs]
+    assert seqs == sorted(seqs)
+    assert [w["events"] for w in stats["workers"]] == [167, 167, 166]
+
+
+def test_workers_are_seeded_from_session_and_index():
+    assert worker_seed("s", 0) == worker_seed("s", 0) != worker_seed("s", 1)
+    a, _ = _run(workers=2, total=60, block=30)
+    b, _ = _run(workers=2, total=60, block=30)
+    texts = lambda recs, w: [r["text"] for r in recs if r["worker"] == w]  # noqa: E731
+    assert texts(a, 0) == texts(b, 0) and texts(a, 1) == texts(b, 1)
+    assert texts(a, 0) != texts(a, 1)
+    assert {r["session"] for r in a} == {"fixedsession"}
+
+
+@pytest.mark.skipif(mp.get_start_method() != "fork", reason="patches the worker via fork")
+@pytest.mark.parametrize("ordered", [False, True])
+def test_failed_or_dead_worker_fails_the_run(monkeypatch, ordered):
+    monkeypatch.setattr(noise_pool, "POLL_S", 0.05)
+    real = nm.iter_blocks
+
+    def broken(block, total):
+        if nm.SESSION.endswith("raise"):
+            raise ValueError("bad model path")
+        yield from real(block, total)
+        os._exit(3)  # dies without its final message
+
+    monkeypatch.setattr(nm, "iter_blocks", broken)
+    for session, msg in (("s-raise", "failed: ValueError: bad model path"),
+                         ("s-exit", "exited with code 3")):
+        t0 = time.monotonic()
+        with pytest.raises(RuntimeError, match=msg):
+            NoisePool(2, total=40, block=10, ordered=ordered, session=session).run(io.BytesIO())
+        assert time.monotonic() - t0 < 5
+
+
+def test_fewer_events_than_workers():
+    recs, stats = _run(workers=3, total=2, block=10)
+    assert len(recs) == stats["events"] == 2 and len(stats["workers"]) == 2
+    with pytest.raises(ValueError):
+        NoisePool(0)
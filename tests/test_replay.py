@@ -0,0 +1,68 @@
+import json
+
+from core import beacon_writer, replay
+from core.seeking import SeekingController
+from tests.test_seeking import _cfg
+
+
+def _live_run(tmp_path):
+    """Drive a real controller, recording events and persisting beacons."""
+    clock = replay.VirtualClock()
+    subs = replay.ReplaySubscriptions()
+    beacons = tmp_path / "beacons.jsonl"
+    ctl = SeekingController(_cfg(tmp_path, "s1"), clock=clock, subscriptions=subs)
+    with replay.EventRecorder(tmp_path / "events.jsonl") as rec, \
+            beacon_writer.BeaconWriter(beacons) as out:
+        for step in range(120):
+            clock.now = 1_724_871_000.0 + step
+            if step % 3 == 0:
+                ctl.record_tick(2)
+                rec.tick(clock.now, "s1", 2)
+            if step == 70:
+                ctl.record_delivery(1)
+                rec.delivery(clock.now, "s1", 1)
+            if step == 100:
+                subs.subscribe("s1", "L1")
+                rec.record(clock.now, "sub", "s1", listener_id="L1")
+            b = ctl.update_and_maybe_beacon(spore=f"sp{step}")
+            rec.update(clock.now, "s1", spore=f"sp{step}")
+            if b:
+                out.write(b)
+    return beacons
+
+
+def test_replay_reproduces_recorded_beacons(tmp_path):
+    beacons = _live_run(tmp_path)
+    recorded = beacon_writer.read_recent(beacons, max_lines=1000)
+    assert len(recorded) > 5
+    result = replay.Replayer(_cfg(tmp_path)).run(replay.read_events(tmp_path / "events.jsonl"))
+    assert result.events == 120 + 40 + 2
+    assert result.states["s1"].attached
+    diff = replay.diff_beacons(result.beacons, recorded)
+    assert diff.ok and diff.matched == len(recorded)
+
+
+def test_diff_reports_mismatch_missing_and_extra(tmp_path):
+    beacons = _live_run(tmp_path)
+    recorded = beacon_writer.read_recent(beacons, max_lines=1000)
+    result = replay.Replayer(_cfg(tmp_path)).run(replay.read_events(tmp_path / "events.jsonl"))
+    tampered = [dict(b) for b in recorded[1:]]
+    tampered[0]["loneliness_ratio"] = 0.5
+    tampered.append({**recorded[-1], "beacon_n": 999})
+    diff = replay.diff_beacons(result.beacons, tampered)
+    assert not diff.ok
+    assert [key for key, _ in diff.mismatched] == [("s1", 2)]
+    assert len(diff.missing) == 1 and diff.extra == [result.beacons[0]]
+
+
+def test_journal_events_merge_by_time(tmp_path):
+    journal = tmp_path / "subscriptions.journal.jsonl"
+    journal.write_text(
+        json.dumps({"seq": 1, "op": "sub", "stream_id": "s1", "listener_id": "L1", "ts": 15.0})
+        + "\n", encoding="utf-8")
+    log = [{"t": float(t), "ev": "update", "stream_id": "s1"} for t in range(1, 30)]
+    events = list(replay.merge_events(log, replay.events_from_journal(journal)))
+    assert [e["ev"] for e in events].index("sub") == 15
+    r = replay.Replayer(_cfg(tmp_path))
+    r.run(events)
+    assert r.controllers["s1"].is_attached()
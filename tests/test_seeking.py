@@ -0,0 +1,205 @@
+import json
+
+from core import subscriptions
+from core.seeking import SeekingConfig, SeekingController, SeekingState
+
+
+def _cfg(tmp_path, stream_id="s1"):
+    return SeekingConfig(
+        lonely_after_s=12,
+        escalate_after_s=30,
+        beacon_interval_low_s=10,
+        beacon_interval_escalate_s=5,
+        beacon_path=str(tmp_path / "beacons.jsonl"),
+        subscriptions_path=str(tmp_path / "subscriptions.json"),
+        stream_id=stream_id,
+        mode="markov",
+        tempo_range_s=(1.0, 4.0),
+    )
+
+
+def test_seeking_lifecycle_and_attach(tmp_path):
+    ctl = SeekingController(_cfg(tmp_path))
+    t0 = 1_000_000.0
+    assert ctl.update_and_maybe_beacon(now=t0) is None
+    ctl.record_tick()
+    b = ctl.update_and_maybe_beacon(now=t0 + 12)
+    assert b["state"] == "seeking_low" and b["beacon_n"] == 1
+    assert ctl.update_and_maybe_beacon(now=t0 + 15) is None
+    b = ctl.update_and_maybe_beacon(now=t0 + 30)
+    assert b["state"] == "seeking_escalate"
+    (tmp_path / "subscriptions.json").write_text(json.dumps({"s1": ["L1"]}), encoding="utf-8")
+    assert ctl.update_and_maybe_beacon(now=t0 + 40) is None
+    assert ctl.data.state == SeekingState.ATTACHED
+
+
+def test_subscriptions_cache_reparses_only_on_change(tmp_path):
+    path = tmp_path / "subscriptions.json"
+    cache = subscriptions.SubscriptionsCache(str(path))
+    assert cache.snapshot() == {}
+    path.write_text(json.dumps({"a": ["L1"]}), encoding="utf-8")
+    snap = cache.snapshot()
+    v = cache.version
+    for _ in range(100):
+        assert cache.snapshot() is snap
+    assert cache.version == v
+    path.write_text(json.dumps({"a": ["L1"], "b": ["L2", "L3"]}), encoding="utf-8")
+    assert cache.listeners("b") == ["L2", "L3"]
+    assert cache.version == v + 1
+    # a broken write keeps the last good snapshot
+    path.write_text("{", encoding="utf-8")
+    assert cache.listeners("b") == ["L2", "L3"]
+
+
+def test_controllers_share_one_snapshot(tmp_path):
+    path = tmp_path / "subscriptions.json"
+    path.write_text(json.dumps({"s2": ["L9"]}), encoding="utf-8")
+    ctls = [SeekingController(_cfg(tmp_path, f"s{i}")) for i in range(4)]
+    for c in ctls:
+        c.update_and_maybe_beacon(now=1.0)
+    cache = subscriptions.shared_cache(str(path))
+    assert cache.version == 1
+    assert [c.is_attached() for c in ctls] == [False, False, True, False]
+
+
+def test_fleet_matches_controllers(tmp_path):
+    import random
+
+    from core.seeking_fleet import SeekingFleet
+
+    rng = random.Random(7)
+    ids = [f"s{i}" for i in range(25)]
+    cfg = _cfg(tmp_path, "unused")
+    ctls = {sid: SeekingController(_cfg(tmp_path, sid)) for sid in ids}
+    fleet = SeekingFleet(cfg, ids)
+    subs_path = tmp_path / "subscriptions.json"
+    subscribed = {}
+    now = 5_000.0
+    for step in range(400):
+        now += rng.choice((0.5, 1.0, 2.5, 4.0))
+        for sid in rng.sample(ids, 5):
+            n = rng.randint(1, 3)
+            ctls[sid].record_tick() if n == 1 else [ctls[sid].record_tick() for _ in range(n)]
+            fleet.record_tick(sid, n)
+        sid = rng.choice(ids)
+        ctls[sid].record_delivery(2)
+        fleet.record_delivery(sid, 2)
+        if step % 60 == 59:
+            subscribed[rng.choice(ids)] = ["L"]
+            subs_path.write_text(json.dumps(subscribed), encoding="utf-8")
+        expected = [b for b in (ctls[s].update_and_maybe_beacon(now=now) for s in ids) if b]
+        assert fleet.update(now=now) == expected
+    for sid in ids:
+        assert fleet.state_of(sid) == ctls[sid].data
+
+
+def test_controller_attaches_via_journal(tmp_path):
+    from core.subscriptions import SubscriptionStore
+
+    ctl = SeekingController(_cfg(tmp_path, "sj"))
+    ctl.record_tick()
+    assert ctl.update_and_maybe_beacon(now=100.0) is None
+    store = SubscriptionStore(tmp_path / "subscriptions.json", journal=True, compact_bytes=0)
+    store.subscribe("sj", "L1")
+    store.commit()
+    assert not (tmp_path / "subscriptions.json").exists()
+    ctl.update_and_maybe_beacon(now=101.0)
+    assert ctl.is_attached()
+
+
+def _utc_iso(t):
+    import datetime
+
+    dt = datetime.datetime.fromtimestamp(t, datetime.timezone.utc).replace(tzinfo=None)
+    return dt.isoformat(timespec="milliseconds") + "Z"
+
+
+def test_iso_ts_matches_datetime():
+    import random
+
+    from core.seeking import _iso_ts
+
+    rng = random.Random(5)
+    edges = (0.0, 0.0005, 0.0004999, 0.9995, 0.9999995, 0.9999994, 0.1234565, 0.5)
+    for _ in range(20_000):
+        t = rng.choice((rng.uniform(0, 4e9), rng.randrange(4_000_000_000) + rng.choice(edges),
+                        rng.uniform(-1e6, 0)))
+        assert _iso_ts(t) == _utc_iso(t), t
+
+
+def test_beacon_encoder_is_byte_identical(tmp_path):
+    import random
+
+    from core import beacon_index, codec
+    from core.beacon_writer import BeaconWriter
+    from core.seeking import BeaconEncoder, SeekingStateData, beacon_dict
+    from core.seeking_fleet import SeekingFleet
+
+    assert not hasattr(SeekingStateData(), "__dict__")
+    rng = random.Random(9)
+    cfg = _cfg(tmp_path)
+    cfg.mode, cfg.tempo_range_s = "mar%kov", (0.5, 1e-5)
+    enc = BeaconEncoder(cfg)
+    for _ in range(5_000):
+        p = rng.randrange(0, 10**6)
+        args = (rng.uniform(1.6e9, 1.9e9), rng.choice(("s1", "strøm-%d", 'q"t', "\x01")),
+                rng.choice(list(SeekingState)), p, rng.randrange(0, p + 1),
+                rng.choice((0.0, 1.0, rng.random(), 1e-5, 0.00012)), rng.randrange(1, 999),
+                rng.choice((None, "low", "ü")), rng.choice((None, [], ["a", "ß"])),
+                rng.choice((None, "", "78e51061", "%s")))
+        assert enc.encode(*args) == codec.dumpb(beacon_dict(args[0], cfg, *args[1:]))
+
+    cfg = _cfg(tmp_path)
+    ids = [f"s{i}" for i in range(10)]
+    as_dicts, as_lines = SeekingFleet(cfg, ids), SeekingFleet(cfg, ids)
+    hints = {"s3": {"entropy_profile": "mid", "tokens_hint": ["flux"], "spore": "ab"}}
+    dicts, lines = [], []
+    for step in range(40):
+        now = 9_000.0 + step * 1.7
+        for fleet in (as_dicts, as_lines):
+            fleet.record_tick(ids[step % 10], 3)
+        dicts += as_dicts.update(now, hints)
+        lines += as_lines.update(now, hints, lines=True)
+    assert len(dicts) > 20 and lines == [codec.dumpb(b) + b"\n" for b in dicts]
+
+    with BeaconWriter(tmp_path / "a.jsonl", index_every=4) as w:
+        w.write_many(dicts)
+    with BeaconWriter(tmp_path / "b.jsonl", index_every=4) as w:
+        for line in lines:
+            w.write_line(line)
+    assert (tmp_path / "a.jsonl").read_bytes() == (tmp_path / "b.jsonl").read_bytes()
+    assert beacon_index.load_blocks(tmp_path / "a.jsonl") == \
+        beacon_index.load_blocks(tmp_path / "b.jsonl")
+
+
+def test_beacon_encoder_allocations(tmp_path):
+    import sys
+    import tracemalloc
+
+    from core import codec
+    from core.seeking import BeaconEncoder, beacon_dict
+
+    cfg = _cfg(tmp_path)
+    enc = BeaconEncoder(cfg)
+    t0 = 1_724_871_000.0
+    args = ("s1", SeekingState.SEEKING_LOW, 1000, 250, 0.75, 7, "mid")
+    line = enc.encode(t0, *args, newline=True)  # warm the per-stream / per-second caches
+
+    def traced(build, n=500):
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            for i in range(n):
+                build(t0 + i * 0.001)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return current - base, peak - base
+
+    kept, peak = traced(lambda t: enc.encode(t, *args, newline=True))
+    # Per beacon only the output line (built in bytes %'s growable buffer) is
+    # allocated, and nothing is retained.
+    assert kept < 256 and peak < 2 * sys.getsizeof(line) + 128
+    _, dict_peak = traced(lambda t: codec.dumpb(beacon_dict(t, cfg, *args)) + b"\n")
+    assert dict_peak > 2 * peak
@@ -0,0 +1,77 @@
+import json
+import random
+
+from core.replay import VirtualClock
+from core.seeking import SeekingState
+from core.seeking_fleet import SeekingFleet
+from core.seeking_scheduler import BeaconScheduler
+from tests.test_seeking import _cfg
+
+
+def test_matches_polling_fleet(tmp_path):
+    rng = random.Random(11)
+    ids = [f"s{i}" for i in range(40)]
+    cfg = _cfg(tmp_path, "unused")
+    polled = SeekingFleet(cfg, ids)
+    sched = BeaconScheduler(SeekingFleet(cfg, ids))
+    subs_path = tmp_path / "subscriptions.json"
+    subscribed = {}
+    now = 7_000.0
+    emitted = 0
+    for step in range(600):
+        now += rng.choice((0.1, 0.3, 0.5, 1.0, 2.5))
+        for sid in rng.sample(ids, 4):
+            polled.record_tick(sid, 2)
+            sched.fleet.record_tick(sid, 2)
+        if step % 100 == 99:
+            subscribed[rng.choice(ids)] = ["L"]
+            subs_path.write_text(json.dumps(subscribed), encoding="utf-8")
+        if step == 300:
+            polled.add_stream("late")
+            sched.add_stream("late")
+        expected = polled.update(now=now)
+        assert sched.advance(now) == expected
+        emitted += len(expected)
+    assert emitted > 200
+    for sid in polled.stream_ids:
+        sched.wake(sid)
+    sched.advance(now)
+    for sid in polled.stream_ids:
+        assert sched.fleet.state_of(sid) == polled.state_of(sid)
+    assert sched.wakeups < 600 * len(ids) / 5  # vs one evaluation per stream per poll
+
+
+def test_virtual_clock_run_emits_at_due_times(tmp_path):
+    t0 = 1_000_000.0
+    clock = VirtualClock(t0)
+    sched = BeaconScheduler(SeekingFleet(_cfg(tmp_path), ["a"]), clock=clock)
+    out = []
+    sched.run(out.extend, until=t0 + 60, sleep=clock.sleep)
+    # t0 is hh:46:40; lonely at +12 (every 10 s), escalate at +30 (every 5 s).
+    assert [b["ts"][17:23] for b in out] == ["52.000", "02.000", "10.000", "15.000", "20.000",
+                                             "25.000", "30.000", "35.000", "40.000"]
+    assert [b["state"] for b in out][:3] == ["seeking_low", "seeking_low", "seeking_escalate"]
+    assert sched.wakeups == len(out) + 1 and sched.due_at("a") == t0 + 65
+    assert clock.now == t0 + 60
+
+    (tmp_path / "subscriptions.json").write_text('{"a": ["L"]}', encoding="utf-8")
+    sched.wake("a")
+    assert sched.advance() == [] and sched.due_at("a") is None and sched.next_due() is None
+    assert sched.fleet.state_of("a").state == SeekingState.ATTACHED
+
+
+def test_many_streams_only_due_ones_wake(tmp_path):
+    n = 5_000
+    t0 = 2_000_000.0
+    cfg = _cfg(tmp_path)
+    sched = BeaconScheduler(SeekingFleet(cfg, (f"s{i}" for i in range(n))))
+    sched.advance(t0)
+    now, beacons, empty = t0, 0, 0
+    while now < t0 + 45:
+        now += 0.25
+        got = len(sched.advance(now))
+        beacons += got
+        empty += got == 0
+    # Per stream: beacons at +12, +22, +30, +35, +40, +45; one initial wake each.
+    assert beacons == 6 * n and sched.wakeups == beacons + n
+    assert sched.passes == 7 and empty == 180 - 6
@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from core.subscriptions import SubscriptionStore, read_seq
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_batch_commit_coalesces_and_bumps_seq(tmp_path):
+    path = tmp_path / "subscriptions.json"
+    store = SubscriptionStore(path)
+    with store.batch():
+        store.subscribe("s1", "L1")
+        store.subscribe("s1", "L2")
+        store.subscribe("s2", "L3")
+        store.unsubscribe("s2", "L3")
+    assert json.loads(path.read_text()) == {"s1": ["L1", "L2"]}
+    assert store.seq == 1 and store.pending == 0
+    # no-op commits leave file and seq alone
+    mtime = path.stat().st_mtime_ns
+    store.subscribe("s1", "L1")
+    assert store.commit() == []
+    assert path.stat().st_mtime_ns == mtime and read_seq(path) == 1
+    # capacity check happens against the file at commit time
+    store.subscribe("s1", "L4", only_if_fewer_than=2)
+    assert store.commit() == []
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_concurrent_threads_lose_no_updates(tmp_path):
+    path = tmp_path / "subscriptions.json"
+
+    def worker(i):
+        store = SubscriptionStore(path)
+        for j in range(20):
+            store.subscribe(f"s{j % 5}", f"L{i}-{j}")
+            store.commit()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    data = json.loads(path.read_text())
+    assert sum(len(v) for v in data.values()) == 6 * 20
+    assert read_seq(path) == 6 * 20
+
+
+def test_concurrent_processes_lose_no_updates(tmp_path):
+    path = tmp_path / "subscriptions.json"
+    code = (
+        "import sys\n"
+        "from core.subscriptions import SubscriptionStore\n"
+        "s = SubscriptionStore(sys.argv[1])\n"
+        "for j in range(25):\n"
+        "    s.subscribe('s%d' % (j % 3), sys.argv[2] + '-%d' % j)\n"
+        "    s.commit()\n"
+    )
+    procs = [subprocess.Popen([sys.executable, "-c", code, str(path), f"P{i}"], cwd=ROOT)
+             for i in range(4)]
+    assert all(p.wait(timeout=60) == 0 for p in procs)
+    data = json.loads(path.read_text())
+    assert sum(len(v) for v in data.values()) == 4 * 25
+
+
+def test_journal_mode_appends_and_compacts(tmp_path):
+    from core import subscriptions
+
+    path = tmp_path / "subscriptions.json"
+    path.write_text(json.dumps({"s0": ["L0"]}), encoding="utf-8")
+    store = SubscriptionStore(path, journal=True, compact_bytes=0)
+    cache = subscriptions.SubscriptionsCache(str(path))
+    assert cache.snapshot() == {"s0": ["L0"]}
+    snap_bytes = path.read_bytes()
+    with store.batch():
+        store.subscribe("s1", "L1")
+        store.subscribe("s1", "L2")
+        store.unsubscribe("s0", "L0")
+    assert path.read_bytes() == snap_bytes  # snapshot untouched
+    journal = subscriptions.journal_path(path)
+    assert journal.name == "subscriptions.journal.jsonl"
+    assert len(journal.read_bytes().splitlines()) == 3
+    assert cache.snapshot() == {"s1": ["L1", "L2"]}
+    # incremental apply of a torn + completed tail
+    with open(journal, "ab") as f:
+        f.write(b'{"seq":9,"op":"sub","stream_id":"s2"')
+    assert cache.listeners("s2") == []
+    store.subscribe("s2", "L3")
+    store.commit()
+    assert cache.listeners("s2") == ["L3"]
+    assert subscriptions.materialize(path) == {"s1": ["L1", "L2"], "s2": ["L3"]}
+
+    assert store.compact() == 2
+    assert journal.read_bytes() == b""
+    assert json.loads(path.read_text()) == {"s1": ["L1", "L2"], "s2": ["L3"]}
+    assert cache.snapshot() == {"s1": ["L1", "L2"], "s2": ["L3"]}
+
+
+def test_journal_replay_is_idempotent_after_crashed_compaction(tmp_path):
+    from core import subscriptions
+
+    path = tmp_path / "subscriptions.json"
+    store = SubscriptionStore(path, journal=True, compact_bytes=0)
+    for lid in ("L1", "L2"):
+        store.subscribe("s1", lid)
+    store.commit()
+    store.unsubscribe("s1", "L1")
+    store.commit()
+    view = subscriptions.materialize(path)
+    # snapshot written but journal not yet truncated
+    path.write_text(json.dumps(view), encoding="utf-8")
+    assert subscriptions.materialize(path) == {"s1": ["L2"]} == view
+
+
+def test_commit_rereads_a_rewrite_the_cache_cannot_see(tmp_path):
+    path = tmp_path / "subscriptions.json"
+    store = SubscriptionStore(path)
+    store.subscribe("s1", "a")
+    store.commit()
+    assert store.read() == {"s1": ["a"]}
+    st = os.stat(path)
+    with open(path, "r+b") as f:  # same inode, same size, same mtime: same cache key
+        f.write(b'{"s1":["b"]}')
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert store.read() == {"s1": ["a"]}  # the cache is fooled...
+    store.subscribe("s2", "c")
+    store.commit()
+    assert json.loads(path.read_text()) == {"s1": ["b"], "s2": ["c"]}  # ...the commit is not